@@ -52,6 +52,7 @@
             pkgs.libtool
             pkgs.pkg-config
             pkgs.patchelf
+            pkgs.distcc  # pack_c distcc_hosts
             # postgres
             pkgs.readline
             pkgs.zlib
@@ -167,6 +168,8 @@
         devShells.python = pkgs.mkShell {
           name = "python";
           buildInputs = [
+            pkgs.zstd  # 差分包
+            pkgs.ccache  # nuitka 编译缓存
           ];
         };
 
@@ -209,6 +212,15 @@
           CFLAGS = "-static";
           LDFLAGS = "-static";
         };
+
+        # 静态链接的 patchelf 和 file，打包时无需拷贝依赖。
+        devShells.patchelf-static = pkgs.mkShell {
+          name = "patchelf-static";
+          buildInputs = [
+            pkgs.pkgsStatic.patchelf
+            pkgs.pkgsStatic.file
+          ];
+        };
       }
     );
 }
@@ -0,0 +1,238 @@
+"""
+本地构建历史：每次运行的阶段耗时、资源采样汇总、包大小和输入哈希保存在 SQLite 中。
+
+查看最近一次运行与历史中位数的对比：
+
+    python3 -m pipelines.common.history workdir/history.sqlite --progname postgres --system x86_64-linux
+"""
+
+import sys
+import time
+import sqlite3
+import argparse
+import statistics
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    progname TEXT NOT NULL,
+    system TEXT NOT NULL,
+    buildid INTEGER,
+    options_hash TEXT,
+    started REAL NOT NULL,
+    finished REAL,
+    result TEXT
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    input_hash TEXT,
+    duration REAL NOT NULL,
+    cpu_avg REAL,
+    cpu_max REAL,
+    mem_peak_kb INTEGER,
+    read_bytes INTEGER,
+    write_bytes INTEGER,
+    load_max REAL
+);
+CREATE TABLE IF NOT EXISTS packages (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    kind TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+# 报告中对比的阶段指标。
+METRICS = ('duration', 'cpu_avg', 'cpu_max', 'mem_peak_kb', 'read_bytes', 'write_bytes', 'load_max')
+
+
+def summarize_samples(text: str) -> Dict[str, float]:
+    """
+    汇总 `scripts/sample_resources.sh` 的采样结果。
+
+    :param text: 采样文件内容。
+    :return: cpu_avg/cpu_max（%）、mem_peak_kb、read_bytes/write_bytes 和 load_max，
+             采样不足两条时为空字典。
+    """
+    rows = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) == 7:
+            rows.append([float(f) for f in fields])
+    if len(rows) < 2:
+        return {}
+    first, last = rows[0], rows[-1]
+    usage = [(b[1] - a[1]) * 100 / (b[2] - a[2]) for a, b in zip(rows, rows[1:]) if b[2] > a[2]]
+    total = last[2] - first[2]
+    return {
+        'cpu_avg': (last[1] - first[1]) * 100 / total if total else 0.0,
+        'cpu_max': max(usage, default=0.0),
+        'mem_peak_kb': int(max(r[3] for r in rows)),
+        'read_bytes': int(last[4] - first[4]) * 512,
+        'write_bytes': int(last[5] - first[5]) * 512,
+        'load_max': max(r[6] for r in rows),
+    }
+
+
+class History(object):
+    """
+    构建历史数据库。
+    """
+    def __init__(self, path: str | Path):
+        """
+        :param path: SQLite 数据库文件路径，不存在时自动创建。
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.executescript(SCHEMA)
+
+    def start_run(
+        self,
+        pipeline: str,
+        progname: str,
+        system: str,
+        buildid: int,
+        options_hash: str
+    ) -> int:
+        """
+        记录一次运行的开始。
+
+        :return: 运行 id。
+        """
+        with self.conn:
+            cur = self.conn.execute('INSERT INTO runs (pipeline, progname, system, buildid, options_hash, started) '
+                                    'VALUES (?, ?, ?, ?, ?, ?)',
+                                    (pipeline, progname, system, buildid, options_hash, time.time()))
+        return cur.lastrowid
+
+    def add_stage(
+        self,
+        run_id: int,
+        name: str,
+        status: str,
+        input_hash: str,
+        duration: float,
+        samples: Dict[str, float]
+    ) -> None:
+        """
+        记录一个阶段。
+
+        :param status: done、skipped 或 failed。
+        :param samples: `summarize_samples` 的结果。
+        """
+        with self.conn:
+            self.conn.execute('INSERT INTO stages (run_id, name, status, input_hash, duration, cpu_avg, cpu_max, '
+                              'mem_peak_kb, read_bytes, write_bytes, load_max) '
+                              'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                              (run_id, name, status, input_hash, duration,
+                               *(samples.get(m) for m in METRICS[1:])))
+
+    def add_package(self, run_id: int, kind: str, name: str, size: int) -> None:
+        """
+        记录一个产物的大小。
+
+        :param kind: 去掉版本号的产物名，用于跨版本对比。
+        """
+        with self.conn:
+            self.conn.execute('INSERT INTO packages (run_id, kind, name, size) VALUES (?, ?, ?, ?)',
+                              (run_id, kind, name, size))
+
+    def finish_run(self, run_id: int, result: str) -> None:
+        """
+        记录一次运行的结果。
+        """
+        with self.conn:
+            self.conn.execute('UPDATE runs SET finished = ?, result = ? WHERE id = ?',
+                              (time.time(), result, run_id))
+
+    def report(self, progname: str, system: str, window: int = 10) -> str:
+        """
+        对比同一 progname 和 system 最近一次运行与之前 `window` 次成功运行的中位数。
+
+        :return: 报告文本。
+        """
+        runs = self.conn.execute('SELECT * FROM runs WHERE progname = ? AND system = ? AND finished IS NOT NULL '
+                                 'ORDER BY id DESC', (progname, system)).fetchall()
+        if not runs:
+            return f'No runs of {progname} on {system}.\n'
+        latest = runs[0]
+        previous = [r['id'] for r in runs[1:] if r['result'] == 'SUCCESSFUL'][:window]
+        started = time.strftime('%Y-%m-%d %H:%M', time.localtime(latest['started']))
+        lines = [f'Run {latest["id"]}: {latest["pipeline"]} #{latest["buildid"]} {latest["result"]} {started}, '
+                 f'compared with the median of {len(previous)} previous successful runs',
+                 '',
+                 f'{"stage":<12}{"metric":<14}{"latest":>14}{"median":>14}{"change":>10}']
+        for stage in self.conn.execute('SELECT * FROM stages WHERE run_id = ? ORDER BY rowid', (latest['id'],)):
+            history = self._stage_history(previous, stage['name'])
+            for metric in METRICS:
+                lines.append(self._row(stage['name'] if metric == 'duration' else '',
+                                       metric, stage[metric], history.get(metric, [])))
+            if stage['status'] != 'done':
+                lines[-len(METRICS)] += f'  ({stage["status"]})'
+        packages = self.conn.execute('SELECT * FROM packages WHERE run_id = ? ORDER BY kind',
+                                     (latest['id'],)).fetchall()
+        width = max([len(p['kind']) + 2 for p in packages] + [26])
+        lines += ['', f'{"package":<{width + 14}}{"latest":>14}{"median":>14}{"change":>10}']
+        for package in packages:
+            sizes = [row['size'] for row in self._query('SELECT size FROM packages WHERE kind = ? AND run_id IN',
+                                                        previous, package['kind'])]
+            lines.append(self._row(package['kind'], '', package['size'], sizes, width=width))
+        return '\n'.join(lines) + '\n'
+
+    def _query(self, sql: str, run_ids: List[int], *params) -> List[sqlite3.Row]:
+        marks = ','.join('?' * len(run_ids))
+        return self.conn.execute(f'{sql} ({marks})', (*params, *run_ids)).fetchall()
+
+    def _stage_history(self, run_ids: List[int], name: str) -> Dict[str, List[float]]:
+        """
+        之前运行中同名且实际执行过的阶段的各项指标。
+        """
+        history = {m: [] for m in METRICS}
+        for row in self._query("SELECT * FROM stages WHERE name = ? AND status = 'done' AND run_id IN",
+                               run_ids, name):
+            for metric in METRICS:
+                if row[metric] is not None:
+                    history[metric].append(row[metric])
+        return history
+
+    @staticmethod
+    def _row(
+        name: str,
+        metric: str,
+        latest: Optional[float],
+        history: List[float],
+        width: int = 12
+    ) -> str:
+        median = statistics.median(history) if history else None
+        change = ''
+        if latest is not None and median:
+            change = f'{latest / median - 1:+.1%}'
+        fmt = lambda v: '-' if v is None else f'{v:.1f}' if isinstance(v, float) else f'{v}'
+        return f'{name:<{width}}{metric:<14}{fmt(latest):>14}{fmt(median):>14}{change:>10}'
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Compare the latest run with the rolling median of earlier runs.')
+    parser.add_argument('db', type=Path, help='History database.')
+    parser.add_argument('--progname', required=True, help='Program name.')
+    parser.add_argument('--system', required=True, help='Target system.')
+    parser.add_argument('--window', type=int, default=10, help='Number of previous successful runs.')
+    args = parser.parse_args()
+    if not args.db.is_file():
+        print(f'error: history database not found: {args.db}', file=sys.stderr)
+        return 1
+    print(History(args.db).report(args.progname, args.system, args.window), end='')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,16 @@
+"""
+流水线日志。
+"""
+
+import sys
+import logging
+
+
+# 与 xflow 打印的命令输出写到同一个流，保持先后顺序。
+logger = logging.getLogger('pgflow')
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
@@ -1,10 +1,57 @@
-from typing import Optional, Generator
+import re
+import time
+import hashlib
+import inspect
+import threading
+
+from typing import Callable, Optional, Generator, Sequence
 from contextlib import contextmanager
-from functools import cached_property
-from pathlib import PurePosixPath
+from functools import cached_property, wraps
+from pathlib import Path, PurePosixPath
 
+from xflow.framework.node import Node
 from xflow.framework.pipeline import Pipeline
-from .scripts import copy_deps, check_deps, copy_runtime_tools, set_rpath, set_interp
+from .scripts import (copy_deps, check_deps, copy_runtime_tools, set_rpath, set_interp,
+                      count_lib_lookups, split_debuginfo, pkg_size_report, write_manifest, start_sampler,
+                      stop_sampler, distcc_hosts, distcc_report, make_jobs, start_prefetch_nixenv,
+                      wait_prefetch_nixenv)
+from .history import History, summarize_samples
+from .steps import Step, run_steps, node_view
+from .quiet import QuietNode
+from .log import logger
+
+
+def _source(func: Callable) -> str:
+    """
+    函数源码，取不到时（如交互式定义）退回字节码。
+    """
+    try:
+        return inspect.getsource(func)
+    except (OSError, TypeError):
+        code = getattr(func, '__code__', None)
+        return code.co_code.hex() if code else ''
+
+
+def _checkpointed(name: str, func: Callable) -> Callable:
+    """
+    为阶段函数加上检查点，见 `pack.run_checkpointed`。
+    """
+    @wraps(func)
+    def wrapper(self: 'pack') -> None:
+        self._stage = name
+        digest = self.input_hash(_source(func), self.helpers_hash)
+        self.start_telemetry(name)
+        start = time.time()
+        status = 'failed'
+        try:
+            ran = self.run_checkpointed(name, lambda: func(self), digest)
+            status = 'done' if ran else 'skipped'
+        finally:
+            self.record_stage(name, status, digest, time.time() - start)
+        if ran:
+            # 之后的阶段基于本阶段重新生成的内容，不能再跳过。
+            self._resuming = False
+    return wrapper
 
 
 class pack(Pipeline):
@@ -27,6 +74,34 @@ class pack(Pipeline):
         nix_env_name: str = Pipeline.Option(desc='Nix shell environment name.')
         include_tests: bool = Pipeline.Option(desc='Include package test files and test runtime tools.',
                                               default=False)
+        size_report: bool = Pipeline.Option(desc='Write a size report for each archived package.',
+                                            default=True)
+        hardlink_dups: bool = Pipeline.Option(desc='Replace byte-identical files with hard links before archiving.',
+                                              default=False)
+        size_budget: Optional[int] = Pipeline.Option(desc='Fail if an archived directory exceeds this many MiB.')
+        source_date_epoch: Optional[int] = Pipeline.Option(desc='Clamp archive mtimes to this timestamp '
+                                                                '(default: last commit time of the code).')
+        parallel_steps: int = Pipeline.Option(desc='Maximum number of independent packaging steps run concurrently '
+                                                   '(the steps share one ssh/docker connection).',
+                                              default=1)
+        resume: Optional[int] = Pipeline.Option(desc='BuildID of a failed run to continue in its node working directory, '
+                                                     'skipping stages and steps whose checkpoints are up to date.')
+        telemetry: bool = Pipeline.Option(desc='Sample node CPU, memory, disk I/O and load while each stage runs.',
+                                          default=True)
+        telemetry_interval: int = Pipeline.Option(desc='Seconds between telemetry samples.',
+                                                  default=2)
+        history_db: Optional[str] = Pipeline.Option(desc='Local SQLite run history (default: <workdir>/history.sqlite).')
+        prefetch_nixenv: bool = Pipeline.Option(desc='Fetch the nix dev shell closure in the background from setup on '
+                                                     'and pin it with a GC root.',
+                                                default=True)
+        nix_gcroots_dir: str = Pipeline.Option(desc='Node directory holding the GC root profiles of prefetched dev shells.',
+                                               default='~/.cache/pgflow/gcroots')
+        quiet: bool = Pipeline.Option(desc='Log the verbose output of the packaging helpers to compressed files on the '
+                                           'node and print only per-step summaries; a failing step\'s log is fetched.',
+                                      default=False)
+        unprivileged_user: str = Pipeline.Option(desc='User that runs PostgreSQL in benchmarks and tests when the node '
+                                                      'user is root.',
+                                                 default='nobody')
 
         @property
         def arch(self) -> str:
@@ -42,19 +117,217 @@ class pack(Pipeline):
         self.options: __class__.Options  # 保留用于自动提示
         super().setup()
 
+        # 续跑时沿用失败那次构建的工作目录。
+        self._resuming = bool(self.options.resume)
+        if self.options.resume:
+            self.node.rmcwd()
+            self.cwd.rmdir()
+            self.buildid = self.options.resume
+            logger.info(f'Resuming BuildID: {self.buildid}')
+            if not self.node.exists(self.node.cwd):
+                raise ValueError(f'Working directory of BuildID {self.buildid} not found: {self.node.cwd}')
+            self.cwd.mkdir(parents=True, exist_ok=True)
+
+        # 记录本次运行，报告见 `python3 -m pipelines.common.history`。
+        self.history = History(Path(self.options.history_db or self.bwd.joinpath('history.sqlite')).expanduser())
+        self.run_id = self.history.start_run(self.name,
+                                             self.options.progname,
+                                             self.options.system,
+                                             self.buildid,
+                                             self.input_hash(''))
+
         # 标准目录。
         self.codedir = self.node.cwd.joinpath('code')
         self.packdir = self.node.cwd.joinpath('package')
         self.instdir = self.packdir.joinpath('content')
-        self.testsdir = self.instdir.joinpath('tests')
+        # 测试树与主包内容分开存放，两者的打包步骤可以并发执行。
+        self.testsdir = self.node.cwd.joinpath('tests')
         self.node.exec(f'mkdir -p {self.instdir}')
+        # 安静模式下辅助脚本的完整输出，见 `QuietNode`。
+        self.logdir = self.node.cwd.joinpath('logs')
+        self._quiet = self.options.quiet
+
+        # 与 stage1 拉取代码并行下载开发环境，首次进入 nixenv 时等待完成。
+        self.nixenv_statedir = self.node.cwd.joinpath('nixenv')
+        self._nixenv_ready = not self.options.prefetch_nixenv
+        if self.options.prefetch_nixenv:
+            name = self.options.nix_env_name
+            start_prefetch_nixenv(self.node,
+                                  self.nixenv_statedir,
+                                  f'{self.options.nix_flakes_dir}#devShells.{self.options.system}.{name}',
+                                  f'{self.options.nix_gcroots_dir}/{self.options.system}-{name}')
 
     def teardown(self) -> None:
         """
         后置步骤。
         """
+        if getattr(self, 'history', None):
+            if self.result == 'SUCCESSFUL':
+                for path in sorted(self.cwd.glob('*.tar*')):
+                    self.history.add_package(self.run_id,
+                                             path.name.replace(self.version, '*'),
+                                             path.name,
+                                             path.stat().st_size)
+            self.history.finish_run(self.run_id, self.result)
         super().teardown()
 
+    @property
+    def telemetry_file(self) -> PurePosixPath:
+        """
+        当前阶段的资源采样文件。
+        """
+        return self.node.cwd.joinpath('telemetry', f'{self._stage}.samples')
+
+    def start_telemetry(self, stage: str) -> None:
+        """
+        开始采样阶段 `stage` 运行期间的节点资源。
+        """
+        if self.options.telemetry:
+            self.node.exec(f'mkdir -p {self.telemetry_file.parent}')
+            start_sampler(self.node, self.telemetry_file, self.options.telemetry_interval)
+
+    def record_stage(
+        self,
+        stage: str,
+        status: str,
+        digest: str,
+        duration: float
+    ) -> None:
+        """
+        停止采样，把阶段耗时、资源汇总和输入哈希写入运行历史。
+
+        :param stage: 阶段名。
+        :param status: done、skipped 或 failed。
+        :param digest: 输入哈希。
+        :param duration: 耗时（秒）。
+        """
+        samples = {}
+        if self.options.telemetry:
+            stop_sampler(self.node, self.telemetry_file)
+            samples = summarize_samples(self.node.exec(f'cat {self.telemetry_file}'))
+        self.history.add_stage(self.run_id, stage, status, digest, duration, samples)
+        if samples:
+            logger.info(f'{stage}: {duration:.0f}s, cpu {samples["cpu_avg"]:.0f}% (max {samples["cpu_max"]:.0f}%), '
+                        f'mem peak {samples["mem_peak_kb"] // 1024} MiB, '
+                        f'read {samples["read_bytes"] >> 20} MiB, write {samples["write_bytes"] >> 20} MiB, '
+                        f'load max {samples["load_max"]:.1f}')
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        for name, func in list(vars(cls).items()):
+            if re.fullmatch(r'stage\d+', name) and callable(func):
+                setattr(cls, name, _checkpointed(name, func))
+
+    @property
+    def checkpointdir(self) -> PurePosixPath:
+        """
+        检查点目录，每个已完成的阶段或步骤对应一个记录输入哈希的文件。
+        """
+        return self.node.cwd.joinpath('.checkpoints')
+
+    @cached_property
+    def helpers_hash(self) -> str:
+        """
+        本地 scripts/ 和 pipelines/common/ 的内容哈希，辅助脚本修改后阶段和步骤需要重新执行。
+        """
+        digest = hashlib.sha256()
+        for topdir in ('scripts', 'pipelines/common'):
+            for path in sorted(self.projdir.joinpath(topdir).rglob('*')):
+                if path.is_file() and path.suffix != '.pyc':
+                    digest.update(str(path.relative_to(self.projdir)).encode())
+                    digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    def input_hash(self, source: str, *extra: str) -> str:
+        """
+        计算阶段或步骤的输入哈希：流水线参数、函数源码和附加内容。
+
+        :param source: 函数源码。
+        :param extra: 附加的哈希内容。
+        :return: 十六进制哈希值。
+        """
+        digest = hashlib.sha256()
+        digest.update(self.options.model_dump_json(exclude={'resume', 'parallel_steps'}).encode())
+        for text in (source, *extra):
+            digest.update(text.encode())
+        return digest.hexdigest()
+
+    def run_checkpointed(
+        self,
+        name: str,
+        func: Callable[[], None],
+        digest: str,
+        force: bool = False
+    ) -> bool:
+        """
+        续跑时如果 `name` 的检查点与 `digest` 一致则跳过，否则执行 `func` 并在成功后写入检查点。
+        重新执行的阶段和步骤应能在上次失败留下的目录上再次运行。
+
+        :param name: 检查点名称。
+        :param func: 要执行的函数。
+        :param digest: 输入哈希。
+        :param force: 忽略检查点，总是执行。
+        :return: 是否执行了 `func`。
+        """
+        marker = self.checkpointdir.joinpath(name)
+        if self._resuming and not force:
+            if self.node.exec(f'cat {marker} 2>/dev/null || true') == digest:
+                logger.info(f'Skip {name}: checkpoint is up to date')
+                return False
+        self.node.exec(f'mkdir -p {self.checkpointdir} && rm -f {marker}')
+        func()
+        self.node.write(digest, marker)
+        return True
+
+    @property
+    def node(self) -> Node:
+        """
+        执行节点的视图，见 `NodeView`。在 `run_steps` 启动的步骤线程中为该线程的视图；
+        安静模式下再包装为 `QuietNode`。
+        """
+        node = getattr(self._steplocal, 'node', None) or self._node
+        if not getattr(self, '_quiet', False):
+            return node
+        # 每个线程缓存一个包装，线程换了节点视图（开始新的步骤）时重建。
+        quiet = getattr(self._steplocal, 'quiet', None)
+        if quiet is None or quiet._node is not node:
+            quiet = self._steplocal.quiet = QuietNode(node, self.logdir, self.cwd)
+        return quiet
+
+    @node.setter
+    def node(self, node: Node) -> None:
+        self._node = node_view(node, self)
+        self._steplocal = threading.local()
+
+    @property
+    def cp_verbose(self) -> str:
+        """
+        cp 的逐个文件输出选项，安静模式下为空。
+        """
+        return '' if self.options.quiet else '-v'
+
+    def run_steps(self, steps: Sequence[Step]) -> None:
+        """
+        按依赖关系执行步骤，相互独立的步骤最多 parallel_steps 个并发执行。
+
+        :param steps: 步骤列表。
+        :raises:
+            `StepError` -- 步骤执行失败，`step` 属性为失败的步骤名。
+        """
+        rerun = set()
+
+        def checkpointed(step: Step) -> Callable[[], None]:
+            def func() -> None:
+                digest = self.input_hash(_source(step.func), self.helpers_hash)
+                # 依赖的步骤重新执行过时，本步骤的输入也已变化。
+                force = any(dep in rerun for dep in step.after)
+                if self.run_checkpointed(f'{self._stage}.{step.name}', step.func, digest, force=force):
+                    rerun.add(step.name)
+            return func
+
+        steps = [Step(s.name, checkpointed(s), s.after) for s in steps]
+        run_steps(steps, self._node, self._steplocal, self.options.parallel_steps)
+
     @cached_property
     def version(self) -> str:
         """
@@ -69,12 +342,38 @@ class pack(Pipeline):
 
         :param options: nix develop 命令选项。
         """
+        if not self._nixenv_ready:
+            self._nixenv_ready = True
+            wait_prefetch_nixenv(self.node, self.nixenv_statedir)
         with self.node.nixenv(self.options.nix_flakes_dir,
                               system=self.options.system,
                               name=self.options.nix_env_name,
                               options=options):
             yield
 
+    @cached_property
+    def source_date_epoch(self) -> int:
+        """
+        归档文件的时间戳上限，默认取代码最后一次提交的时间。
+        """
+        if self.options.source_date_epoch is not None:
+            return self.options.source_date_epoch
+        with self.node.dir(self.codedir):
+            return int(self.node.exec('git log -1 --format=%ct'))
+
+    @property
+    def tar_options(self) -> str:
+        """
+        可重复构建的 tar 参数：固定成员顺序、时间戳和属主。
+        """
+        return (f'--sort=name '
+                f'--format=gnu '
+                f'--mtime=@{self.source_date_epoch} '
+                f'--clamp-mtime '
+                f'--owner=0 '
+                f'--group=0 '
+                f'--numeric-owner')
+
     def archive(
         self,
         directory: str | PurePosixPath,
@@ -88,7 +387,20 @@ class pack(Pipeline):
         """
         pkgname = pkgname or self.pkgname
         self.node.exec(f'chmod -R +w {directory}')
-        self.node.exec(f'tar czf {pkgname} -C {directory} .')
+        if self.options.size_report or self.options.hardlink_dups or self.options.size_budget:
+            reportname = pkgname.removesuffix('.tar.gz') + '.size.txt'
+            with self.nixenv():
+                pkg_size_report(self.node,
+                                directory,
+                                self.node.cwd.joinpath(reportname),
+                                hardlink=self.options.hardlink_dups,
+                                budget=self.options.size_budget)
+            self.node.getfile(self.node.cwd.joinpath(reportname), self.cwd)
+        # content 放在最后，流式安装时 install.sh、清单和 patchelf 会先于内容解压。
+        members = sorted(self.node.exec(f'ls -A {directory}').split(), key=lambda m: (m == 'content', m))
+        members = ' '.join(f'./{m}' for m in members)
+        # gzip -n 不写入文件名和时间戳，保证相同输入得到相同的包。
+        self.node.exec(f'tar {self.tar_options} -cf - -C {directory} {members} | gzip -n -9 > {pkgname}')
         pkgpath = self.node.cwd.joinpath(pkgname)
         self.node.getfile(pkgpath, self.cwd)
 
@@ -124,11 +436,63 @@ class pack(Pipeline):
         :param destdir: 目标目录。
         :param script: 安装脚本名。
         """
+        destdir = PurePosixPath(destdir)
         self.node.putfile(f'scripts/{script}', destdir)
         with self.node.dir(destdir):
             if script != 'install.sh':
                 self.node.exec(f'mv {script} install.sh')
             self.node.exec('chmod +x install.sh')
+        # 安装脚本的 --upgrade 模式依据 manifest.sha256 只更新变化的文件，
+        # stream_install.sh 依据 elfexec.list 在解压时直接修正解释器，无需再次扫描。
+        contentdir = destdir.joinpath('content')
+        if self.node.exists(contentdir):
+            self.node.putfile('scripts/stream_install.sh', destdir)
+            self.node.exec(f'chmod +x {destdir.joinpath("stream_install.sh")}')
+            with self.nixenv():
+                write_manifest(self.node,
+                               contentdir,
+                               destdir.joinpath('manifest.sha256'),
+                               elflist=destdir.joinpath('elfexec.list'))
+
+    @contextmanager
+    def scratch(self, name: str) -> Generator[PurePosixPath, None, None]:
+        """
+        在节点 /tmp 下创建临时目录，退出时删除。节点工作目录不一定允许其他用户访问，
+        以 unprivileged_user 运行的程序及其读写的文件应放在这里。
+
+        :param name: 目录名前缀。
+        """
+        tmpdir = PurePosixPath(self.node.exec(f'mktemp -d /tmp/pgflow-{name}.XXXXXX'))
+        try:
+            self.node.exec(f'chmod 755 {tmpdir}')
+            yield tmpdir
+        finally:
+            self.node.exec(f'rm -rf {tmpdir}')
+
+    def install_package(
+        self,
+        pkgname: str,
+        directory: str | PurePosixPath
+    ) -> None:
+        """
+        用节点上已归档的包 `pkgname` 中的 install.sh 安装到 `directory`，与用户拿到包后的安装方式相同。
+        copy_deps 之后 instdir 中的程序使用相对路径的解释器，不能直接运行，需要运行打包结果时应先安装。
+        没有 install.sh 的包（如测试包）只解压到 `directory`。
+
+        :param pkgname: 包名。
+        :param directory: 安装目录。
+        """
+        pkgpath = self.node.cwd.joinpath(pkgname)
+        extractdir = PurePosixPath(f'{directory}.pkg')
+        self.node.exec(f'rm -rf {extractdir} && mkdir -p {extractdir}')
+        self.node.exec(f'tar xzf {pkgpath} -C {extractdir}')
+        if not self.node.exists(extractdir.joinpath('install.sh')):
+            self.node.exec(f'rm -rf {directory} && mv {extractdir} {directory}')
+            return
+        with self.nixenv():
+            quiet = '--quiet ' if self.options.quiet else ''
+            self.node.exec(f'{extractdir.joinpath("install.sh")} {quiet}{directory}')
+        self.node.exec(f'rm -rf {extractdir}')
 
     def copy_tests(self) -> None:
         """
@@ -146,6 +510,21 @@ class pack_c(pack):
         """
         configure_options: Optional[str] = Pipeline.Option(desc='Configure options.',
                                                            default='')
+        debuginfo: bool = Pipeline.Option(desc='Strip ELF files and archive their debug info separately.',
+                                          default=True)
+        delta_from: Optional[str] = Pipeline.Option(desc='Previous package (URL or node path) to build a delta package from.')
+        patchelf_cache_dir: str = Pipeline.Option(desc='Node directory caching the relocatable patchelf bundle.',
+                                                  default='~/.cache/pgflow/patchelf')
+        patchelf_static: bool = Pipeline.Option(desc='Bundle statically linked patchelf and file (no dependency closure).',
+                                                default=False)
+        distcc_hosts: Optional[str] = Pipeline.Option(desc='Space separated distcc helpers (HOST[:PORT][/LIMIT][,OPTIONS]) '
+                                                           'running distccd in the same nix dev shell. Unreachable '
+                                                           'helpers are skipped and compilation falls back to local.')
+        make_mem_per_job: Optional[int] = Pipeline.Option(desc='MiB of memory reserved per make job when picking the '
+                                                               'job count (default: per-pipeline hint).')
+        prune_rpath: bool = Pipeline.Option(desc='Trim and order each ELF rpath to the directories holding its '
+                                                 'DT_NEEDED libraries, checked by counting loader lookups.',
+                                            default=False)
 
     def setup(self) -> None:
         """
@@ -154,6 +533,10 @@ class pack_c(pack):
         self.options: __class__.Options  # 保留用于自动提示
         super().setup()
 
+        self.debugdir = self.node.cwd.joinpath('debuginfo')
+        self.deltadir = self.node.cwd.joinpath('delta')
+        self.distccdir = self.node.cwd.joinpath('distcc')
+
     def teardown(self) -> None:
         """
         后置步骤。
@@ -175,6 +558,75 @@ class pack_c(pack):
         """
         return f'{super().pkgstem}-glibc{self.glibc_version}'
 
+    @cached_property
+    def make_options(self) -> str:
+        """
+        编译时的 make 并发数和编译器参数。配置 distcc_hosts 时经 distcc 把编译单元分发到可连通的节点，
+        本机的编译（含回退）和预处理仍按 `local_make_jobs` 限制并发，make 的负载上限不变。
+        """
+        if not self.options.distcc_hosts:
+            return self.local_make_options
+        local_jobs, load = self.local_make_jobs
+        jobs = distcc_hosts(self.node, self.distccdir, self.options.distcc_hosts.split(), local_jobs=local_jobs)
+        wrapper = f'{self.node.upload_script("scripts/distcc.sh")} cc {self.distccdir}'
+        return f"-j{jobs} -l{load} CC='{wrapper} gcc' CXX='{wrapper} g++'"
+
+    @cached_property
+    def local_make_jobs(self) -> tuple[int, int]:
+        """
+        本机的 make 并发数和负载上限：按 cgroup CPU 配额和可用内存计算，
+        负载超过可用 CPU 数时 make 暂停启动新任务。
+        """
+        return make_jobs(self.node, self.options.make_mem_per_job or self.make_job_memory)
+
+    @cached_property
+    def local_make_options(self) -> str:
+        """
+        本机编译时的 make 并发数和负载上限，见 `local_make_jobs`。
+        """
+        jobs, load = self.local_make_jobs
+        return f'-j{jobs} -l{load}'
+
+    @property
+    def make_job_memory(self) -> int:
+        """
+        每个编译任务预留的内存（MiB），子类按编译方式调整。
+        """
+        return 1024
+
+    def report_distcc(self) -> None:
+        """
+        输出并下载 distcc 远程编译占比报告，未配置 distcc_hosts 时不做任何事。
+        """
+        if not self.options.distcc_hosts:
+            return
+        reportname = self.pkgstem + '.distcc.txt'
+        distcc_report(self.node, self.distccdir, self.node.cwd.joinpath(reportname))
+        self.node.getfile(self.node.cwd.joinpath(reportname), self.cwd)
+
+    @property
+    def delta_base_pkgname(self) -> str:
+        """
+        差分包的基准包名。
+        """
+        return self.options.delta_from.split('/')[-1]
+
+    @property
+    def delta_pkgname(self) -> str:
+        """
+        差分包名，如 `postgres-18.1-x86_64-linux-glibc2.40-delta-18.0.tar`。
+        """
+        base_version = self.delta_base_pkgname.removeprefix(f'{self.options.progname}-')
+        base_version = base_version.split(f'-{self.options.system}')[0]
+        return f'{self.pkgstem}-delta-{base_version}.tar'
+
+    @property
+    def debuginfo_pkgname(self) -> str:
+        """
+        调试信息包名。
+        """
+        return f'{self.pkgstem}-debuginfo.tar.gz'
+
     @property
     def default_test_tools(self) -> tuple[str, ...]:
         """
@@ -207,6 +659,7 @@ class pack_c(pack):
             'rmdir',
             'sed',
             'sh',
+            'sha256sum',
             'sleep',
             'sort',
             'tail',
@@ -261,6 +714,8 @@ class pack_c(pack):
         with self.nixenv():
             copy_deps(self.node, elfdir, destdir, excludedirs=full_excludedirs)
             set_rpath(self.node, elfdir, f'{libdir}:{destdir}')
+            if self.options.prune_rpath:
+                self.prune_rpath(elfdir, f'{libdir}:{destdir}')
         if checkdeps:
             with self.nixenv():
                 check_deps(self.node, elfdir)
@@ -275,29 +730,161 @@ class pack_c(pack):
             locales_savedir = destdir
             self.node.exec(f'mkdir -p {locales_savedir}')
             with self.nixenv():
-                self.node.exec(f"sh -c 'cp -v $LOCALE_ARCHIVE {locales_savedir}'")
+                self.node.exec(f"sh -c 'cp {self.cp_verbose} $LOCALE_ARCHIVE {locales_savedir}'")
+
+    def prune_rpath(self, elfdir: str | PurePosixPath, libdirs: str) -> None:
+        """
+        把 `elfdir` 中 elf 文件的 RPATH 裁剪为实际存放其依赖的目录，并对比前后动态链接器的查找次数。
+        需在 nix 环境中调用。
+
+        :param elfdir: elf 文件目录。
+        :param libdirs: 依赖库目录列表（以`:`分割）。
+        """
+        key = hashlib.sha1(str(elfdir).encode()).hexdigest()[:12]
+        lookupdir = self.node.cwd.joinpath('lookups')
+        before = lookupdir.joinpath(f'{key}.before')
+        after = lookupdir.joinpath(f'{key}.after')
+        self.node.exec(f'mkdir -p {lookupdir}')
+        count_lib_lookups(self.node, elfdir, before)
+        set_rpath(self.node, elfdir, libdirs, prune=True)
+        count_lib_lookups(self.node, elfdir, after, before)
+
+    def split_debuginfo(self, elfdir: str | PurePosixPath) -> None:
+        """
+        剥离 `elfdir` 中 elf 文件的调试信息，并单独归档为调试信息包。
+        应在 copy_deps 之后、归档主包之前调用。
+
+        :param elfdir: 需要剥离调试信息的目录。
+        """
+        if not self.options.debuginfo:
+            return
+        self.node.exec(f'mkdir -p {self.debugdir}')
+        with self.nixenv():
+            split_debuginfo(self.node, elfdir, self.debugdir)
+        self.node.putfile('scripts/debuginfo.sh', self.debugdir)
+        self.node.exec(f'chmod +x {self.debugdir.joinpath("debuginfo.sh")}')
+        self.archive(self.debugdir, self.debuginfo_pkgname)
+
+    def archive(
+        self,
+        directory: str | PurePosixPath,
+        pkgname: Optional[str] = None
+    ) -> None:
+        """
+        压缩节点上的目录 `directory` 并下载。指定 delta_from 时为主包额外生成差分包。
+
+        :param directory: 节点上要归档的目录。
+        :param pkgname: 压缩后的文件名。
+        """
+        pkgname = pkgname or self.pkgname
+        super().archive(directory, pkgname)
+        if self.options.delta_from and pkgname == self.pkgname:
+            self.archive_delta()
+
+    def archive_delta(self) -> None:
+        """
+        使用 zstd --patch-from 生成从 delta_from 包到当前主包的差分包并下载。差分包布局：
+        .
+        |-- delta.info
+        |-- delta.zst
+        |-- install.sh
+        |-- zstd/
+        """
+        workdir = self.node.cwd.joinpath('delta_work')
+        basepkg = workdir.joinpath(self.delta_base_pkgname)
+        self.node.exec(f'rm -rf {self.deltadir} {workdir}')
+        self.node.exec(f'mkdir -p {self.deltadir} {workdir}')
+        if '://' in self.options.delta_from:
+            with self.node.dir(workdir):
+                self.node.exec(f'wget {self.options.delta_from}')
+        else:
+            self.node.exec(f'cp {self.options.delta_from} {basepkg}')
+        pkgpath = self.node.cwd.joinpath(self.pkgname)
+        with self.node.dir(workdir):
+            self.node.exec(f'gzip -dc {basepkg} > base.tar')
+            self.node.exec(f'gzip -dc {pkgpath} > target.tar')
+            with self.nixenv():
+                self.node.exec(f'zstd -q -19 --long=31 --patch-from=base.tar target.tar '
+                               f'-o {self.deltadir.joinpath("delta.zst")}')
+                zstd = self.node.exec('which zstd')
+            base_sha256 = self.node.exec(f'sha256sum {basepkg}').split()[0]
+            target_sha256 = self.node.exec('sha256sum target.tar').split()[0]
+        self.node.write(f'BASE={self.delta_base_pkgname}\n'
+                        f'BASE_SHA256={base_sha256}\n'
+                        f'TARGET={self.pkgname}\n'
+                        f'TARGET_TAR_SHA256={target_sha256}\n',
+                        self.deltadir.joinpath('delta.info'))
+        zstddir = self.deltadir.joinpath('zstd')
+        self.node.exec(f'mkdir -p {zstddir.joinpath("bin")}')
+        self.node.exec(f'cp {zstd} {zstddir.joinpath("bin")}')
+        pack_c.copy_deps(self, zstddir)
+        pack.copy_instscript(self, self.deltadir)
+        self.node.exec(f'chmod -R +w {self.deltadir}')
+        self.node.exec(f'tar {self.tar_options} -cf {self.delta_pkgname} -C {self.deltadir} .')
+        self.node.getfile(self.node.cwd.joinpath(self.delta_pkgname), self.cwd)
+        self.node.exec(f'rm -rf {workdir}')
 
     def copy_patchelf(self, destdir: str | PurePosixPath) -> None:
         """
-        拷贝 patchelf 及其依赖。
+        拷贝 patchelf 及其依赖，优先使用节点上按系统和 flake 哈希缓存的副本。
 
         :param destdir: 拷贝的目标目录。
         """
-        destdir = PurePosixPath(destdir)
-        parent = destdir.joinpath('patchelf')
+        parent = PurePosixPath(destdir).joinpath('patchelf')
+        cachedir = self.patchelf_cachedir
+        if not self.node.exec(f'test -f {cachedir}/.complete && echo yes || true'):
+            self.node.exec(f'mkdir -p {PurePosixPath(cachedir).parent}')
+            tmpdir = self.node.exec(f'mktemp -d {cachedir}.tmp.XXXXXX')
+            self.build_patchelf(tmpdir)
+            self.node.exec(f'touch {tmpdir}/.complete')
+            # 并发构建时只保留先完成的一份。
+            self.node.exec(f'mv -T {tmpdir} {cachedir} 2>/dev/null || rm -rf {tmpdir}')
+        self.node.exec(f'mkdir -p {parent}')
+        self.node.exec(f'cp -a {cachedir}/. {parent}/')
+        self.node.exec(f'rm -f {parent}/.complete')
+
+    @cached_property
+    def patchelf_cachedir(self) -> str:
+        """
+        patchelf 缓存目录，按系统、flake.nix/flake.lock 哈希、是否静态链接（否则按 nix 环境名），
+        以及 build_patchelf 用到的依赖处理脚本和 prune_rpath 的哈希区分。
+        """
+        flakes = self.options.nix_flakes_dir
+        lockhash = self.node.exec(f'cat {flakes}/flake.nix {flakes}/flake.lock 2>/dev/null '
+                                  f'| sha256sum | cut -c1-16')
+        digest = hashlib.sha256()
+        for script in ('copy_deps.sh', 'set_rpath.sh', 'set_interp.sh'):
+            digest.update(self.projdir.joinpath('scripts', script).read_bytes())
+        digest.update(str(self.options.prune_rpath).encode())
+        suffix = '-static' if self.options.patchelf_static else f'-{self.options.nix_env_name}'
+        return (f'{self.options.patchelf_cache_dir}/{self.options.system}-{lockhash}'
+                f'-{digest.hexdigest()[:16]}{suffix}')
+
+    def build_patchelf(self, parent: str | PurePosixPath) -> None:
+        """
+        在 `parent` 中生成可重定位的 patchelf 和 file（含 magic 数据库）。
+
+        :param parent: 输出目录。
+        """
+        parent = PurePosixPath(parent)
         bindir = parent.joinpath('bin')
         libdir = parent.joinpath('lib')
-        with self.nixenv():
+        name = 'patchelf-static' if self.options.patchelf_static else self.options.nix_env_name
+        with self.node.nixenv(self.options.nix_flakes_dir,
+                              system=self.options.system,
+                              name=name):
             patchelf = self.node.exec('which patchelf')
             file = self.node.exec('which file')
             filedir = file.replace('/bin/file', '')
             filesharedir = f'{filedir}/share'
         self.node.exec(f'mkdir -p {bindir}')
         self.node.exec(f'mkdir -p {libdir}')
-        self.node.exec(f'cp -v {patchelf} {bindir}')
-        self.node.exec(f'cp -v {file} {bindir}')
-        self.node.exec(f'cp -rv {filesharedir} {parent}')
-        pack_c.copy_deps(self, parent)
+        self.node.exec(f'cp {self.cp_verbose} {patchelf} {bindir}')
+        self.node.exec(f'cp {self.cp_verbose} {file} {bindir}')
+        self.node.exec(f'cp -r {self.cp_verbose} {filesharedir} {parent}')
+        self.node.exec(f'chmod -R u+w {parent}')
+        if not self.options.patchelf_static:
+            pack_c.copy_deps(self, parent)
 
     def copy_instscript(
         self,
@@ -364,7 +951,7 @@ class pack_pgceco(pack_c):
         directory: Optional[str | PurePosixPath] = None
     ) -> None:
         """
-        下载并安装 postgres 包。
+        下载并安装 postgres 包，已下载过时直接安装。
 
         :param directory: 安装目录。
         """
@@ -372,12 +959,14 @@ class pack_pgceco(pack_c):
         savedir = self.node.cwd.joinpath('postgres_pkg')
         self.node.exec(f'mkdir -p {savedir} {directory}')
         with self.node.dir(savedir):
-            pkgname = self.options.pg_pkg_url.split('/')[-1]
-            self.node.exec(f'wget {self.options.pg_pkg_url}')
-            self.node.exec(f'tar xf {pkgname}')
-            self.node.exec(f'rm -f {pkgname}')
+            if not self.node.exists(savedir.joinpath('install.sh')):
+                pkgname = self.options.pg_pkg_url.split('/')[-1]
+                self.node.exec(f'wget {self.options.pg_pkg_url}')
+                self.node.exec(f'tar xf {pkgname}')
+                self.node.exec(f'rm -f {pkgname}')
             with self.nixenv():
-                self.node.exec(f'./install.sh {directory}')
+                quiet = '--quiet ' if self.options.quiet else ''
+                self.node.exec(f'./install.sh {quiet}{directory}')
 
 
 class pack_python(pack_c):
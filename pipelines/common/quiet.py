@@ -0,0 +1,76 @@
+"""
+安静模式的节点包装。
+"""
+
+from pathlib import Path, PurePosixPath
+from typing import Dict, Optional
+
+from xflow.framework.node import CommandResult
+from xflow.framework.errors import CommandError
+
+from .log import logger
+from .steps import NodeView
+
+
+# 输出只是过程信息、调用方不解析输出的辅助脚本。
+QUIET_SCRIPTS = frozenset({
+    'copy_deps.sh',
+    'copy_perl.sh',
+    'copy_python.sh',
+    'copy_tcl.sh',
+    'copy_runtime_tools.sh',
+    'check_deps.sh',
+    'set_rpath.sh',
+    'set_interp.sh',
+    'split_debuginfo.sh',
+    'wrap_envs.sh',
+    'write_manifest.sh',
+    'select_test_files.py',
+})
+
+
+class QuietNode(object):
+    """
+    安静模式的节点视图。
+
+    `QUIET_SCRIPTS` 中的脚本经 `scripts/quiet_run.sh` 执行：完整输出追加到节点上
+    `logdir` 中以脚本命名的 gzip 日志，只回传一行汇总（行数、拷贝的文件数和字节数、耗时）；
+    脚本失败时把该日志下载到本地目录 `localdir` 后重新抛出异常。其余操作原样转给被包装的节点。
+    """
+    def __init__(self, node: NodeView, logdir: PurePosixPath, localdir: Path):
+        """
+        :param node: 被包装的节点视图，见 `NodeView`。
+        :param logdir: 节点上的日志目录。
+        :param localdir: 失败时日志的下载目录。
+        """
+        self._node = node
+        self._logdir = logdir
+        self._localdir = localdir
+
+    def __getattr__(self, name: str):
+        return getattr(self._node, name)
+
+    def exec_script(
+        self,
+        script: str | Path,
+        argstr: str = '',
+        envs: Optional[Dict[str, str]] = None
+    ) -> CommandResult:
+        """
+        上传并执行脚本，`QUIET_SCRIPTS` 中的脚本只输出汇总。
+
+        :raises:
+            `CommandError` -- 返回码不为 0。
+        """
+        lscript = Path(script)
+        if lscript.name not in QUIET_SCRIPTS:
+            return self._node.exec_script(script, argstr=argstr, envs=envs)
+        rscript = self._node.upload_script(lscript)
+        runner = self._node.upload_script('scripts/quiet_run.sh')
+        log = self._logdir.joinpath(f'{lscript.stem}.log.gz')
+        try:
+            return self._node.exec(f'{runner} {log} {lscript.stem} {rscript} {argstr}', envs=envs)
+        except CommandError:
+            self._node.getfile(log, self._localdir)
+            logger.error(f'Full log of {lscript.name}: {self._localdir.joinpath(log.name)}')
+            raise
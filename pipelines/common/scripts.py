@@ -53,7 +53,8 @@ def check_deps(
 def set_rpath(
     node: Node,
     elfdir: str | PurePosixPath,
-    libdirs: str | PurePosixPath
+    libdirs: str | PurePosixPath,
+    prune: bool = False
 ) -> CommandResult:
     """
     把 `elfdir` 目录中的所有 elf 文件的 RPATH 设置为 `libdir`（相对路径）。
@@ -61,10 +62,34 @@ def set_rpath(
     :param node: 执行节点。
     :param elfdir: elf 文件目录。
     :param libdirs: 依赖库目录列表（以`:`分割）。
+    :param prune: 是否只保留存放 DT_NEEDED 库的目录，并按命中数排序。
     :return: 脚本输出。
     """
+    mode = 'prune' if prune else 'all'
     return node.exec_script('scripts/set_rpath.sh',
-                            argstr=f'{elfdir} {libdirs}')
+                            argstr=f'{elfdir} {libdirs} {mode}')
+
+
+def count_lib_lookups(
+    node: Node,
+    elfdir: str | PurePosixPath,
+    output: str | PurePosixPath,
+    before: Optional[str | PurePosixPath] = None
+) -> CommandResult:
+    """
+    用 `LD_DEBUG=libs` 统计动态链接器加载 `elfdir` 中每个 elf 文件的依赖时尝试打开的路径数。
+
+    :param node: 执行节点。
+    :param elfdir: elf 文件目录。
+    :param output: 统计结果保存路径。
+    :param before: 之前的统计结果，指定时输出对比，总数变多时失败。
+    :return: 脚本输出。
+    """
+    argstr = f'{elfdir} {output}'
+    if before:
+        argstr += f' {before}'
+    return node.exec_script('scripts/count_lib_lookups.sh',
+                            argstr=argstr)
 
 
 def set_interp(
@@ -84,6 +109,157 @@ def set_interp(
                             argstr=f'{elfdir} {interp}')
 
 
+def split_debuginfo(
+    node: Node,
+    elfdir: str | PurePosixPath,
+    debugdir: str | PurePosixPath
+) -> CommandResult:
+    """
+    剥离 `elfdir` 目录中所有 elf 文件的调试信息，并按 `.build-id/xx/yyyy.debug` 布局保存到 `debugdir`。
+
+    :param node: 执行节点。
+    :param elfdir: elf 文件目录。
+    :param debugdir: 调试信息保存目录。
+    :return: 脚本输出。
+    """
+    return node.exec_script('scripts/split_debuginfo.sh',
+                            argstr=f'{elfdir} {debugdir}')
+
+
+def pkg_size_report(
+    node: Node,
+    directory: str | PurePosixPath,
+    output: str | PurePosixPath,
+    hardlink: bool = False,
+    budget: Optional[int] = None
+) -> CommandResult:
+    """
+    统计 `directory` 的目录占用、最大文件和内容相同的重复文件，并把报告写入 `output`。
+
+    :param node: 执行节点。
+    :param directory: 要统计的目录。
+    :param output: 报告文件路径。
+    :param hardlink: 是否把重复文件替换为硬链接。
+    :param budget: 目录总大小上限（MiB），超出时脚本返回非 0。
+    :return: 脚本输出。
+    """
+    argstr = f'{directory} --output {output}'
+    if hardlink:
+        argstr += ' --hardlink'
+    if budget is not None:
+        argstr += f' --budget {budget}'
+    return node.exec_script('scripts/pkg_size_report.py',
+                            argstr=argstr)
+
+
+def write_manifest(
+    node: Node,
+    directory: str | PurePosixPath,
+    output: str | PurePosixPath,
+    elflist: Optional[str | PurePosixPath] = None
+) -> CommandResult:
+    """
+    把 `directory` 中所有普通文件的 SHA-256 清单（sha256sum 格式，相对路径）写入 `output`。
+
+    :param node: 执行节点。
+    :param directory: 要生成清单的目录。
+    :param output: 清单文件路径。
+    :param elflist: 动态链接 elf 可执行文件列表的保存路径，为空则不生成。
+    :return: 脚本输出。
+    """
+    argstr = f'{directory} {output}'
+    if elflist:
+        argstr += f' {elflist}'
+    return node.exec_script('scripts/write_manifest.sh',
+                            argstr=argstr)
+
+
+def exec_unprivileged(
+    node: Node,
+    user: str,
+    workdir: str | PurePosixPath,
+    script: str,
+    argstr: str = '',
+    envs: Optional[dict[str, str]] = None,
+    helpers: list[str] | tuple[str, ...] = ()
+) -> CommandResult:
+    """
+    把脚本 `script` 及其调用的辅助脚本 `helpers` 上传到 `workdir`/scripts，节点用户为 root 时
+    把 `workdir` 交给 `user` 并以该用户执行，否则直接执行。
+
+    :param node: 执行节点。
+    :param user: root 时降权使用的用户。
+    :param workdir: 工作目录，脚本读写的文件都应在其中。
+    :param script: 本地脚本路径。
+    :param argstr: 脚本参数。
+    :param envs: 环境变量。
+    :param helpers: 本地辅助脚本路径。
+    :return: 脚本输出。
+    """
+    scriptdir = PurePosixPath(workdir).joinpath('scripts')
+    node.exec(f'mkdir -p {scriptdir}')
+    for path in (*helpers, script):
+        node.putfile(path, scriptdir)
+    node.exec(f'chmod +x {scriptdir}/*')
+    rscript = scriptdir.joinpath(PurePosixPath(script).name)
+    return node.exec_script('scripts/run_unprivileged.sh',
+                            argstr=f'{user} {workdir} {rscript} {argstr}',
+                            envs=envs)
+
+
+def bench_pgpool(
+    node: Node,
+    pghome: str | PurePosixPath,
+    pgpoolhome: str | PurePosixPath,
+    output: str | PurePosixPath,
+    user: str,
+    workdir: str | PurePosixPath,
+    duration: int = 20,
+    clients: int = 16
+) -> CommandResult:
+    """
+    启动临时 postgres 实例，分别直连和经 pgpool 运行 pgbench，报告 TPS 和延迟分位数。
+    节点用户为 root 时以 `user` 运行，见 `exec_unprivileged`。
+
+    :param node: 执行节点。
+    :param pghome: postgres 安装目录，应在 `workdir` 中。
+    :param pgpoolhome: pgpool 安装目录，应在 `workdir` 中。
+    :param output: 报告文件路径，应在 `workdir` 中。
+    :param user: root 时降权使用的用户。
+    :param workdir: 工作目录。
+    :param duration: 每轮 pgbench 的时长（秒）。
+    :param clients: pgbench 客户端数。
+    :return: 脚本输出。
+    """
+    return exec_unprivileged(node, user, workdir, 'scripts/bench_pgpool.sh',
+                             argstr=f'{pghome} {pgpoolhome} {output} {duration} {clients}',
+                             helpers=('scripts/pg_cluster.sh',))
+
+
+def profile_startup(
+    node: Node,
+    output: str | PurePosixPath,
+    cmds: list[str] | tuple[str, ...],
+    importtimes: list[str] | tuple[str, ...] = (),
+    runs: int = 10
+) -> CommandResult:
+    """
+    测量命令的启动耗时和峰值 RSS，并汇总 `python -X importtime` 的输出，结果以 JSON 写入 `output`。
+
+    :param node: 执行节点。
+    :param output: 报告文件路径。
+    :param cmds: 要测量的命令。
+    :param importtimes: 要汇总的 `python -X importtime ...` 命令。
+    :param runs: 每个命令的运行次数。
+    :return: 脚本输出。
+    """
+    argstr = f'--output {output} --runs {runs}'
+    argstr += ''.join(f' --cmd {quote(cmd)}' for cmd in cmds)
+    argstr += ''.join(f' --importtime {quote(cmd)}' for cmd in importtimes)
+    return node.exec_script('scripts/profile_startup.py',
+                            argstr=argstr)
+
+
 def _join_colon(items: list[str] | tuple[str, ...]) -> str:
     """
     使用冒号连接参数，并转义条目内部的冒号。
@@ -96,51 +272,232 @@ def wrap_envs(
     node: Node,
     topdir: str | PurePosixPath,
     bins: list[str] | tuple[str, ...],
-    envs: list[str] | tuple[str, ...]
+    envs: list[str] | tuple[str, ...],
+    launcher: Optional[str | PurePosixPath] = None
 ) -> CommandResult:
     """
-    把 `topdir` 下指定的可执行程序替换为 shell 脚本并自动设置环境变量。
+    把 `topdir` 下指定的可执行程序替换为 shell 脚本（或原生 launcher）并自动设置环境变量。
 
     :param node: 执行节点。
     :param topdir: 目标目录。
     :param bins: 需要 wrap 的程序，相对 `topdir`。
     :param envs: 写入 wrapper 的环境变量，格式为 NAME=VALUE。
+    :param launcher: `build_launcher` 编译出的 launcher 路径，为空则使用 shell 脚本。
     :return: 脚本输出。
     """
-    argstr = ' '.join(quote(item)
-                      for item in (str(topdir), _join_colon(bins), _join_colon(envs)))
+    items = [str(topdir), _join_colon(bins), _join_colon(envs)]
+    if launcher:
+        items.append(str(launcher))
+    argstr = ' '.join(quote(item) for item in items)
     return node.exec_script('scripts/wrap_envs.sh',
                             argstr=argstr)
 
 
+def build_launcher(
+    node: Node,
+    output: str | PurePosixPath
+) -> CommandResult:
+    """
+    在节点上编译 `scripts/launcher.c`，生成 wrap_envs 使用的原生 launcher。
+
+    :param node: 执行节点。
+    :param output: launcher 输出路径。
+    :return: 编译输出。
+    """
+    source = node.upload_script('scripts/launcher.c')
+    return node.exec(f'cc -O2 -o {output} {source}')
+
+
+def bench_launcher(
+    node: Node,
+    launcher: str | PurePosixPath,
+    runs: int = 1000
+) -> CommandResult:
+    """
+    对比 shell wrapper 和原生 launcher 的启动耗时。
+
+    :param node: 执行节点。
+    :param launcher: launcher 路径。
+    :param runs: 每种方式的调用次数。
+    :return: 脚本输出，单位为微秒/次。
+    """
+    node.upload_script('scripts/wrap_envs.sh')
+    return node.exec_script('scripts/bench_launcher.sh',
+                            argstr=f'{launcher} {runs}')
+
+
 def copy_python(
     node: Node,
-    destdir: str | PurePosixPath
+    destdir: str | PurePosixPath,
+    excludes: list[str] | tuple[str, ...] = (),
+    zipfile: Optional[str | PurePosixPath] = None
 ) -> CommandResult:
     """
-    把构建环境的 Python 标准库拷贝到 `destdir`。
+    把构建环境的 Python 标准库拷贝到 `destdir`，并预编译为 checked-hash 的 .pyc。
 
     :param node: 执行节点。
     :param destdir: Python 标准库目标目录。
+    :param excludes: 不拷贝的模块，glob 格式，相对标准库目录。
+    :param zipfile: 纯 Python 模块的 zip 保存路径，为空则不打包。
     :return: 脚本输出。
     """
+    items = [str(destdir), ':'.join(excludes)]
+    if zipfile:
+        items.append(str(zipfile))
     return node.exec_script('scripts/copy_python.sh',
-                            argstr=f'{destdir}')
+                            argstr=' '.join(quote(item) for item in items))
 
 
-def copy_perl(
+def bench_plpython(
+    node: Node,
+    pghome: str | PurePosixPath,
+    user: str,
+    workdir: str | PurePosixPath,
+    runs: int = 20
+) -> CommandResult:
+    """
+    测量新 backend 中首次调用 PL/Python 函数的耗时，并与无字节码的只读副本对比。
+    节点用户为 root 时以 `user` 运行，见 `exec_unprivileged`。
+
+    :param node: 执行节点。
+    :param pghome: PostgreSQL 安装目录，应在 `workdir` 中。
+    :param user: root 时降权使用的用户。
+    :param workdir: 工作目录。
+    :param runs: 调用次数，取中位数。
+    :return: 脚本输出，单位为毫秒。
+    """
+    return exec_unprivileged(node, user, workdir, 'scripts/bench_plpython.sh',
+                             argstr=f'{pghome} {runs}',
+                             helpers=('scripts/pg_cluster.sh',))
+
+
+def bench_io_method(
     node: Node,
+    pghome: str | PurePosixPath,
+    output: str | PurePosixPath,
+    user: str,
+    workdir: str | PurePosixPath,
+    data_mb: int = 1024,
+    methods: list[str] | tuple[str, ...] = ('sync', 'worker', 'io_uring'),
+    io_workers: list[int] | tuple[int, ...] = (3, 8),
+    eic: list[int] | tuple[int, ...] = (1, 16, 64),
+    repeat: int = 3
+) -> CommandResult:
+    """
+    用 postgres 启动临时实例，按 io_method、io_workers（仅 worker）和 effective_io_concurrency
+    的组合测量顺序扫描、bitmap heap scan 和 COPY FROM 的耗时，结果以 JSON 写入 `output`。
+    节点用户为 root 时以 `user` 运行，见 `exec_unprivileged`。postgres 没有 io_method 参数时
+    跳过测量，不写入 `output`。
+
+    :param node: 执行节点。
+    :param pghome: postgres 安装目录，应在 `workdir` 中。
+    :param output: 报告文件路径，应在 `workdir` 中。
+    :param user: root 时降权使用的用户。
+    :param workdir: 工作目录。
+    :param data_mb: 测试表大小（MiB），应大于 shared_buffers。
+    :param methods: 要测量的 io_method 取值。
+    :param io_workers: worker 方式要测量的 io_workers 取值。
+    :param eic: 要测量的 effective_io_concurrency 取值。
+    :param repeat: 每个组合的运行次数，取中位数。
+    :return: 脚本输出。
+    """
+    methodstr = quote(' '.join(methods))
+    workerstr = quote(' '.join(str(w) for w in io_workers))
+    eicstr = quote(' '.join(str(e) for e in eic))
+    return exec_unprivileged(node, user, workdir, 'scripts/bench_io_method.sh',
+                             argstr=f'{pghome} {output} {data_mb} {methodstr} {workerstr} {eicstr} {repeat}',
+                             helpers=('scripts/pg_cluster.sh',))
+
+
+def bench_pgvector(
+    node: Node,
+    pghome: str | PurePosixPath,
+    extdir: str | PurePosixPath,
+    output: str | PurePosixPath,
+    user: str,
+    workdir: str | PurePosixPath,
+    rows: int = 100000,
+    dim: int = 128,
+    workers: list[int] | tuple[int, ...] = (0, 2, 4),
+    queries: int = 200
+) -> CommandResult:
+    """
+    把 pgvector 安装到 postgres 的临时副本中启动实例，测量 HNSW 和 IVFFlat 在不同
+    max_parallel_maintenance_workers 下的建索引耗时，以及查询 QPS 和召回率，结果以 JSON 写入 `output`。
+    节点用户为 root 时以 `user` 运行，见 `exec_unprivileged`。
+
+    :param node: 执行节点。
+    :param pghome: postgres 安装目录，应在 `workdir` 中。
+    :param extdir: pgvector 安装目录，其 lib 和 share 覆盖到 `pghome` 的副本上，应在 `workdir` 中。
+    :param output: 报告文件路径，应在 `workdir` 中。
+    :param user: root 时降权使用的用户。
+    :param workdir: 工作目录。
+    :param rows: 随机向量行数。
+    :param dim: 向量维度。
+    :param workers: 要测量的 max_parallel_maintenance_workers 取值。
+    :param queries: 查询次数。
+    :return: 脚本输出。
+    """
+    workerstr = quote(' '.join(str(w) for w in workers))
+    return exec_unprivileged(node, user, workdir, 'scripts/bench_pgvector.sh',
+                             argstr=f'{pghome} {extdir} {output} {rows} {dim} {workerstr} {queries}',
+                             helpers=('scripts/pg_cluster.sh',))
+
+
+def select_test_files(
+    node: Node,
+    srcdir: str | PurePosixPath,
     destdir: str | PurePosixPath
 ) -> CommandResult:
     """
-    把构建环境的 Perl 库目录拷贝到 `destdir`。
+    把编译后的 PostgreSQL 源码树中 installcheck-world 运行时读取的文件复制到 `destdir`，
+    其余文件替换为保留权限和 mtime 的空占位文件。
+
+    :param node: 执行节点。
+    :param srcdir: 编译后的源码目录。
+    :param destdir: 测试树目标目录。
+    :return: 脚本输出。
+    """
+    return node.exec_script('scripts/select_test_files.py',
+                            argstr=f'{srcdir} {destdir}')
+
+
+def copy_perl(
+    node: Node,
+    destdir: str | PurePosixPath,
+    modules: Optional[str | PurePosixPath] = None
+) -> CommandResult:
+    """
+    按 @INC 顺序合并构建环境的 Perl 库目录到 `destdir`，同名文件只拷贝一次。
 
     :param node: 执行节点。
     :param destdir: Perl 库目标目录。
+    :param modules: `trace_perl_modules` 生成的模块列表，为空则拷贝全部模块。
     :return: 脚本输出。
     """
+    argstr = f'{destdir}'
+    if modules:
+        argstr += f' {modules}'
     return node.exec_script('scripts/copy_perl.sh',
-                            argstr=f'{destdir}')
+                            argstr=argstr)
+
+
+def trace_perl_modules(
+    node: Node,
+    output: str | PurePosixPath,
+    paths: list[str | PurePosixPath] | tuple[str | PurePosixPath, ...]
+) -> CommandResult:
+    """
+    编译探测 `paths` 中的 Perl 程序和 TAP 测试并运行一次 prove，把 %INC 中的模块列表写入 `output`。
+    探测运行找不到模块时失败。
+
+    :param node: 执行节点。
+    :param output: 模块列表保存路径。
+    :param paths: 要扫描的 Perl 源码文件或目录。
+    :return: 脚本输出。
+    """
+    return node.exec_script('scripts/trace_perl_modules.sh',
+                            argstr=' '.join(str(item) for item in (output, *paths)))
 
 
 def copy_tcl(
@@ -173,3 +530,126 @@ def copy_runtime_tools(
     """
     return node.exec_script('scripts/copy_runtime_tools.sh',
                             argstr=' '.join([str(destdir), *tools]))
+
+
+def start_sampler(
+    node: Node,
+    output: str | PurePosixPath,
+    interval: int = 2
+) -> CommandResult:
+    """
+    在后台每隔 `interval` 秒采样节点的 CPU、内存、磁盘 I/O 和负载，写入 `output`。
+
+    :param node: 执行节点。
+    :param output: 采样文件路径。
+    :param interval: 采样间隔（秒）。
+    :return: 脚本输出。
+    """
+    return node.exec_script('scripts/sample_resources.sh',
+                            argstr=f'start {output} {interval}')
+
+
+def stop_sampler(
+    node: Node,
+    output: str | PurePosixPath
+) -> CommandResult:
+    """
+    停止 `start_sampler` 启动的采样。
+
+    :param node: 执行节点。
+    :param output: 采样文件路径。
+    :return: 脚本输出。
+    """
+    return node.exec_script('scripts/sample_resources.sh',
+                            argstr=f'stop {output}')
+
+
+def distcc_hosts(
+    node: Node,
+    statedir: str | PurePosixPath,
+    hosts: list[str] | tuple[str, ...],
+    local_jobs: Optional[int] = None
+) -> int:
+    """
+    探测 distcc 编译节点，把可连通的节点保存到 `statedir`，供 `scripts/distcc.sh cc` 使用。
+
+    :param node: 执行节点。
+    :param statedir: distcc 状态目录。
+    :param hosts: 编译节点，格式为 HOST[:PORT][/LIMIT][,OPTIONS]。
+    :param local_jobs: 本机编译和预处理的并发上限，默认为本机 CPU 数。
+    :return: make 并发数：`local_jobs` 加上可连通节点的并发上限。
+    """
+    argstr = ' '.join(quote(str(item)) for item in ('hosts', statedir, *hosts))
+    envs = {'DISTCC_LOCAL_JOBS': str(local_jobs)} if local_jobs else None
+    return int(node.exec_script('scripts/distcc.sh',
+                                argstr=argstr,
+                                envs=envs).splitlines()[-1])
+
+
+def make_jobs(
+    node: Node,
+    mem_per_job: int
+) -> tuple[int, int]:
+    """
+    按 cgroup CPU 配额和可用内存计算 make 并发数。
+
+    :param node: 执行节点。
+    :param mem_per_job: 每个编译任务预留的内存（MiB）。
+    :return: make 的 -j 并发数和 -l 负载上限。
+    """
+    jobs, load = node.exec_script('scripts/make_jobs.sh',
+                                  argstr=f'{mem_per_job}').splitlines()[-1].split()
+    return int(jobs), int(load)
+
+
+def distcc_report(
+    node: Node,
+    statedir: str | PurePosixPath,
+    output: str | PurePosixPath
+) -> CommandResult:
+    """
+    统计在远程节点上编译的编译单元占比，报告写入 `output`。
+
+    :param node: 执行节点。
+    :param statedir: distcc 状态目录。
+    :param output: 报告文件路径。
+    :return: 脚本输出。
+    """
+    return node.exec_script('scripts/distcc.sh',
+                            argstr=f'report {statedir} | tee {output}')
+
+
+def start_prefetch_nixenv(
+    node: Node,
+    statedir: str | PurePosixPath,
+    installable: str,
+    profile: str | PurePosixPath
+) -> CommandResult:
+    """
+    在后台下载 nix 开发环境 `installable` 的闭包，并用 `profile` 作为 GC root 固定。
+
+    :param node: 执行节点。
+    :param statedir: 保存日志和状态的目录。
+    :param installable: 开发环境，如 `~/flakes#devShells.x86_64-linux.postgres`。
+    :param profile: GC root profile 路径。
+    :return: 脚本输出。
+    """
+    return node.exec_script('scripts/prefetch_nixenv.sh',
+                            argstr=f'start {statedir} {installable} {profile}')
+
+
+def wait_prefetch_nixenv(
+    node: Node,
+    statedir: str | PurePosixPath,
+    timeout: int = 3600
+) -> CommandResult:
+    """
+    等待 `start_prefetch_nixenv` 完成，后台进程退出但没有写入状态或超时时失败。
+
+    :param node: 执行节点。
+    :param statedir: 保存日志和状态的目录。
+    :param timeout: 最长等待时间（秒）。
+    :return: 脚本输出（闭包大小和下载耗时）。
+    """
+    return node.exec_script('scripts/prefetch_nixenv.sh',
+                            argstr=f'wait {statedir} {timeout}')
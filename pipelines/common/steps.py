@@ -0,0 +1,255 @@
+"""
+流水线步骤的并发调度。
+"""
+
+import copy
+import hashlib
+import threading
+
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Generator, Optional, Sequence, Union
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, Future, FIRST_COMPLETED, wait
+
+from xflow.framework.node import Node, CommandResult
+
+from .log import logger
+
+
+class StepError(Exception):
+    """
+    步骤执行失败。
+    """
+    def __init__(self, step: str, error: BaseException):
+        """
+        :param step: 失败的步骤名。
+        :param error: 步骤抛出的异常。
+        """
+        super().__init__(f'Step `{step}` failed: {error}')
+        self.step = step
+        self.error = error
+
+
+class Step(object):
+    """
+    流水线步骤。
+    """
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], None],
+        after: Sequence[str] = ()
+    ):
+        """
+        :param name: 步骤名，在同一批步骤中唯一。
+        :param func: 步骤函数。
+        :param after: 依赖的步骤名，这些步骤成功后才会执行本步骤。
+        """
+        self.name = name
+        self.func = func
+        self.after = tuple(after)
+
+
+class NodeView(object):
+    """
+    流水线使用的节点视图，由 `node_view` 创建，是被包装节点所属类的子类。
+
+    `Node` 把工作目录和 nix 环境保存在节点和连接对象上，多线程共用会互相覆盖，`dir` 和
+    `nixenv` 也不能嵌套。视图复制节点的状态，只在自己身上保存这两项，命令的执行仍由 `Node`
+    完成；`thread_view` 为每个步骤线程复制一份视图和连接对象。所属流水线固定为创建时指定的
+    流水线，不再依赖调用栈查找。sftp 操作用所有视图共用的锁串行化；脚本按内容哈希上传，
+    内容变化（如续跑前修改了脚本）时重新上传。
+    """
+    _pipeline: object
+    _lock: threading.RLock
+    _uploaded: Dict[str, str]
+
+    @property
+    def pipeline(self) -> object:
+        """
+        所属流水线。
+        """
+        return self._pipeline
+
+    def thread_view(self) -> 'NodeView':
+        """
+        供步骤线程使用的视图：工作目录和 nix 环境为初始状态，连接对象为独立副本（共用底层连接）。
+        """
+        conn = self._Node__conn
+        conn.open()
+        view = copy.copy(self)
+        view._Node__cwd = PurePosixPath('')
+        view._Node__nixenv = {}
+        view._Node__conn = copy.copy(conn)
+        return view
+
+    @contextmanager
+    def dir(self, path: str | PurePosixPath) -> Generator[None, None, None]:
+        """
+        切换工作目录，可嵌套。
+        """
+        saved = self._Node__cwd
+        try:
+            with super().dir(path):
+                yield
+        finally:
+            self._Node__cwd = saved
+
+    @contextmanager
+    def nixenv(self, *args, **kwargs) -> Generator[None, None, None]:
+        """
+        使用 nix develop 进入一个 nix shell 环境，参数同 `Node.nixenv`，可嵌套。
+        """
+        saved = dict(self._Node__nixenv)
+        try:
+            with super().nixenv(*args, **kwargs):
+                yield
+        finally:
+            self._Node__nixenv = saved
+
+    def upload_script(self, script: str | Path) -> PurePosixPath:
+        """
+        把脚本上传到 `scriptdir`，已上传且内容相同时跳过。
+
+        :param script: 本地脚本路径（相对项目目录）。
+        :return: 远端脚本路径。
+        """
+        lscript = Path(script).absolute()
+        rscript = self.scriptdir.joinpath(lscript.name)
+        digest = hashlib.sha1(lscript.read_bytes()).hexdigest()
+        with self._lock:
+            if self._uploaded.get(str(rscript)) != digest:
+                self._Node__conn.exec(f'mkdir -p {rscript.parent}')
+                super().putfile(lscript, rscript.parent)
+                self._Node__conn.exec(f'chmod +x {rscript}')
+                self._uploaded[str(rscript)] = digest
+        return rscript
+
+    def exec_script(
+        self,
+        script: str | Path,
+        argstr: str = '',
+        envs: Optional[Dict[str, str]] = None
+    ) -> CommandResult:
+        """
+        上传（见 `upload_script`）并执行脚本。
+
+        :raises:
+            `CommandError` -- 返回码不为 0。
+        """
+        rscript = self.upload_script(script)
+        return self.exec(f'{rscript} {argstr}', envs=envs)
+
+    def getfile(self, rfile: Union[str, PurePosixPath], ldir: Union[str, Path]) -> None:
+        """
+        从远端下载文件 `rfile` 到本地目录 `ldir`。
+        """
+        with self._lock:
+            super().getfile(rfile, ldir)
+
+    def putfile(self, lfile: Union[str, Path], rdir: Union[str, PurePosixPath]) -> None:
+        """
+        上传本地文件 `lfile` 到远端目录 `rdir`。
+        """
+        with self._lock:
+            super().putfile(lfile, rdir)
+
+    def exists(self, path: Union[str, PurePosixPath]) -> bool:
+        """
+        检查远端路径是否存在。
+        """
+        with self._lock:
+            return super().exists(path)
+
+
+_view_classes: Dict[type, type] = {}
+
+
+def node_view(node: Node, pipeline: object) -> Node:
+    """
+    创建节点 `node` 的视图，见 `NodeView`。
+
+    :param node: 被包装的节点。
+    :param pipeline: 所属流水线。
+    :return: 视图，是 `node` 所属类的子类的实例。
+    """
+    if isinstance(node, NodeView):
+        return node
+    cls = type(node)
+    if cls not in _view_classes:
+        _view_classes[cls] = type(f'{cls.__name__}View', (NodeView, cls), {})
+    view = copy.copy(node)
+    view.__class__ = _view_classes[cls]
+    view._Node__nixenv = {}
+    view._pipeline = pipeline
+    view._lock = threading.RLock()
+    view._uploaded = {}
+    return view
+
+
+def run_steps(
+    steps: Sequence[Step],
+    node: NodeView,
+    local: threading.local,
+    parallelism: int = 1
+) -> None:
+    """
+    按依赖关系执行步骤，没有依赖关系的步骤在最多 `parallelism` 个线程中并发执行。
+
+    步骤运行期间 `local.node` 为该线程的节点视图（见 `NodeView.thread_view`）。某个步骤失败后
+    不再启动新步骤，等待已启动的步骤结束后抛出 `StepError`。
+
+    :param steps: 步骤列表。
+    :param node: 执行节点的视图。
+    :param local: 保存线程内节点视图的 threading.local。
+    :param parallelism: 最大并发数。
+    :raises:
+        `ValueError` -- 步骤名重复、依赖不存在或存在循环依赖。
+        `StepError` -- 步骤执行失败。
+    """
+    byname = {}
+    for step in steps:
+        if step.name in byname:
+            raise ValueError(f'Duplicate step: {step.name}')
+        byname[step.name] = step
+    for step in steps:
+        for dep in step.after:
+            if dep not in byname:
+                raise ValueError(f'Step `{step.name}` depends on unknown step `{dep}`')
+
+    def run(step: Step) -> None:
+        local.node = node.thread_view()
+        try:
+            logger.info(f' step {step.name} '.center(80, '-'))
+            step.func()
+        finally:
+            del local.node
+
+    pending = list(steps)
+    done = set()
+    running: Dict[Future, Step] = {}
+    failure: Optional[tuple[Step, BaseException]] = None
+    with ThreadPoolExecutor(max_workers=max(parallelism, 1)) as executor:
+        while pending or running:
+            if failure is None:
+                for step in [s for s in pending if set(s.after) <= done]:
+                    if len(running) >= max(parallelism, 1):
+                        break
+                    pending.remove(step)
+                    running[executor.submit(run, step)] = step
+            if not running:
+                if failure is None:
+                    names = ', '.join(s.name for s in pending)
+                    raise ValueError(f'Circular step dependencies: {names}')
+                break
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                step = running.pop(future)
+                error = future.exception()
+                if error is None:
+                    done.add(step.name)
+                elif failure is None:
+                    failure = (step, error)
+    if failure is not None:
+        step, error = failure
+        raise StepError(step.name, error) from error
@@ -1,16 +1,39 @@
+import re
+
 from typing import Optional, Generator
 from functools import cached_property
 from contextlib import contextmanager
 
+from typing_extensions import Self
+
 from xflow.framework.pipeline import Pipeline
 
 from .common.pack import pack, pack_python, pack_pgceco
+from .common.scripts import profile_startup
+
+from pydantic import model_validator
 
 
 class pack_patroni(pack_python, pack_pgceco):
     """
     patroni 打包流程。
     """
+    # DCS 后端及其依赖的第三方包（延迟加载时一起编译进模块包）。
+    dcs_backends = {
+        'consul': ('consul',),
+        'etcd': ('etcd', 'dns'),
+        'etcd3': ('etcd', 'dns'),
+        'exhibitor': ('kazoo',),
+        'kubernetes': (),
+        'raft': ('pysyncobj',),
+        'zookeeper': ('kazoo',),
+    }
+    # 依赖其他后端的 DCS 后端。
+    dcs_requires = {
+        'etcd3': ('etcd',),
+        'exhibitor': ('zookeeper',),
+    }
+
     class Options(pack_python.Options, pack_pgceco.Options):
         """
         流水线参数表。
@@ -19,6 +42,25 @@ class pack_patroni(pack_python, pack_pgceco):
                                        default='https://github.com/patroni/patroni.git')
         progname: str = Pipeline.Option(desc='Program name.',
                                         default='patroni')
+        nuitka_cache_dir: Optional[str] = Pipeline.Option(desc='Persistent Nuitka/ccache cache directory on the node '
+                                                               '(default ~/.cache/pgflow/nuitka/SYSTEM).')
+        dcs: str = Pipeline.Option(desc='Colon separated DCS backends to ship.',
+                                   default='consul:etcd:etcd3:exhibitor:kubernetes:raft:zookeeper')
+        dcs_lazy: bool = Pipeline.Option(desc='Build each DCS backend as a separate extension module '
+                                              'loaded on first use instead of compiling it into patroni.',
+                                         default=False)
+        startup_profile: bool = Pipeline.Option(desc='Profile startup time, RSS and imports of patroni and patronictl.',
+                                                default=True)
+
+        @model_validator(mode='after')
+        def check_dcs(self) -> Self:
+            """
+            检查 DCS 后端名称。
+            """
+            for name in self.dcs.split(':'):
+                if name not in pack_patroni.dcs_backends:
+                    raise ValueError(f'Unknown DCS backend: {name}')
+            return self
 
     def setup(self) -> None:
         """
@@ -27,6 +69,12 @@ class pack_patroni(pack_python, pack_pgceco):
         self.options: __class__.Options  # 保留用于自动提示
         super().setup()
 
+        self.dcs = []
+        for name in self.options.dcs.split(':'):
+            for dep in (*self.dcs_requires.get(name, ()), name):
+                if dep not in self.dcs:
+                    self.dcs.append(dep)
+
     def stage1(self) -> None:
         """
         拉取代码。
@@ -34,37 +82,49 @@ class pack_patroni(pack_python, pack_pgceco):
         self.node.git(self.options.repourl,
                       self.options.revision,
                       directory=self.codedir)
+        if self.options.dcs_lazy:
+            with self.nixenv():
+                self.node.exec_script('scripts/patch_patroni_dcs_path.py',
+                                      argstr=f'{self.codedir}')
         self.install_postgres(self.pgdir)
 
     def stage2(self) -> None:
         """
         编译。
         """
+        cachedir = self.options.nuitka_cache_dir or f'~/.cache/pgflow/nuitka/{self.options.system}'
+        self.node.exec(f'mkdir -p {cachedir}/ccache')
         with self.node.dir(self.codedir):
-            with self.nixenv():
-                self.node.exec('pip install psycopg2 nuitka')
+            with self.nixenv(f'-s NUITKA_CACHE_DIR {cachedir} -s CCACHE_DIR {cachedir}/ccache'):
+                self.node.exec('pip install psycopg2 "nuitka>=2.0"')
                 self.node.exec('pip install -r $( [ -f requirements.txt ] && echo "requirements.txt" || echo "install_deps.txt" )')
+                # 两个入口共用一次编译和一个 dist，运行时按程序名选择入口。
                 self.node.exec('python -m nuitka '
                                '--mode=standalone '
+                               '--jobs=`nproc` '
                                '--output-filename=patroni '
-                               '--include-module=patroni.dcs.consul '
-                               '--include-module=patroni.dcs.etcd '
-                               '--include-module=patroni.dcs.etcd3 '
-                               '--include-module=patroni.dcs.exhibitor '
-                               '--include-module=patroni.dcs.kubernetes '
-                               '--include-module=patroni.dcs.raft '
-                               '--include-module=patroni.dcs.zookeeper '
+                               '--main=patroni.py '
+                               '--main=patronictl.py '
+                               f'{self.dcs_nuitka_options}'
                                '--include-module=http.server '
-                               '--include-data-dir=patroni/postgresql/available_parameters/=patroni/postgresql/available_parameters/ '
-                               'patroni.py')
-                self.node.exec('python -m nuitka '
-                               '--mode=standalone '
-                               '--output-filename=patronictl '
-                               'patronictl.py')
+                               '--include-data-dir=patroni/postgresql/available_parameters/=patroni/postgresql/available_parameters/ ')
+                if self.options.dcs_lazy:
+                    for name in self.dcs:
+                        self.node.exec('python -m nuitka '
+                                       '--mode=module '
+                                       '--jobs=`nproc` '
+                                       '--output-dir=dcs_modules '
+                                       f'{"".join(f"--follow-import-to={pkg} " for pkg in self.dcs_backends[name])}'
+                                       f'patroni/dcs/{name}.py')
+                self.node.exec('ccache --show-stats || true')
             self.node.exec(f'mkdir -p {self.instdir}/{{bin,lib}}')
             self.node.exec(f'cp -r patroni.dist/* {self.instdir}/lib/')
-            self.node.exec(f'cp -r patronictl.dist/* {self.instdir}/lib/')
+            if self.options.dcs_lazy:
+                # lib/patroni 是主程序，模块包放在 lib/dcs，由 patch_patroni_dcs_path.py 加入 patroni.dcs 的搜索路径。
+                self.node.exec(f'mkdir -p {self.instdir}/lib/dcs')
+                self.node.exec(f'cp dcs_modules/*.so {self.instdir}/lib/dcs/')
         with self.node.dir(self.instdir):
+            self.node.exec('ln -f lib/patroni lib/patronictl')
             self.node.exec('cd bin && ln -s ../lib/patroni . && ln -s ../lib/patronictl .')
 
     def stage3(self) -> None:
@@ -72,8 +132,12 @@ class pack_patroni(pack_python, pack_pgceco):
         打包。
         """
         self.copy_deps(self.instdir)
+        self.split_debuginfo(self.instdir)
         self.copy_instscript(self.packdir)
         self.archive(self.packdir, self.pkgname)
+        self.check_dcs_imports()
+        if self.options.startup_profile:
+            self.profile_startup()
 
     def teardown(self) -> None:
         """
@@ -81,6 +145,58 @@ class pack_patroni(pack_python, pack_pgceco):
         """
         super().teardown()
 
+    @property
+    def dcs_nuitka_options(self) -> str:
+        """
+        控制 DCS 后端编译方式的 nuitka 参数：编译进主程序的用 --include-module，其余的不跟随导入。
+        """
+        options = ''
+        for name in self.dcs_backends:
+            if name in self.dcs and not self.options.dcs_lazy:
+                options += f'--include-module=patroni.dcs.{name} '
+            else:
+                options += f'--nofollow-import-to=patroni.dcs.{name} '
+        return options
+
+    def check_dcs_imports(self) -> None:
+        """
+        确认用 install.sh 安装的主包能导入每个打包的 DCS 后端。
+        配置中没有 DCS 时 patronictl 会导入全部后端，并在报错中列出导入成功的实现。
+        """
+        with self.scratch('check_dcs') as workdir:
+            patronihome = workdir.joinpath('patroni')
+            self.install_package(self.pkgname, patronihome)
+            config = workdir.joinpath('patronictl.yml')
+            self.node.exec(f'echo "scope: pgflow" > {config}')
+            output = self.node.exec(f'{patronihome}/bin/patronictl -c {config} list 2>&1 || true')
+        match = re.search(r'^Available implementations: (.*)$', output, re.MULTILINE)
+        available = match.group(1).split(', ') if match else []
+        missing = [name for name in self.dcs if name not in available]
+        if missing:
+            raise RuntimeError(f'DCS backends not importable from the installed patroni: '
+                               f'{", ".join(missing)}\n{output}')
+
+    def profile_startup(self) -> None:
+        """
+        测量打包后 patroni/patronictl 的启动耗时和 RSS，并在源码上运行 `-X importtime`。
+        copy_deps 之后 instdir 中的程序使用相对路径的解释器，测量的是用 install.sh 安装到临时目录的主包。
+        """
+        reportname = self.pkgname.removesuffix('.tar.gz') + '.startup.json'
+        report = self.node.cwd.joinpath(reportname)
+        with self.scratch('profile_startup') as workdir:
+            patronihome = workdir.joinpath('patroni')
+            self.install_package(self.pkgname, patronihome)
+            bindir = patronihome.joinpath('bin')
+            with self.node.dir(self.codedir):
+                with self.nixenv():
+                    profile_startup(self.node,
+                                    report,
+                                    (f'{bindir}/patroni --version',
+                                     f'{bindir}/patronictl --help'),
+                                    importtimes=('python -X importtime patroni.py --version',
+                                                 'python -X importtime patronictl.py --help'))
+        self.node.getfile(report, self.cwd)
+
     @contextmanager
     def nixenv(self, options: Optional[str] = None) -> Generator[None, None, None]:
         """
@@ -20,7 +20,8 @@ from pydantic import model_validator
 from typing_extensions import Self
 from xflow.framework.pipeline import Pipeline
 
-from .common.pack import pack_pgceco
+from .common.pack import pack, pack_pgceco
+from .common.scripts import bench_pgvector
 
 
 EXT_REPOURLS = {
@@ -45,6 +46,17 @@ class pack_pgext(pack_pgceco):
                                         choices=tuple(EXT_REPOURLS.keys()),
                                         default='pgvector')
         repourl: Optional[str] = Pipeline.Option(desc='Repository URL.')
+        bench: bool = Pipeline.Option(desc='Benchmark pgvector index builds and queries (pgvector only).',
+                                      default=False)
+        bench_rows: int = Pipeline.Option(desc='Number of random vectors in the pgvector benchmark.',
+                                          default=100000)
+        bench_dim: int = Pipeline.Option(desc='Vector dimension in the pgvector benchmark.',
+                                         default=128)
+        bench_workers: str = Pipeline.Option(desc='Space separated max_parallel_maintenance_workers settings '
+                                                  'to build indexes with in the pgvector benchmark.',
+                                             default='0 2 4')
+        bench_queries: int = Pipeline.Option(desc='Number of queries for QPS and recall in the pgvector benchmark.',
+                                             default=200)
 
         @model_validator(mode='after')
         def default_repourl(self) -> Self:
@@ -89,14 +101,15 @@ class pack_pgext(pack_pgceco):
                     self.node.exec(f'./configure {configure_options}')
                 # make
                 if self.options.progname == 'pgroonga':
-                    self.node.exec('make -j `nproc` HAVE_MSGPACK=1')
+                    self.node.exec(f'make {self.make_options} HAVE_MSGPACK=1')
                 else:
-                    self.node.exec('make -j `nproc`')
+                    self.node.exec(f'make {self.make_options}')
                 # make install
                 self.node.exec(f'make install USE_PGXS=1 DESTDIR={self.destdir}')
         self.node.exec(f'cp -r {self.real_instdir}/* {self.instdir}')
         if self.options.progname == 'postgis':
             self.node.exec(f'if [[ -d {self.destdir}/usr/local/bin ]]; then mv {self.destdir}/usr/local/bin {self.instdir}; fi')
+        self.report_distcc()
 
     def stage3(self) -> None:
         """
@@ -116,9 +129,42 @@ class pack_pgext(pack_pgceco):
                        excludedirs=f'{self.pgdir}/lib:{self.pgdir}/lib/copied',
                        copyinterp=False,
                        checkdeps=False)
+        self.split_debuginfo(self.instdir)
         self.copy_instscript(self.packdir)
         self.archive(self.packdir, self.pkgname)
 
+    def stage4(self) -> None:
+        """
+        性能测试（仅 pgvector）。
+        """
+        if not self.options.bench or self.options.progname != 'pgvector':
+            return
+        reportname = self.pkgname.removesuffix('.tar.gz') + '.bench.json'
+        report = self.node.cwd.joinpath(reportname)
+        # instdir 中的程序不能直接运行，两个包都用 install.sh 安装到临时目录后测试。
+        with self.scratch('bench_pgvector') as workdir:
+            pghome = workdir.joinpath('pghome')
+            extdir = workdir.joinpath('pgvector')
+            output = workdir.joinpath(reportname)
+            self.install_postgres(pghome)
+            self.install_package(self.pkgname, extdir)
+            with pack.nixenv(self):
+                bench_pgvector(self.node,
+                               pghome,
+                               extdir,
+                               output,
+                               self.options.unprivileged_user,
+                               workdir,
+                               rows=self.options.bench_rows,
+                               dim=self.options.bench_dim,
+                               workers=[int(w) for w in self.options.bench_workers.split()],
+                               queries=self.options.bench_queries)
+            # bench_pgvector.sh 没有跳过的情况，没有报告说明测试出错。
+            if not self.node.exists(output):
+                raise RuntimeError(f'pgvector benchmark wrote no report to {output}')
+            self.node.exec(f'cp {output} {report}')
+        self.node.getfile(report, self.cwd)
+
     def teardown(self) -> None:
         """
         后置步骤。
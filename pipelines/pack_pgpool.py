@@ -1,8 +1,11 @@
 from functools import cached_property
 from typing_extensions import Self
 
+from pathlib import PurePosixPath
+
 from xflow.framework.pipeline import Pipeline
-from .common.pack import pack_pgceco
+from .common.pack import pack, pack_pgceco
+from .common.scripts import bench_pgpool
 
 from pydantic import model_validator
 
@@ -19,6 +22,14 @@ class pack_pgpool(pack_pgceco):
                                        default='https://github.com/pgpool/pgpool2.git')
         progname: str = Pipeline.Option(desc='Program name.',
                                         default='pgpool')
+        build_profile: str = Pipeline.Option(desc='Compiler optimization profile: stock flags, LTO, '
+                                                  'or LTO plus PGO trained with pgbench through pgpool.',
+                                             default='default',
+                                             choices=('default', 'lto', 'pgo'))
+        bench: bool = Pipeline.Option(desc='Benchmark pgbench through pgpool against direct connections.',
+                                      default=True)
+        bench_duration: int = Pipeline.Option(desc='Seconds per pgbench run in the benchmark stage.',
+                                              default=20)
         
         @model_validator(mode='after')
         def default_configure_options(self) -> Self:
@@ -57,18 +68,113 @@ class pack_pgpool(pack_pgceco):
         with self.node.dir(self.codedir):
             with self.nixenv():
                 self.node.exec('autoreconf -fi')
-                self.node.exec(f'./configure {self.configure_options}')
-                self.node.exec('make -j`nproc`')
-                self.node.exec('make install')
+                if self.options.build_profile != 'pgo':
+                    self.build()
+        if self.options.build_profile == 'pgo':
+            # 先编译插桩版本，用 pgbench 经 pgpool 的流量生成 profile，再重新编译。
+            with self.scratch('pgo') as workdir:
+                pgodir = workdir.joinpath('profile')
+                with self.node.dir(self.codedir):
+                    with self.nixenv():
+                        self.build(f'-fprofile-generate={pgodir} -fprofile-update=atomic')
+                self.train_pgo(workdir, pgodir)
+                with self.node.dir(self.codedir):
+                    with self.nixenv():
+                        self.node.exec('make clean')
+                        self.build(f'-fprofile-use={pgodir} -fprofile-partial-training')
+        self.report_distcc()
 
     def stage3(self) -> None:
         """
         打包。
         """
         self.copy_deps(self.instdir)
+        self.split_debuginfo(self.instdir)
         self.copy_instscript(self.packdir)
         self.archive(self.packdir, self.pkgname)
 
+    def stage4(self) -> None:
+        """
+        性能测试。
+        """
+        if not self.options.bench:
+            return
+        reportname = self.pkgname.removesuffix('.tar.gz') + '.bench.txt'
+        report = self.node.cwd.joinpath(reportname)
+        with self.scratch('bench_pgpool') as workdir:
+            pghome = workdir.joinpath('pghome')
+            pgpoolhome = workdir.joinpath('pgpool')
+            output = workdir.joinpath(reportname)
+            self.install_postgres(pghome)
+            self.install_package(self.pkgname, pgpoolhome)
+            # 安装后的两个包都自带依赖，不需要 pgdir 的 PATH 和 LD_LIBRARY_PATH。
+            with pack.nixenv(self):
+                bench_pgpool(self.node,
+                             pghome,
+                             pgpoolhome,
+                             output,
+                             self.options.unprivileged_user,
+                             workdir,
+                             duration=self.options.bench_duration)
+            # bench_pgpool.sh 没有跳过的情况，没有报告说明测试出错。
+            if not self.node.exists(output):
+                raise RuntimeError(f'pgpool benchmark wrote no report to {output}')
+            self.node.exec(f'cp {output} {report}')
+        self.node.getfile(report, self.cwd)
+
+    def train_pgo(self, workdir: PurePosixPath, pgodir: PurePosixPath) -> None:
+        """
+        用 instdir 中的插桩版本运行 pgbench 生成 PGO profile。postgres 包和 instdir 的副本放在
+        临时目录 `workdir` 中，节点用户为 root 时以 unprivileged_user 运行；没有生成 profile 数据时报错，
+        避免 PGO 悄悄退化为只做 LTO。
+
+        :param workdir: 临时目录，见 `scratch`。
+        :param pgodir: profile 目录，应在 `workdir` 中。
+        """
+        pghome = workdir.joinpath('pghome')
+        pgpoolhome = workdir.joinpath('pgpool')
+        self.install_postgres(pghome)
+        self.node.exec(f'mkdir -p {pgodir} && cp -a {self.instdir} {pgpoolhome}')
+        # 插桩版本的 libpq 来自 LD_LIBRARY_PATH，改为临时目录中的 postgres。
+        with pack.nixenv(self, options=f'-s LD_LIBRARY_PATH {pghome}/lib'):
+            bench_pgpool(self.node,
+                         pghome,
+                         pgpoolhome,
+                         workdir.joinpath('pgo-training.txt'),
+                         self.options.unprivileged_user,
+                         workdir,
+                         duration=10)
+        if not self.node.exec(f'find {pgodir} -name "*.gcda" | head -1'):
+            raise RuntimeError(f'PGO training wrote no profile data to {pgodir}')
+
+    def build(self, flags: str = '') -> None:
+        """
+        按 build_profile 配置、编译并安装，需在代码目录和 nix 环境中调用。
+
+        :param flags: 额外的编译和链接参数（PGO）。
+        """
+        if self.options.build_profile in ('lto', 'pgo'):
+            flags = f'-flto=auto {flags}'
+        configure_options = self.configure_options
+        if flags:
+            configure_options += f' CFLAGS="-O2 -g {flags}" LDFLAGS="{flags}"'
+        self.node.exec(f'./configure {configure_options}')
+        if '-fprofile-use' in flags:
+            # 远程节点上没有 profile 数据，PGO 优化编译只能在本机进行。
+            self.node.exec(f'make {self.local_make_options}')
+        else:
+            self.node.exec(f'make {self.make_options}')
+        self.node.exec('make install')
+
+    @property
+    def make_job_memory(self) -> int:
+        """
+        每个编译任务预留的内存（MiB），LTO 链接时整体优化更耗内存。
+        """
+        if self.options.build_profile in ('lto', 'pgo'):
+            return 2048
+        return 1024
+
     def teardown(self) -> None:
         """
         后置步骤。
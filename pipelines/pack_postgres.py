@@ -4,7 +4,11 @@ from typing_extensions import Self
 
 from xflow.framework.pipeline import Pipeline
 from .common.pack import pack_c
-from .common.scripts import copy_perl, copy_python, copy_runtime_tools, copy_tcl, wrap_envs
+from .common.steps import Step
+from .common.scripts import (bench_io_method, bench_launcher, bench_plpython, build_launcher,
+                             copy_perl, copy_python, copy_runtime_tools, copy_tcl, select_test_files,
+                             trace_perl_modules, wrap_envs, write_manifest)
+from .common.log import logger
 
 from pydantic import model_validator
 
@@ -25,6 +29,44 @@ class pack_postgres(pack_c):
                                             default='postgres')
         include_tests: bool = Pipeline.Option(desc='Include PostgreSQL regression tests.',
                                               default=True)
+        native_launcher: bool = Pipeline.Option(desc='Wrap runtime programs with the native launcher '
+                                                     'instead of /bin/sh scripts.',
+                                                default=True)
+        bench_launcher: bool = Pipeline.Option(desc='Compare the startup latency of the native launcher '
+                                                    'and /bin/sh wrappers.',
+                                               default=False)
+        python_excludes: str = Pipeline.Option(desc='Colon separated stdlib modules (glob, relative to '
+                                                    'the stdlib directory) left out of the PL/Python runtime.',
+                                               default='test:idlelib:tkinter:turtle.py:turtledemo:'
+                                                       'ensurepip:lib2to3:pydoc_data:__phello__:'
+                                                       'config-*:lib-dynload/_test*:lib-dynload/_tkinter*:'
+                                                       'lib-dynload/xxlimited*')
+        python_zip: bool = Pipeline.Option(desc='Ship the pure Python stdlib modules as a zip on PYTHONPATH.',
+                                           default=False)
+        bench_plpython: bool = Pipeline.Option(desc='Measure the first PL/Python call on an installed copy of the package.',
+                                               default=True)
+        verify_tests: bool = Pipeline.Option(desc='Run installcheck-world from the archived test package against '
+                                                  'an installed copy of the package.',
+                                             default=False)
+        perl_prune: bool = Pipeline.Option(desc='Only bundle the Perl modules loaded by PL/Perl '
+                                                '(and the TAP framework with include_tests).',
+                                           default=False)
+        bench_io: bool = Pipeline.Option(desc='Benchmark sequential scans, bitmap heap scans and COPY for each '
+                                              'io_method on an installed copy of the package.',
+                                         default=False)
+        bench_io_data_mb: int = Pipeline.Option(desc='Table size in MiB for the io_method benchmark, '
+                                                     'larger than shared_buffers (128MB).',
+                                                default=1024)
+        bench_io_methods: str = Pipeline.Option(desc='Space separated io_method settings to benchmark '
+                                                     '(io_uring needs --with-liburing).',
+                                                default='sync worker io_uring')
+        bench_io_workers: str = Pipeline.Option(desc='Space separated io_workers settings for io_method=worker.',
+                                                default='3 8')
+        bench_io_eic: str = Pipeline.Option(desc='Space separated effective_io_concurrency settings.',
+                                            default='1 16 64')
+        bench_io_repeat: int = Pipeline.Option(desc='Runs per setting in the io_method benchmark, '
+                                                    'the median is reported.',
+                                               default=3)
         
         @model_validator(mode='after')
         def default_configure_options(self) -> Self:
@@ -87,40 +129,98 @@ class pack_postgres(pack_c):
         with self.node.dir(self.codedir):
             with self.nixenv():
                 self.node.exec(f'./configure {self.configure_options}')
-                self.node.exec('make world -j`nproc`')
+                self.node.exec(f'make world {self.make_options}')
                 if self.options.include_tests:
                     self.node.exec('make -C src/interfaces/libpq/test all')
                     self.node.exec('make -C src/interfaces/ecpg/test all')
                 self.node.exec('make install-world')
+        self.report_distcc()
 
     def stage3(self) -> None:
         """
         打包。
         """
-        self.copy_deps()
-        self.copy_instscript(self.packdir)
-        self.archive(self.packdir, self.pkgname)
+        steps = [
+            Step('copy_deps', self.copy_deps),
+            Step('split_debuginfo',
+                 lambda: self.split_debuginfo(self.instdir),
+                 after=['copy_deps']),
+            Step('copy_instscript',
+                 lambda: self.copy_instscript(self.packdir),
+                 after=['split_debuginfo']),
+            Step('archive',
+                 lambda: self.archive(self.packdir, self.pkgname),
+                 after=['copy_instscript']),
+        ]
+        if self.options.bench_plpython and '--with-python' in self.configure_options:
+            steps.append(Step('bench_plpython', self.bench_plpython, after=['archive']))
+        # 测试包与主包互不依赖。
         if self.options.include_tests:
-            self.copy_tests()
-            self.archive(self.testsdir, self.tests_pkgname)
+            steps.extend((
+                Step('copy_tests', self.copy_tests),
+                Step('archive_tests',
+                     lambda: self.archive(self.testsdir, self.tests_pkgname),
+                     after=['copy_tests']),
+            ))
+            if self.options.verify_tests:
+                steps.append(Step('verify_tests', self.verify_tests, after=['archive', 'archive_tests']))
+        # 性能测试放在最后，不与其他步骤争用 CPU 和磁盘。
+        if self.options.bench_io:
+            steps.append(Step('bench_io', self.bench_io, after=[s.name for s in steps]))
+        self.run_steps(steps)
+
+    def bench_plpython(self) -> None:
+        """
+        测量打包后 PL/Python 的首次调用耗时。在临时目录中用 install.sh 安装主包后测量，
+        节点用户为 root 时以 unprivileged_user 运行。
+        """
+        with self.scratch('bench_plpython') as workdir:
+            pghome = workdir.joinpath('pghome')
+            self.install_package(self.pkgname, pghome)
+            with self.nixenv():
+                bench_plpython(self.node, pghome, self.options.unprivileged_user, workdir)
+
+    def bench_io(self) -> None:
+        """
+        在打包后的 postgres 上对比各 io_method 的扫描和 COPY 耗时，报告按目标系统命名。
+        主包用 install.sh 安装到临时目录后测量，节点用户为 root 时以 unprivileged_user 运行。
+        """
+        methods = self.options.bench_io_methods.split()
+        if '--with-liburing' not in self.configure_options and 'io_uring' in methods:
+            logger.info('Skip io_method=io_uring: built without --with-liburing')
+            methods.remove('io_uring')
+        reportname = self.pkgname.removesuffix('.tar.gz') + '.io_method.json'
+        report = self.node.cwd.joinpath(reportname)
+        with self.scratch('bench_io') as workdir:
+            pghome = workdir.joinpath('pghome')
+            output = workdir.joinpath(reportname)
+            self.install_package(self.pkgname, pghome)
+            with self.nixenv():
+                result = bench_io_method(self.node,
+                                         pghome,
+                                         output,
+                                         self.options.unprivileged_user,
+                                         workdir,
+                                         data_mb=self.options.bench_io_data_mb,
+                                         methods=methods,
+                                         io_workers=[int(w) for w in self.options.bench_io_workers.split()],
+                                         eic=[int(e) for e in self.options.bench_io_eic.split()],
+                                         repeat=self.options.bench_io_repeat)
+            if not self.node.exists(output):
+                if 'skip: this PostgreSQL has no io_method setting' not in result:
+                    raise RuntimeError(f'io_method benchmark wrote no report to {output}')
+                logger.warning(f'Skip io_method benchmark report: PostgreSQL {self.version} has no io_method setting')
+                return
+            self.node.exec(f'cp {output} {report}')
+        self.node.getfile(report, self.cwd)
 
     def copy_tests(self) -> None:
         """
         复制 PostgreSQL 回归测试树、测试工具和包内测试入口。
         """
         test_srcdir = self.testsdir.joinpath('src')
-        self.node.exec(f'mkdir -p {test_srcdir}')
-        with self.node.dir(self.codedir):
-            self.node.exec(f'tar '
-                           f'--exclude=.git '
-                           f'--exclude="*.c" '
-                           f'--exclude=tmp_check '
-                           f'--exclude=tmp_install '
-                           f'--exclude=src/test/regress/results '
-                           f'--exclude=src/test/regress/log '
-                           f'--exclude=src/test/isolation/results '
-                           f'--exclude=src/test/isolation/output_iso '
-                           f'-cf - . | tar -C {test_srcdir} -xf -')
+        with self.nixenv():
+            select_test_files(self.node, self.codedir, test_srcdir)
         self.node.putfile('scripts/run_postgres_tests.sh', self.testsdir)
         self.node.exec(f'mv {self.testsdir.joinpath("run_postgres_tests.sh")} '
                        f'{self.testsdir.joinpath("run.sh")}')
@@ -134,9 +234,11 @@ class pack_postgres(pack_c):
             'prove',
             'zstd',
         ))
-        test_perldir = self.testsdir.joinpath('lib/copied/perl')
-        with self.nixenv():
-            copy_perl(self.node, test_perldir)
+        # 服务端包含 Perl 库时由 run.sh 链接到 PGHOME 中的同一份库。
+        if '--with-perl' not in self.configure_options:
+            test_perldir = self.testsdir.joinpath('lib/copied/perl')
+            with self.nixenv():
+                copy_perl(self.node, test_perldir, self.perl_modules)
         super().copy_deps(self.testsdir)
         self.copy_patchelf(self.testsdir)
         test_envs = [
@@ -155,6 +257,28 @@ class pack_postgres(pack_c):
         self.node.exec(f'find {ecpg_testdir} -type f -exec touch {{}} +')
         self.node.exec(f'find {ecpg_testdir} -type f -perm -111 -exec touch {{}} +')
         self.node.exec(f'find {self.testsdir} -type f -name "*.c" -delete')
+        # run.sh 以测试树的内容哈希作为结果缓存的键，需在测试树定型后生成。
+        manifest = self.node.cwd.joinpath('tests.manifest.sha256')
+        with self.nixenv():
+            write_manifest(self.node, self.testsdir, manifest)
+        self.node.exec(f'mkdir -p {self.testsdir.joinpath(".pgflow")}')
+        self.node.exec(f'mv {manifest} {self.testsdir.joinpath(".pgflow/manifest.sha256")}')
+
+    def verify_tests(self) -> None:
+        """
+        用打包后的测试树对打包后的 postgres 运行 installcheck-world，确认裁剪后的测试树可用。
+        与用户的用法相同：主包用 install.sh 安装、测试包解压到临时目录后运行，
+        节点用户为 root 时以 unprivileged_user 运行。
+        """
+        with self.scratch('verify_tests') as workdir:
+            pghome = workdir.joinpath('pghome')
+            testsdir = workdir.joinpath('tests')
+            self.install_package(self.pkgname, pghome)
+            self.install_package(self.tests_pkgname, testsdir)
+            self.node.exec_script('scripts/run_unprivileged.sh',
+                                  argstr=f'{self.options.unprivileged_user} {workdir} '
+                                         f'{testsdir.joinpath("run.sh")} {pghome}',
+                                  envs={'PGFLOW_TEST_WORKDIR': str(workdir.joinpath('run'))})
 
     def copy_deps(self) -> None:
         """
@@ -162,30 +286,37 @@ class pack_postgres(pack_c):
         """
         elfdir = PurePosixPath(self.instdir)
         pythondir = None
+        pythonzip = None
         perldir = None
         tcldir = None
         with self.nixenv():
             if '--with-perl' in self.configure_options:
                 perldir = elfdir.joinpath('lib/copied/perl')
-                copy_perl(self.node, perldir)
+                copy_perl(self.node, perldir, self.perl_modules)
             if '--with-python' in self.configure_options:
                 pythondir = elfdir.joinpath('lib/copied/python')
-                copy_python(self.node, pythondir)
+                if self.options.python_zip:
+                    pythonzip = elfdir.joinpath('lib/copied/python.zip')
+                copy_python(self.node,
+                            pythondir,
+                            excludes=self.options.python_excludes.split(':'),
+                            zipfile=pythonzip)
             if '--with-tcl' in self.configure_options:
                 tcldir = elfdir.joinpath('lib/copied/tcl')
                 copy_tcl(self.node, tcldir)
             copy_runtime_tools(self.node, elfdir, ('locale',))
 
-        super().copy_deps(elfdir,
-                          copylocales=True)
         envs = [
             'PATH=$TOPDIR/bin:$PATH',
             'LOCALE_ARCHIVE=$TOPDIR/lib/copied/locale-archive',
         ]
         if pythondir is not None:
+            pythonpath = '$TOPDIR/lib/copied/python:$TOPDIR/lib/copied/python/lib-dynload'
+            if pythonzip is not None:
+                pythonpath = f'$TOPDIR/lib/copied/python.zip:{pythonpath}'
             envs.extend((
                 'PYTHONHOME=$TOPDIR/lib/copied/python',
-                'PYTHONPATH=$TOPDIR/lib/copied/python:$TOPDIR/lib/copied/python/lib-dynload',
+                f'PYTHONPATH={pythonpath}',
             ))
         if perldir is not None:
             envs.append('PERL5LIB=$TOPDIR/lib/copied/perl')
@@ -194,10 +325,41 @@ class pack_postgres(pack_c):
                 'TCL_LIBRARY=$TOPDIR/lib/copied/tcl',
                 'TCLLIBPATH=$TOPDIR/lib/copied/tcl',
             ))
+        launcher = None
+        if self.options.native_launcher:
+            launcher = self.node.cwd.joinpath('pgflow-launcher')
+            with self.nixenv():
+                build_launcher(self.node, launcher)
+                if self.options.bench_launcher:
+                    bench_launcher(self.node, launcher)
+        # 先 wrap 再拷贝依赖，launcher 本身也需要设置 rpath 和 interpreter。
         wrap_envs(self.node,
                   elfdir,
                   self.runtime_env_bins,
-                  envs)
+                  envs,
+                  launcher=launcher)
+        super().copy_deps(elfdir,
+                          copylocales=True)
+
+    @cached_property
+    def perl_modules(self) -> PurePosixPath | None:
+        """
+        PL/Perl 和 TAP 测试框架实际加载的 Perl 模块列表，未开启 perl_prune 时为 None。
+        """
+        if not self.options.perl_prune:
+            return None
+        output = self.node.cwd.joinpath('perl_modules.list')
+        paths = [self.codedir.joinpath('src/pl/plperl')]
+        if self.options.include_tests:
+            paths.extend((
+                self.codedir.joinpath('src/test/perl'),
+                self.codedir.joinpath('src/bin'),
+                self.codedir.joinpath('src/test'),
+                self.codedir.joinpath('contrib'),
+            ))
+        with self.nixenv():
+            trace_perl_modules(self.node, output, paths)
+        return output
 
     @property
     def runtime_env_bins(self) -> tuple[str, ...]:
@@ -233,6 +395,15 @@ class pack_postgres(pack_c):
             'tools/bin/perl',
         )
 
+    @property
+    def make_job_memory(self) -> int:
+        """
+        每个编译任务预留的内存（MiB），--with-llvm 时还要用 clang 生成 bitcode。
+        """
+        if '--with-llvm' in self.configure_options:
+            return 2048
+        return 1024
+
     def teardown(self) -> None:
         """
         后置步骤。
@@ -0,0 +1,194 @@
+#!/usr/bin/env bash
+# Compare the asynchronous I/O settings of PostgreSQL 18+ on a throwaway
+# cluster started from PGHOME.  Loads a table of DATA_MB MiB (larger than
+# shared_buffers), then for each io_method in METHODS, each io_workers setting
+# in IO_WORKERS (worker method only) and each effective_io_concurrency in EIC,
+# restarts the server and times a sequential scan, a bitmap heap scan and a
+# COPY FROM, taking the median of REPEAT runs.  The OS page cache of the data
+# files is dropped before every run where dd supports iflag=nocache.  Results
+# are written to OUTPUT as JSON, then the fastest setting of each workload is
+# printed.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# -lt 2 || $# -gt 7 ]]; then
+    echo "Usage: $PROGNAME PGHOME OUTPUT [DATA_MB] [METHODS] [IO_WORKERS] [EIC] [REPEAT]" >&2
+    exit 1
+fi
+
+PGHOME=$(realpath "$1")
+OUTPUT=$2
+DATA_MB=${3:-1024}
+METHODS=${4:-sync worker io_uring}
+IO_WORKERS=${5:-3 8}
+EIC=${6:-1 16 64}
+REPEAT=${7:-3}
+SHARED_BUFFERS=${PGIO_SHARED_BUFFERS:-128MB}
+PORT=${PGPORT:-65430}
+SCRIPTDIR=$(dirname "$(realpath "$0")")
+
+if [[ $(id -u) == 0 ]]; then
+    echo "error: PostgreSQL cannot run as root, use run_unprivileged.sh" >&2
+    exit 1
+fi
+
+if ! "$PGHOME/bin/postgres" --describe-config | grep -q '^io_method'; then
+    echo "skip: this PostgreSQL has no io_method setting" >&2
+    exit 0
+fi
+
+WORKDIR=$(mktemp -d)
+PGDATA=$WORKDIR/data
+
+cleanup() {
+    "$SCRIPTDIR/pg_cluster.sh" stop "$PGHOME" "$PGDATA"
+    rm -rf "$WORKDIR"
+}
+trap cleanup EXIT
+
+psql() {
+    "$PGHOME/bin/psql" -X -q -At -v ON_ERROR_STOP=1 -h "$PGDATA" -p "$PORT" -d postgres "$@"
+}
+
+# 返回 psql \timing 输出的最后一条语句的毫秒数。
+timed() {
+    psql -c '\timing on' "$@" | sed -n 's/^Time: \([0-9.]*\) ms.*/\1/p' | tail -1
+}
+
+start() {
+    "$SCRIPTDIR/pg_cluster.sh" start "$PGHOME" "$PGDATA" "$PORT" \
+        "shared_buffers=$SHARED_BUFFERS" "max_parallel_workers_per_gather=0" "$@"
+}
+
+stop() {
+    "$SCRIPTDIR/pg_cluster.sh" stop "$PGHOME" "$PGDATA"
+}
+
+# 数据文件刷盘后用 posix_fadvise(DONTNEED) 丢弃其页缓存，无需 root。
+evict=0
+if dd if=/dev/null iflag=nocache count=0 status=none 2>/dev/null; then
+    evict=1
+fi
+drop_cache() {
+    if [[ $evict == 1 ]]; then
+        psql -c CHECKPOINT
+        sync
+        find "$PGDATA/base" -type f -exec dd iflag=nocache count=0 status=none if={} \;
+    fi
+}
+
+median() {
+    tr ' ' '\n' | sort -n | awk '{ v[NR] = $1 } END { printf "%.1f", NR % 2 ? v[(NR + 1) / 2] : (v[NR / 2] + v[NR / 2 + 1]) / 2 }'
+}
+
+# 每行约 236 字节（含行指针），每页约 34 行；k 均匀分布，k < 2000 约选中 0.2% 的行、
+# 分散在约 6% 的页上，走 bitmap heap scan。
+rows=$(( DATA_MB * 4300 ))
+copyrows=$(( rows / 8 ))
+start
+psql <<EOF2
+CREATE TABLE io_bench (id bigint, k int, pad text);
+INSERT INTO io_bench
+    SELECT i, (hashint8(i) & 2147483647) % 1000000, repeat(md5(i::text), 6)
+    FROM generate_series(1, $rows) i;
+CREATE INDEX io_bench_k_idx ON io_bench (k);
+VACUUM ANALYZE io_bench;
+CREATE TABLE io_copy (LIKE io_bench);
+COPY (SELECT * FROM io_bench WHERE id <= $copyrows) TO '$WORKDIR/copy.data';
+EOF2
+pgversion=$(psql -c 'SHOW server_version')
+tablemb=$(psql -c "SELECT pg_relation_size('io_bench') / 1048576")
+sbmb=$(psql -c "SELECT setting::bigint * 8192 / 1048576 FROM pg_settings WHERE name = 'shared_buffers'")
+if [[ $tablemb -le $sbmb ]]; then
+    echo "warning: table of $tablemb MiB fits in shared_buffers ($sbmb MiB)" >&2
+fi
+stop
+
+# run METHOD WORKERS EIC：打印一条 JSON 结果。
+run() {
+    local method=$1 workers=$2 eic=$3 i seq bitmap copy ms
+    local -a settings=("io_method=$method")
+
+    if [[ $method == worker ]]; then
+        settings+=("io_workers=$workers")
+    fi
+    if ! start "${settings[@]}" 2>/dev/null; then
+        echo "$method workers=$workers eic=$eic: server did not start" >&2
+        tail -n 5 "$PGDATA/postgres.log" >&2 || true
+        stop
+        printf '    {"io_method": "%s", "io_workers": %s, "effective_io_concurrency": %s, "error": "server did not start"}' \
+            "$method" "${workers:-null}" "$eic"
+        return
+    fi
+    seq= bitmap= copy=
+    for ((i = 0; i < REPEAT; i++)); do
+        drop_cache
+        ms=$(timed -c "SET effective_io_concurrency = $eic" -c 'SELECT sum(k) FROM io_bench')
+        seq+=" $ms"
+        drop_cache
+        ms=$(timed -c "SET effective_io_concurrency = $eic" -c 'SET enable_seqscan = off' -c 'SET enable_indexscan = off' \
+            -c 'SELECT sum(length(pad)) FROM io_bench WHERE k < 2000')
+        bitmap+=" $ms"
+        psql -c 'TRUNCATE io_copy'
+        ms=$(timed -c "SET effective_io_concurrency = $eic" -c "COPY io_copy FROM '$WORKDIR/copy.data'")
+        copy+=" $ms"
+    done
+    stop
+    seq=$(median <<<"${seq# }")
+    bitmap=$(median <<<"${bitmap# }")
+    copy=$(median <<<"${copy# }")
+    echo "$method workers=${workers:--} eic=$eic: seqscan ${seq} ms, bitmap ${bitmap} ms, copy ${copy} ms" >&2
+    printf '    {"io_method": "%s", "io_workers": %s, "effective_io_concurrency": %s, "seqscan_ms": %s, "bitmap_ms": %s, "copy_ms": %s}' \
+        "$method" "${workers:-null}" "$eic" "$seq" "$bitmap" "$copy"
+}
+
+results=
+for method in $METHODS; do
+    # io_workers 只对 worker 方式有意义，其他方式用 - 占位只跑一轮。
+    workerlist=-
+    if [[ $method == worker ]]; then
+        workerlist=$IO_WORKERS
+    fi
+    for workers in $workerlist; do
+        if [[ $workers == - ]]; then
+            workers=
+        fi
+        for eic in $EIC; do
+            results+="${results:+,$'\n'}$(run "$method" "$workers" "$eic")"
+        done
+    done
+done
+
+cat > "$OUTPUT" <<EOF2
+{
+  "system": "$(uname -m)",
+  "kernel": "$(uname -r)",
+  "cpus": $(nproc),
+  "postgres": "$pgversion",
+  "shared_buffers_mb": $sbmb,
+  "table_mb": $tablemb,
+  "copy_rows": $copyrows,
+  "page_cache_dropped": $([[ $evict == 1 ]] && echo true || echo false),
+  "repeat": $REPEAT,
+  "results": [
+$results
+  ]
+}
+EOF2
+
+# 每种负载最快的设置，供调整默认参数参考。
+sed -n 's/.*"io_method": "\([^"]*\)", "io_workers": \([^,]*\), "effective_io_concurrency": \([^,]*\), "seqscan_ms": \([^,]*\), "bitmap_ms": \([^,]*\), "copy_ms": \([^}]*\)}.*/\1 \2 \3 \4 \5 \6/p' "$OUTPUT" \
+    | awk '
+        {
+            name = $1 ($2 == "null" ? "" : " io_workers=" $2) " effective_io_concurrency=" $3
+            for (i = 4; i <= 6; i++) {
+                if (!(i in best) || $i < best[i]) { best[i] = $i; bestname[i] = name }
+            }
+        }
+        END {
+            split("seqscan bitmap copy", label, " ")
+            for (i = 4; i <= 6; i++) {
+                if (i in best) printf "Fastest %s: %s (%.1f ms)\n", label[i - 3], bestname[i], best[i]
+            }
+        }'
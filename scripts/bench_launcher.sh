@@ -0,0 +1,50 @@
+#!/usr/bin/env bash
+# Compare the startup latency of a program wrapped by the /bin/sh wrapper and
+# by the native launcher (see wrap_envs.sh).  Prints microseconds per call.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# != 1 && $# != 2 ]]; then
+    echo "Usage: $PROGNAME LAUNCHER [RUNS]" >&2
+    exit 1
+fi
+
+LAUNCHER=$(realpath "$1")
+RUNS=${2:-1000}
+SCRIPTDIR=$(dirname "$(realpath "$0")")
+WORKDIR=$(mktemp -d)
+trap 'rm -rf "$WORKDIR"' EXIT
+
+ENVS='PATH=$TOPDIR/bin\:$PATH:LOCALE_ARCHIVE=$TOPDIR/lib/copied/locale-archive'
+
+for kind in direct shell launcher; do
+    mkdir -p "$WORKDIR/$kind/bin"
+    cp "$(realpath "$(type -P true)")" "$WORKDIR/$kind/bin/true"
+done
+"$SCRIPTDIR/wrap_envs.sh" "$WORKDIR/shell" bin/true "$ENVS" >/dev/null
+"$SCRIPTDIR/wrap_envs.sh" "$WORKDIR/launcher" bin/true "$ENVS" "$LAUNCHER" >/dev/null
+
+bench() {
+    local prog=$1
+    local start=
+    local end=
+    local i=
+
+    "$prog"
+    start=$(date +%s%N)
+    for ((i = 0; i < RUNS; i++)); do
+        "$prog"
+    done
+    end=$(date +%s%N)
+    echo $(( (end - start) / RUNS / 1000 ))
+}
+
+direct=$(bench "$WORKDIR/direct/bin/true")
+shell=$(bench "$WORKDIR/shell/bin/true")
+launcher=$(bench "$WORKDIR/launcher/bin/true")
+
+echo "runs:     $RUNS"
+echo "direct:   ${direct} us/call"
+echo "shell:    ${shell} us/call (+$((shell - direct)) us)"
+echo "launcher: ${launcher} us/call (+$((launcher - direct)) us)"
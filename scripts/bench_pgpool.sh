@@ -0,0 +1,110 @@
+#!/usr/bin/env bash
+# Run pgbench against a throwaway primary started from PGHOME, once directly
+# and once through pgpool from PGPOOLHOME, and report TPS and latency
+# percentiles for each builtin script.  Also used as the PGO training run.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# -lt 3 || $# -gt 5 ]]; then
+    echo "Usage: $PROGNAME PGHOME PGPOOLHOME OUTPUT [DURATION] [CLIENTS]" >&2
+    exit 1
+fi
+
+PGHOME=$(realpath "$1")
+PGPOOLHOME=$(realpath "$2")
+OUTPUT=$3
+DURATION=${4:-20}
+CLIENTS=${5:-16}
+PORT=${PGPORT:-65431}
+POOLPORT=$((PORT + 1))
+PCPPORT=$((PORT + 2))
+SCALE=${PGBENCH_SCALE:-10}
+SCRIPTS=${PGBENCH_SCRIPTS:-select-only tpcb-like}
+SCRIPTDIR=$(dirname "$(realpath "$0")")
+
+if [[ $(id -u) == 0 ]]; then
+    echo "error: PostgreSQL cannot run as root, use run_unprivileged.sh" >&2
+    exit 1
+fi
+
+WORKDIR=$(mktemp -d)
+PGDATA=$WORKDIR/data
+POOLDIR=$WORKDIR/pgpool
+
+cleanup() {
+    if [[ -f $POOLDIR/pgpool.conf ]]; then
+        "$PGPOOLHOME/bin/pgpool" -f "$POOLDIR/pgpool.conf" -F "$POOLDIR/pcp.conf" -m fast stop >/dev/null 2>&1 || true
+    fi
+    "$SCRIPTDIR/pg_cluster.sh" stop "$PGHOME" "$PGDATA"
+    rm -rf "$WORKDIR"
+}
+trap cleanup EXIT
+
+"$SCRIPTDIR/pg_cluster.sh" start "$PGHOME" "$PGDATA" "$PORT" "max_connections=$((CLIENTS * 2 + 10))"
+"$PGHOME/bin/pgbench" -i -q -s "$SCALE" -h "$PGDATA" -p "$PORT" postgres >/dev/null
+
+mkdir -p "$POOLDIR"
+: > "$POOLDIR/pcp.conf"
+cat > "$POOLDIR/pgpool.conf" <<EOF2
+backend_clustering_mode = 'raw'
+listen_addresses = ''
+port = $POOLPORT
+unix_socket_directories = '$POOLDIR'
+pcp_listen_addresses = ''
+pcp_port = $PCPPORT
+pcp_socket_dir = '$POOLDIR'
+backend_hostname0 = '$PGDATA'
+backend_port0 = $PORT
+backend_weight0 = 1
+backend_flag0 = 'DISALLOW_TO_FAILOVER'
+num_init_children = $((CLIENTS + 2))
+max_pool = 1
+connection_cache = on
+load_balance_mode = off
+enable_pool_hba = off
+health_check_period = 0
+sr_check_period = 0
+pid_file_name = '$POOLDIR/pgpool.pid'
+logdir = '$POOLDIR'
+EOF2
+"$PGPOOLHOME/bin/pgpool" -n -f "$POOLDIR/pgpool.conf" -F "$POOLDIR/pcp.conf" > "$POOLDIR/pgpool.log" 2>&1 &
+for _ in $(seq 1 60); do
+    [[ -S $POOLDIR/.s.PGSQL.$POOLPORT ]] && break
+    sleep 0.5
+done
+if [[ ! -S $POOLDIR/.s.PGSQL.$POOLPORT ]]; then
+    cat "$POOLDIR/pgpool.log" >&2
+    echo "error: pgpool did not start" >&2
+    exit 1
+fi
+
+run_pgbench() {
+    local target=$1
+    local host=$2
+    local port=$3
+    local script=$4
+    local logdir=$WORKDIR/log-$target-$script
+    local tps=
+
+    mkdir -p "$logdir"
+    tps=$(cd "$logdir" && "$PGHOME/bin/pgbench" -n -b "$script" -c "$CLIENTS" -j "$CLIENTS" \
+        -T "$DURATION" -l --log-prefix=tx -h "$host" -p "$port" postgres \
+        | sed -n 's/^tps = \([0-9.]*\) .*/\1/p' | tail -n 1)
+    # 每行第 3 列为事务耗时（微秒）。
+    cat "$logdir"/tx.* | awk '{ print $3 }' | sort -n | awk -v target="$target" -v script="$script" -v tps="$tps" '
+        { v[NR] = $1 }
+        END {
+            printf "%-8s %-12s %10.1f %9.3f %9.3f %9.3f\n", target, script, tps,
+                v[int(NR * 0.50) + 1] / 1000, v[int(NR * 0.95) + 1] / 1000, v[int(NR * 0.99) + 1] / 1000
+        }'
+}
+
+{
+    echo "clients=$CLIENTS duration=${DURATION}s scale=$SCALE"
+    printf "%-8s %-12s %10s %9s %9s %9s\n" target script tps p50_ms p95_ms p99_ms
+    for script in $SCRIPTS; do
+        run_pgbench direct "$PGDATA" "$PORT" "$script"
+        run_pgbench pgpool "$POOLDIR" "$POOLPORT" "$script"
+    done
+} | tee "$OUTPUT"
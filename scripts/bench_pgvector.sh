@@ -0,0 +1,152 @@
+#!/usr/bin/env bash
+# Benchmark pgvector built into EXTDIR on a throwaway cluster started from a
+# copy of PGHOME with the extension installed.  Loads ROWS random vectors of
+# DIM dimensions, times HNSW and IVFFlat index builds for each
+# max_parallel_maintenance_workers setting in WORKERS, then measures query QPS
+# and recall@K against exact nearest neighbours.  Results are written to
+# OUTPUT as JSON.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# -lt 3 || $# -gt 7 ]]; then
+    echo "Usage: $PROGNAME PGHOME EXTDIR OUTPUT [ROWS] [DIM] [WORKERS] [QUERIES]" >&2
+    exit 1
+fi
+
+PGHOME=$(realpath "$1")
+EXTDIR=$(realpath "$2")
+OUTPUT=$3
+ROWS=${4:-100000}
+DIM=${5:-128}
+WORKERS=${6:-0 2 4}
+QUERIES=${7:-200}
+K=${PGVECTOR_K:-10}
+PORT=${PGPORT:-65431}
+SCRIPTDIR=$(dirname "$(realpath "$0")")
+
+# pgvector 建议 lists 取行数 / 1000、probes 取 sqrt(lists)。
+LISTS=$(( ROWS / 1000 > 10 ? ROWS / 1000 : 10 ))
+PROBES=${PGVECTOR_PROBES:-$(awk -v l="$LISTS" 'BEGIN { p = int(sqrt(l)); print p > 1 ? p : 1 }')}
+EF_SEARCH=${PGVECTOR_EF_SEARCH:-40}
+HNSW_OPTIONS=${PGVECTOR_HNSW_OPTIONS:-m = 16, ef_construction = 64}
+
+if [[ $(id -u) == 0 ]]; then
+    echo "error: PostgreSQL cannot run as root, use run_unprivileged.sh" >&2
+    exit 1
+fi
+
+if [[ ! -f $EXTDIR/share/extension/vector.control ]]; then
+    echo "error: no pgvector in $EXTDIR" >&2
+    exit 1
+fi
+
+WORKDIR=$(mktemp -d)
+PGDATA=$WORKDIR/data
+
+cleanup() {
+    "$SCRIPTDIR/pg_cluster.sh" stop "$WORKDIR/pghome" "$PGDATA"
+    rm -rf "$WORKDIR"
+}
+trap cleanup EXIT
+
+cp -a "$PGHOME" "$WORKDIR/pghome"
+cp -a "$EXTDIR/." "$WORKDIR/pghome/"
+
+maxworkers=0
+for w in $WORKERS; do
+    if (( w > maxworkers )); then
+        maxworkers=$w
+    fi
+done
+"$SCRIPTDIR/pg_cluster.sh" start "$WORKDIR/pghome" "$PGDATA" "$PORT" \
+    "maintenance_work_mem=${PGVECTOR_MAINTENANCE_WORK_MEM:-1GB}" \
+    "max_worker_processes=$((maxworkers + 8))" \
+    "max_parallel_workers=$((maxworkers + 8))"
+
+psql() {
+    "$WORKDIR/pghome/bin/psql" -X -q -At -v ON_ERROR_STOP=1 -h "$PGDATA" -p "$PORT" -d postgres "$@"
+}
+
+# 返回 psql \timing 输出的毫秒数。
+timed() {
+    psql -c '\timing on' "$@" | sed -n 's/^Time: \([0-9.]*\) ms.*/\1/p' | tail -1
+}
+
+psql <<EOF2
+CREATE EXTENSION vector;
+SELECT setseed(0.42);
+CREATE TABLE items (id bigint PRIMARY KEY, embedding vector($DIM));
+INSERT INTO items
+    SELECT i, ARRAY(SELECT random() FROM generate_series(1, $DIM) WHERE i > 0)::vector($DIM)
+    FROM generate_series(1, $ROWS) i;
+CREATE TABLE queries (id int PRIMARY KEY, embedding vector($DIM));
+INSERT INTO queries
+    SELECT i, ARRAY(SELECT random() FROM generate_series(1, $DIM) WHERE i > 0)::vector($DIM)
+    FROM generate_series(1, $QUERIES) i;
+VACUUM ANALYZE items;
+CREATE TABLE truth AS
+    SELECT q.id AS qid, n.id
+    FROM queries q CROSS JOIN LATERAL
+        (SELECT id FROM items ORDER BY embedding <-> q.embedding LIMIT $K) n;
+
+-- 只对索引扫描计时，召回率在计时之外统计。
+CREATE FUNCTION bench_search(OUT qps float8, OUT recall float8) AS \$\$
+DECLARE
+    q record;
+    ids bigint[];
+    started timestamptz;
+    elapsed interval := '0';
+    hits bigint := 0;
+BEGIN
+    FOR q IN SELECT id, embedding FROM queries ORDER BY id LOOP
+        started := clock_timestamp();
+        SELECT array_agg(id) INTO ids
+            FROM (SELECT id FROM items ORDER BY embedding <-> q.embedding LIMIT $K) r;
+        elapsed := elapsed + (clock_timestamp() - started);
+        hits := hits + (SELECT count(*) FROM truth WHERE qid = q.id AND id = ANY (ids));
+    END LOOP;
+    qps := $QUERIES / greatest(extract(epoch FROM elapsed), 1e-6);
+    recall := hits::float8 / ($QUERIES * $K);
+END
+\$\$ LANGUAGE plpgsql;
+EOF2
+
+extversion=$(psql -c "SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+pgversion=$(psql -c 'SHOW server_version')
+
+# bench METHOD OPTIONS SEARCH_SETTING
+bench() {
+    local method=$1 options=$2 search=$3 w ms builds= result
+
+    for w in $WORKERS; do
+        psql -c 'DROP INDEX IF EXISTS items_embedding_idx'
+        ms=$(timed -c "SET max_parallel_maintenance_workers = $w" \
+            -c "CREATE INDEX items_embedding_idx ON items USING $method (embedding vector_l2_ops) WITH ($options)")
+        echo "$method workers=$w: $ms ms" >&2
+        builds+="${builds:+, }{\"workers\": $w, \"seconds\": $(awk -v ms="$ms" 'BEGIN { printf "%.3f", ms / 1000 }')}"
+    done
+    result=$(psql -F ' ' -c "SET $search" -c 'SELECT round(qps::numeric, 1), round(recall::numeric, 4) FROM bench_search()')
+    echo "$method $search: qps=${result% *} recall=${result#* }" >&2
+    printf '    {"method": "%s", "options": "%s", "search": "%s", "builds": [%s], "qps": %s, "recall": %s}' \
+        "$method" "$options" "$search" "$builds" "${result% *}" "${result#* }"
+}
+
+hnsw=$(bench hnsw "$HNSW_OPTIONS" "hnsw.ef_search = $EF_SEARCH")
+ivfflat=$(bench ivfflat "lists = $LISTS" "ivfflat.probes = $PROBES")
+
+cat > "$OUTPUT" <<EOF2
+{
+  "pgvector": "$extversion",
+  "postgres": "$pgversion",
+  "rows": $ROWS,
+  "dim": $DIM,
+  "queries": $QUERIES,
+  "k": $K,
+  "indexes": [
+$hnsw,
+$ivfflat
+  ]
+}
+EOF2
+cat "$OUTPUT"
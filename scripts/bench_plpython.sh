@@ -0,0 +1,80 @@
+#!/usr/bin/env bash
+# Measure the first PL/Python call in a fresh backend.  PGHOME is measured as
+# packaged, then on a read-only copy whose Python library has no bytecode,
+# which is what the backend saw before the library was precompiled.
+# Prints the median of RUNS calls in milliseconds.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# != 1 && $# != 2 ]]; then
+    echo "Usage: $PROGNAME PGHOME [RUNS]" >&2
+    exit 1
+fi
+
+PGHOME=$(realpath "$1")
+RUNS=${2:-20}
+PORT=${PGPORT:-65431}
+SCRIPTDIR=$(dirname "$(realpath "$0")")
+WORKDIR=$(mktemp -d)
+
+cleanup() {
+    for pgdata in "$WORKDIR"/*/data; do
+        [[ -d $pgdata ]] || continue
+        "$SCRIPTDIR/pg_cluster.sh" stop "${pgdata%/data}/pghome" "$pgdata"
+    done
+    chmod -R u+w "$WORKDIR"
+    rm -rf "$WORKDIR"
+}
+trap cleanup EXIT
+
+if [[ $(id -u) == 0 ]]; then
+    echo "error: PostgreSQL cannot run as root, use run_unprivileged.sh" >&2
+    exit 1
+fi
+
+if [[ ! -d $PGHOME/lib/copied/python ]]; then
+    echo "error: no PL/Python runtime in $PGHOME" >&2
+    exit 1
+fi
+
+FUNC="CREATE FUNCTION pgflow_bench() RETURNS int LANGUAGE plpython3u AS \$\$
+import json, decimal, datetime, re, email.utils
+return len(json.dumps({'d': str(decimal.Decimal('1.5'))}))
+\$\$"
+
+measure() {
+    local pghome=$1
+    local pgdata=${pghome%/pghome}/data
+    local i=
+
+    "$SCRIPTDIR/pg_cluster.sh" start "$pghome" "$pgdata" "$PORT"
+    "$pghome/bin/psql" -X -q -h "$pgdata" -p "$PORT" -d postgres \
+        -c 'CREATE EXTENSION plpython3u' -c "$FUNC" >/dev/null
+    for ((i = 0; i < RUNS; i++)); do
+        "$pghome/bin/psql" -X -At -h "$pgdata" -p "$PORT" -d postgres \
+            -c '\timing on' -c 'SELECT pgflow_bench()' \
+            | sed -n 's/^Time: \([0-9.]*\) ms.*/\1/p'
+    done | sort -n | awk '{ v[NR] = $1 } END { printf "%.2f\n", v[int((NR + 1) / 2)] }'
+    "$SCRIPTDIR/pg_cluster.sh" stop "$pghome" "$pgdata"
+}
+
+mkdir -p "$WORKDIR/packaged" "$WORKDIR/source"
+ln -s "$PGHOME" "$WORKDIR/packaged/pghome"
+cp -a "$PGHOME" "$WORKDIR/source/pghome"
+find "$WORKDIR/source/pghome/lib/copied" -name '__pycache__' -prune -exec rm -rf {} +
+find "$WORKDIR/source/pghome/lib/copied" -name '*.pyc' -delete
+if [[ -f $WORKDIR/source/pghome/lib/copied/python.zip ]]; then
+    # 解出 zip 中的源码，模拟未打包前的目录布局。
+    (cd "$WORKDIR/source/pghome/lib/copied/python" && \
+        python3 -m zipfile -e ../python.zip . && find . -name '*.pyc' -delete)
+    rm -f "$WORKDIR/source/pghome/lib/copied/python.zip"
+fi
+chmod -R a-w "$WORKDIR/source/pghome/lib/copied/python"
+
+packaged=$(measure "$WORKDIR/packaged/pghome")
+source=$(measure "$WORKDIR/source/pghome")
+
+echo "runs:        $RUNS"
+echo "no bytecode: ${source} ms"
+echo "packaged:    ${packaged} ms"
@@ -1,49 +1,98 @@
 #!/usr/bin/env bash
 # Copy the build Perl library paths into DESTDIR.
+#
+# The @INC directories are merged in @INC order: a file that exists in more
+# than one directory is taken from the first one, the same way perl resolves
+# it, and an @INC directory nested in another one is copied only once.  If
+# MODULES (a file of %INC keys, see trace_perl_modules.sh) is given, only the
+# listed modules, their sub-namespaces and XS objects are copied.
 
 set -e
 
 progname=$(basename "$0")
-if [[ $# != 1 ]]; then
-    echo "Usage: $progname DESTDIR" >&2
+if [[ $# != 1 && $# != 2 ]]; then
+    echo "Usage: $progname DESTDIR [MODULES]" >&2
     exit 1
 fi
 
 destdir=$1
+modules=${2:-}
 
 if ! command -v perl >/dev/null 2>&1; then
     echo "error: perl not found in PATH" >&2
     exit 1
 fi
 
-copy_config=0
-copy_findbin=0
+if [[ -n $modules && ! -f $modules ]]; then
+    echo "error: module list not found: $modules" >&2
+    exit 1
+fi
 
-for path in $(perl -e 'print join("\n", @INC, "")'); do
-    if [[ -e $path/Config.pm ]]; then
-        mkdir -p "$destdir"
-        cp -rv "$path"/* "$destdir"/
-        copy_config=1
-        break
-    fi
-done
+# 始终需要的文件：Config、FindBin 以及正则 Unicode 属性表。
+always=(
+    Config.pm
+    Config_heavy.pl
+    Config_git.pl
+    FindBin.pm
+    unicore
+    utf8_heavy.pl
+    _charnames.pm
+)
 
+incdirs=()
 for path in $(perl -e 'print join("\n", @INC, "")'); do
-    if [[ -e $path/FindBin.pm ]]; then
-        mkdir -p "$destdir"
-        cp -rv "$path"/* "$destdir"/
-        copy_findbin=1
-        break
-    fi
+    [[ $path == /* && -d $path ]] || continue
+    path=$(realpath "$path")
+    [[ $path != "$(realpath -m "$destdir")" ]] || continue
+    for seen in "${incdirs[@]}"; do
+        [[ $seen != "$path" ]] || continue 2
+    done
+    incdirs+=("$path")
 done
 
-for path in $(perl -e 'print join("\n", @INC, "")'); do
-    if [[ -d $path && $path != "$destdir" ]] && find "$path" -mindepth 1 -maxdepth 1 | grep -q .; then
-        mkdir -p "$destdir"
-        cp -rv "$path"/* "$destdir"/
+wanted() {
+    local module=
+    local stem=
+
+    printf '%s\n' "${always[@]}"
+    [[ -n $modules ]] || return 0
+    while IFS= read -r module; do
+        [[ $module == *.pm ]] || { [[ -n $module ]] && echo "$module"; continue; }
+        stem=${module%.pm}
+        echo "$module"
+        echo "$stem"
+        echo "auto/$stem"
+    done < "$modules"
+}
+
+mkdir -p "$destdir"
+copy_config=0
+copy_findbin=0
+for path in "${incdirs[@]}"; do
+    find "$path" -mindepth 1 -maxdepth 1 | grep -q . || continue
+    [[ -e $path/Config.pm ]] && copy_config=1
+    [[ -e $path/FindBin.pm ]] && copy_findbin=1
+
+    excludes=(--exclude="./CORE/*.h")
+    for other in "${incdirs[@]}"; do
+        if [[ $other == "$path"/* ]]; then
+            excludes+=("--exclude=./${other#"$path"/}")
+        fi
+    done
+
+    echo "Copy $path"
+    if [[ -z $modules ]]; then
+        tar -C "$path" "${excludes[@]}" -cf - . \
+            | tar -C "$destdir" --skip-old-files --warning=no-existing-file -xvf -
+    else
+        wanted | sort -u | while IFS= read -r rel; do
+            [[ -e $path/$rel ]] && echo "./$rel"
+        done | tar -C "$path" "${excludes[@]}" -cf - -T - \
+            | tar -C "$destdir" --skip-old-files --warning=no-existing-file -xvf -
     fi
 done
 
+chmod -R u+w "$destdir"
 find "$destdir" -name "*.pod" -exec rm -fv {} +
 
 if [[ $copy_config != 1 ]]; then
@@ -1,15 +1,25 @@
 #!/usr/bin/env bash
 # Copy the build Python standard library into DESTDIR.
+#
+# EXCLUDES is a colon separated list of glob patterns, relative to the
+# standard library directory, that are left out of the copy.  The copied
+# modules are precompiled with hash-checked .pyc files, so a read-only install
+# never has to compile them at import time.  If ZIPFILE is given the pure
+# Python modules are moved into that archive, which goes on PYTHONPATH in
+# front of DESTDIR; DESTDIR keeps lib-dynload and anything else that cannot
+# be imported from a zip.
 
 set -e
 
 progname=$(basename "$0")
-if [[ $# != 1 ]]; then
-    echo "Usage: $progname DESTDIR" >&2
+if [[ $# -lt 1 || $# -gt 3 ]]; then
+    echo "Usage: $progname DESTDIR [EXCLUDES [ZIPFILE]]" >&2
     exit 1
 fi
 
 destdir=$1
+excludes=${2:-}
+zipfile=${3:-}
 
 if command -v python >/dev/null 2>&1; then
     pycmd=python
@@ -20,14 +30,79 @@ else
     exit 1
 fi
 
+prune() {
+    local pattern=
+    local path=
+
+    IFS=: read -r -a patterns <<< "$excludes"
+    for pattern in "${patterns[@]}"; do
+        [[ -n $pattern ]] || continue
+        for path in "$destdir"/$pattern; do
+            [[ -e $path || -L $path ]] || continue
+            echo "exclude: ${path#"$destdir"/}"
+            rm -rf "$path"
+        done
+    done
+}
+
+zip_modules() {
+    # zipimport 只识别与源码同目录的 .pyc，不读取 __pycache__。
+    "$pycmd" - "$destdir" "$zipfile" <<'PYEOF'
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import zipfile
+
+destdir, zippath = sys.argv[1:3]
+skip = {'lib-dynload', 'site-packages', '__pycache__'}
+mode = py_compile.PycInvalidationMode.CHECKED_HASH
+moved = []
+with tempfile.TemporaryDirectory() as tmpdir, \
+        zipfile.ZipFile(zippath, 'w', zipfile.ZIP_DEFLATED) as zf:
+    for dirpath, dirnames, filenames in os.walk(destdir):
+        dirnames[:] = sorted(d for d in dirnames if d not in skip)
+        for name in sorted(filenames):
+            if not name.endswith('.py'):
+                continue
+            src = os.path.join(dirpath, name)
+            arcname = os.path.relpath(src, destdir)
+            cfile = os.path.join(tmpdir, 'module.pyc')
+            try:
+                py_compile.compile(src, cfile=cfile, dfile=arcname,
+                                   doraise=True, invalidation_mode=mode)
+            except py_compile.PyCompileError as e:
+                print(f'skip: {arcname}: {e.msg}', file=sys.stderr)
+                continue
+            zf.write(src, arcname)
+            zf.write(cfile, arcname + 'c')
+            moved.append(src)
+for src in moved:
+    os.remove(src)
+    shutil.rmtree(os.path.join(os.path.dirname(src), '__pycache__'), ignore_errors=True)
+print(f'zipped {len(moved)} modules into {zippath}')
+PYEOF
+    find "$destdir" -depth -type d -empty -delete
+    mkdir -p "$destdir"
+}
+
 for path in $($pycmd -c "import sys; print('\n'.join(sys.path[1:]))"); do
     if [[ -e $path/abc.py ]]; then
         mkdir -p "$destdir"
         cp -rv "$path"/* "$destdir"/
+        chmod -R u+w "$destdir"
         find "$destdir" -name "*.pyc" -exec rm -fv {} +
         find "$destdir" -name "*.pyo" -exec rm -fv {} +
         find "$destdir" -name "python.o" -exec rm -fv {} +
         rm -rfv "$destdir"/site-packages/*
+        prune
+        if [[ -n $zipfile ]]; then
+            zip_modules
+        else
+            "$pycmd" -m compileall -q -j 0 --invalidation-mode checked-hash "$destdir" \
+                || echo "warning: some modules failed to compile" >&2
+        fi
         exit 0
     fi
 done
@@ -0,0 +1,59 @@
+#!/usr/bin/env bash
+# Count the paths the dynamic loader tries while loading the libraries of
+# each elf file in `ELFDIR` (`LD_DEBUG=libs` of `ld.so --list`, nothing is
+# run).  Writes "TRIES LIBS FILE" lines to `OUTPUT`.  With `BEFORE`, the
+# output of an earlier run, prints the per-file change and fails if the total
+# got worse.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# != 2 && $# != 3 ]]; then
+    echo "Usage: $PROGNAME ELFDIR OUTPUT [BEFORE]" >&2
+    exit 1
+fi
+
+ELFDIR=$1
+OUTPUT=$2
+BEFORE=${3:-}
+RTLD=${LD_SO:-$(patchelf --print-interpreter "$(command -v bash)")}
+
+case "$(uname -m)" in
+    x86_64)         ARCH="x86-64" ;;
+    aarch64)        ARCH="aarch64" ;;
+    loongarch64)    ARCH="LoongArch" ;;
+    *)              echo "Unsupported architecture: $(uname -m)" >&2; exit 1 ;;
+esac
+
+: > "$OUTPUT"
+for elf in $(find "$ELFDIR" -type f -exec file {} + | grep ELF | grep -E "executable|shared object" | grep "$ARCH" | grep "dynamically" | grep -E "SYSV|GNU/Linux" | cut -d: -f1 | sort); do
+    # 每次 openat 尝试对应一行 "trying file="，每个需要搜索的库对应一行 "find library="。
+    LD_DEBUG=libs "$RTLD" --list "$elf" 2>&1 >/dev/null \
+        | awk -v file="${elf#"$ELFDIR"/}" '
+            /trying file=/ { tries++ }
+            /find library=/ { libs++ }
+            END { printf "%d %d %s\n", tries, libs, file }' >> "$OUTPUT"
+done
+
+if [[ -z $BEFORE ]]; then
+    awk '{ tries += $1; libs += $2 } END {
+        printf "Loader lookups: %d tried paths for %d libraries in %d files\n", tries, libs, NR
+    }' "$OUTPUT"
+    exit 0
+fi
+
+awk '
+    NR == FNR { before[$3] = $1; next }
+    {
+        old = ($3 in before) ? before[$3] : $1
+        total_before += old
+        total_after += $1
+        if (old != $1) {
+            printf "  %6d -> %-6d %s\n", old, $1, $3
+        }
+    }
+    END {
+        printf "Loader lookups: %d -> %d tried paths in %d files (%+.1f%%)\n", total_before, total_after, FNR,
+            total_before ? (total_after - total_before) * 100 / total_before : 0
+        exit total_after > total_before ? 2 : 0
+    }' "$BEFORE" "$OUTPUT"
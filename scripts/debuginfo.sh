@@ -0,0 +1,66 @@
+#!/usr/bin/env bash
+# Point gdb and perf at an unpacked pgflow debuginfo package.  The archive layout is:
+# .
+# |-- .build-id/xx/yyyy.debug
+# |-- debuginfo.sh
+
+set -e
+
+die() {
+    echo "$*" >&2
+    exit 1
+}
+
+usage() {
+    cat >&2 <<EOF
+Usage: $(basename "$0") gdb [GDB_ARG ...]
+       $(basename "$0") perf [PERF_ARG ...]
+       $(basename "$0") env
+
+  gdb   Run gdb with this tree added to its debug-file-directory.
+  perf  Add the debug files to the perf build-id cache, then run perf.
+  env   Print the debug file directory settings of this tree.
+EOF
+}
+
+topdir=$(dirname "$(realpath "${BASH_SOURCE[0]}")")
+
+perf_import() {
+    local debugfile
+
+    while IFS= read -r debugfile; do
+        perf buildid-cache --add "$debugfile" 2>/dev/null || \
+            echo "warning: perf buildid-cache failed: $debugfile" >&2
+    done < <(find "$topdir/.build-id" -type f -name '*.debug')
+}
+
+if [[ $# -lt 1 ]]; then
+    usage
+    exit 1
+fi
+
+cmd=$1
+shift
+
+case "$cmd" in
+    gdb)
+        command -v gdb >/dev/null 2>&1 || die "error: gdb not found in PATH"
+        exec gdb -iex "set debug-file-directory $topdir:/usr/lib/debug" "$@"
+        ;;
+    perf)
+        command -v perf >/dev/null 2>&1 || die "error: perf not found in PATH"
+        perf_import
+        exec perf "$@"
+        ;;
+    env)
+        echo "export PGFLOW_DEBUGINFO_DIR=\"$topdir\""
+        echo "# gdb: set debug-file-directory $topdir:/usr/lib/debug"
+        ;;
+    -h|--help)
+        usage
+        ;;
+    *)
+        usage
+        exit 1
+        ;;
+esac
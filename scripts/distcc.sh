@@ -0,0 +1,136 @@
+#!/usr/bin/env bash
+# Distribute compile units to distccd helpers that run in the same nix dev
+# shell, falling back to local compilation.  STATEDIR holds the reachable host
+# list, the distcc log and the compile unit counter.
+
+set -e
+
+PROGNAME=$(basename "$0")
+
+usage() {
+    cat >&2 <<EOF2
+Usage: $PROGNAME hosts STATEDIR HOST...
+       $PROGNAME cc STATEDIR COMPILER [ARG ...]
+       $PROGNAME report STATEDIR
+       $PROGNAME helper start PIDFILE PORT ALLOW [JOBS]
+       $PROGNAME helper stop PIDFILE
+
+  hosts   Probe the helpers (HOST[:PORT][/LIMIT][,OPTIONS], default port
+          3632 and limit 4), save the reachable ones and print the make job
+          count: local jobs plus the limits of the reachable helpers.  Local
+          jobs, which also cap local compiles and preprocessing, default to
+          the cpu count and can be set with DISTCC_LOCAL_JOBS.
+  cc      Compiler wrapper for CC/CXX: run COMPILER through distcc.
+  report  Print how many compile units ran on the helpers.
+  helper  Start or stop a distccd helper accepting the ALLOW network.
+EOF2
+}
+
+probe() {
+    local spec=$1 hostport host port
+
+    hostport=${spec%%/*}
+    hostport=${hostport%%,*}
+    host=${hostport%%:*}
+    port=3632
+    if [[ $hostport == *:* ]]; then
+        port=${hostport##*:}
+    fi
+    timeout 3 bash -c "exec 3<>/dev/tcp/$host/$port" 2>/dev/null
+}
+
+limit() {
+    local spec=$1 limit=4
+
+    if [[ $spec == */* ]]; then
+        limit=${spec#*/}
+        limit=${limit%%,*}
+    fi
+    echo "$limit"
+}
+
+cmd=${1:-}
+shift || true
+
+case "$cmd" in
+    hosts)
+        [[ $# -ge 1 ]] || { usage; exit 1; }
+        statedir=$1
+        shift
+        mkdir -p "$statedir"
+        local_jobs=${DISTCC_LOCAL_JOBS:-$(nproc)}
+        # 回退到本机编译和为远程编译单元预处理时，本机同时运行的任务不超过 local_jobs。
+        hosts="--localslots=$local_jobs --localslots_cpp=$local_jobs localhost/$local_jobs"
+        jobs=$local_jobs
+        for spec in "$@"; do
+            if probe "$spec"; then
+                hosts+=" $spec"
+                jobs=$((jobs + $(limit "$spec")))
+            else
+                echo "warning: distcc helper unreachable, skipped: $spec" >&2
+            fi
+        done
+        echo "$hosts" >"$statedir/hosts"
+        : >"$statedir/units"
+        : >"$statedir/distcc.log"
+        echo "$jobs"
+        ;;
+    cc)
+        [[ $# -ge 2 ]] || { usage; exit 1; }
+        statedir=$1
+        shift
+        for arg in "$@"; do
+            if [[ $arg == -c ]]; then
+                echo . >>"$statedir/units"
+                break
+            fi
+        done
+        DISTCC_HOSTS=$(cat "$statedir/hosts")
+        DISTCC_LOG=$statedir/distcc.log
+        DISTCC_FALLBACK=1
+        export DISTCC_HOSTS DISTCC_LOG DISTCC_FALLBACK
+        exec distcc "$@"
+        ;;
+    report)
+        [[ $# -eq 1 ]] || { usage; exit 1; }
+        statedir=$1
+        units=$(wc -l <"$statedir/units")
+        # distcc 每完成一个远程编译单元记一行 "compile FILE on HOST completed ok"。
+        grep -oE ' on [^ ]+ completed ok' "$statedir/distcc.log" 2>/dev/null \
+            | awk '{print $2}' | grep -v '^localhost' | sort | uniq -c >"$statedir/remote" || true
+        remote=$(awk '{n += $1} END {print n + 0}' "$statedir/remote")
+        fallback=$(grep -c 'failed to distribute' "$statedir/distcc.log" 2>/dev/null || true)
+        echo "Hosts: $(cat "$statedir/hosts")"
+        awk -v units="$units" -v remote="$remote" 'BEGIN {
+            printf "Compile units: %d, remote: %d (%.1f%%)\n", units, remote, units ? remote * 100 / units : 0
+        }'
+        echo "Fallbacks to local: ${fallback:-0}"
+        awk '{printf "  %-40s %d\n", $2, $1}' "$statedir/remote"
+        ;;
+    helper)
+        [[ $# -ge 2 ]] || { usage; exit 1; }
+        action=$1
+        pidfile=$2
+        case "$action" in
+            start)
+                [[ $# -ge 4 ]] || { usage; exit 1; }
+                distccd --daemon --pid-file "$pidfile" --port "$3" --allow "$4" \
+                    --jobs "${5:-$(nproc)}" --log-file "$pidfile.log"
+                ;;
+            stop)
+                if [[ -f $pidfile ]]; then
+                    kill "$(cat "$pidfile")" 2>/dev/null || true
+                    rm -f "$pidfile"
+                fi
+                ;;
+            *)
+                usage
+                exit 1
+                ;;
+        esac
+        ;;
+    *)
+        usage
+        exit 1
+        ;;
+esac
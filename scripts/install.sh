@@ -4,6 +4,10 @@
 # |-- content/
 # |-- install.sh
 # |-- patchelf/
+#
+# Delta packages built with `delta_from` carry delta.info, delta.zst and a
+# zstd/ bundle instead, and are installed with `--delta BASEPKG INSTDIR`.
+# See stream_install.sh for installing straight from the archive.
 
 set -e
 
@@ -37,10 +41,141 @@ copy_content() {
 
     cntdir=$(common_topdir)/content
     mkdir -p "$instdir"
-    cp -av "$cntdir"/. "$instdir"
+    if ((${quiet:-0})); then
+        local started=$SECONDS
+        cp -a --reflink=auto "$cntdir"/. "$instdir"
+        echo "Copied $(find "$cntdir" -type f | wc -l) files ($(du -sb "$cntdir" | cut -f1) bytes)" \
+            "to $instdir in $((SECONDS - started))s"
+    else
+        cp -av --reflink=auto "$cntdir"/. "$instdir"
+    fi
     chmod -R +w "$instdir"/*
 }
 
+save_manifest() {
+    local instdir=$1
+    local manifest
+
+    manifest=$(common_topdir)/manifest.sha256
+    if [[ -f $manifest ]]; then
+        mkdir -p "$instdir/.pgflow"
+        cp "$manifest" "$instdir/.pgflow/manifest.sha256"
+    fi
+}
+
+# Print "STATUS PATH" for every entry of the new manifest, where STATUS is
+# `same` if the old manifest has the same checksum for PATH, else `changed`.
+manifest_status() {
+    local oldmf=$1
+    local newmf=$2
+
+    awk 'NR == FNR {old[substr($0, 67)] = substr($0, 1, 64); next}
+         {path = substr($0, 67); hash = substr($0, 1, 64)
+          print ((path in old && old[path] == hash) ? "same" : "changed"), path}' "$oldmf" "$newmf"
+}
+
+# Print the paths listed in the old manifest but not in the new one.
+manifest_removed() {
+    local oldmf=$1
+    local newmf=$2
+
+    awk 'NR == FNR {new[substr($0, 67)] = 1; next}
+         !(substr($0, 67) in new) {print substr($0, 67)}' "$newmf" "$oldmf"
+}
+
+# Copy `src` next to `dst` as `dst.pgflow-new`.  The staged copy is patched
+# first and renamed into place by commit_staged, so no process ever runs an
+# unpatched or half-written file.
+stage_file() {
+    local src=$1
+    local dst=$2
+    local tmp=$dst.pgflow-new
+
+    mkdir -p "$(dirname "$dst")"
+    rm -f "$tmp"
+    cp -P --preserve=mode,timestamps "$src" "$tmp"
+    if [[ ! -L $tmp ]]; then
+        chmod u+w "$tmp"
+    fi
+    printf '%s\n' "$dst" >> "$staged_list"
+}
+
+# Replace every staged file through a rename in the same directory, so running
+# programs keep the old inode and readers never see a partial file.
+commit_staged() {
+    local dst
+
+    if [[ -z $staged_list ]]; then
+        return 0
+    fi
+    while IFS= read -r dst; do
+        mv -Tf "$dst.pgflow-new" "$dst"
+    done < "$staged_list"
+    : > "$staged_list"
+}
+
+# Remove staged copies left behind by a failed upgrade, and the work lists.
+cleanup_staged() {
+    local dst
+
+    if [[ -f $staged_list ]]; then
+        while IFS= read -r dst; do
+            rm -f "$dst.pgflow-new"
+        done < "$staged_list"
+    fi
+    rm -f "$staged_list" "$patch_list"
+}
+
+upgrade_content() {
+    local instdir=$1
+    local cntdir
+    local newmf
+    local oldmf
+    local status
+    local path
+    local copied=0
+    local kept=0
+    local removed=0
+
+    cntdir=$(common_topdir)/content
+    newmf=$(common_topdir)/manifest.sha256
+    oldmf=$instdir/.pgflow/manifest.sha256
+    if [[ ! -f $newmf || ! -f $oldmf ]]; then
+        echo "No manifest to compare with, installing all files"
+        copy_content "$instdir"
+        return 0
+    fi
+
+    patch_list=$(mktemp "${TMPDIR:-/tmp}/pgflow-upgrade.XXXXXX")
+    staged_list=$(mktemp "${TMPDIR:-/tmp}/pgflow-staged.XXXXXX")
+    trap cleanup_staged EXIT
+
+    while IFS= read -r path; do
+        mkdir -p "$instdir/$path"
+    done < <(cd "$cntdir" && find . -type d)
+
+    while read -r status path; do
+        if [[ $status == same && -f $instdir/$path ]]; then
+            kept=$((kept + 1))
+            continue
+        fi
+        stage_file "$cntdir/$path" "$instdir/$path"
+        realpath -s "$instdir/$path.pgflow-new" >> "$patch_list"
+        copied=$((copied + 1))
+    done < <(manifest_status "$oldmf" "$newmf")
+
+    while IFS= read -r path; do
+        stage_file "$cntdir/$path" "$instdir/$path"
+    done < <(cd "$cntdir" && find . -type l)
+
+    while IFS= read -r path; do
+        rm -f "$instdir/$path"
+        removed=$((removed + 1))
+    done < <(manifest_removed "$oldmf" "$newmf")
+
+    echo "Upgraded $instdir: $copied files copied, $kept unchanged, $removed removed"
+}
+
 detect_arch() {
     case "$(uname -m)" in
         x86_64)         echo "x86-64" ;;
@@ -111,13 +246,20 @@ set_interpreter_for_paths() {
     local patchelf_dir=$1
     local interp_path=$2
     local bin
+    local patched=0
 
     while IFS= read -r bin; do
         if [[ $(cd "$patchelf_dir" && LD_LIBRARY_PATH=null ./bin/patchelf --print-interpreter "$bin") != "$interp_path" ]]; then
-            echo "Set the interpreter of $bin to $interp_path"
+            if ! ((${quiet:-0})); then
+                echo "Set the interpreter of $bin to $interp_path"
+            fi
             (cd "$patchelf_dir" && LD_LIBRARY_PATH=null ./bin/patchelf --set-interpreter "$interp_path" "$bin")
+            patched=$((patched + 1))
         fi
     done
+    if ((${quiet:-0})); then
+        echo "Set the interpreter of $patched files to $interp_path"
+    fi
 }
 
 set_interpreter() {
@@ -135,6 +277,7 @@ set_interpreter() {
     local exec_path
     local interp_path
     local arch
+    local paths
 
     shift
     while [[ $# -gt 0 ]]; do
@@ -155,9 +298,19 @@ set_interpreter() {
         copied_lib_dir=$instdir/lib/copied
     fi
 
-    exec_path=$(first_elf_executable "$bindir" "$libdir")
-    if [[ -z $exec_path ]]; then
-        exec_path=$(first_elf_executable "$instdir")
+    # In upgrade mode only the files copied from the new package need patching.
+    if [[ -n $patch_list ]]; then
+        mapfile -t paths < <(grep -F "$instdir/" "$patch_list" || true)
+        if [[ ${#paths[@]} == 0 ]]; then
+            return 0
+        fi
+        exec_path=$(first_elf_executable "${paths[@]}")
+    else
+        paths=("$instdir")
+        exec_path=$(first_elf_executable "$bindir" "$libdir")
+        if [[ -z $exec_path ]]; then
+            exec_path=$(first_elf_executable "$instdir")
+        fi
     fi
     if [[ -z $exec_path ]]; then
         return 0
@@ -166,7 +319,7 @@ set_interpreter() {
     interp_path=$(interpreter_path_from_probe "$patchelf_dir" "$exec_path" "$copied_lib_dir")
     arch=$(detect_arch)
 
-    file_find "$patchelf_dir" "$instdir" "${find_args[@]}" \
+    file_find "$patchelf_dir" "${paths[@]}" "${find_args[@]}" \
         | elf_executable_paths "$arch" \
         | set_interpreter_for_paths "$patchelf_dir" "$interp_path"
 }
@@ -188,9 +341,90 @@ fix_python_scripts() {
     done
 }
 
+delta_info() {
+    local key=$1
+
+    sed -n "s/^$key=//p" "$(common_topdir)/delta.info"
+}
+
+install_delta() {
+    local basepkg=$1
+    local instdir=$2
+    local topdir
+    local workdir
+    local sha256
+
+    topdir=$(common_topdir)
+    if [[ ! -f $topdir/delta.info ]]; then
+        die "error: not a delta package: $topdir"
+    fi
+    if [[ ! -f $basepkg ]]; then
+        die "error: base package not found: $basepkg"
+    fi
+
+    sha256=$(sha256sum "$basepkg" | cut -d' ' -f1)
+    if [[ $sha256 != "$(delta_info BASE_SHA256)" ]]; then
+        die "error: base package mismatch, expected $(delta_info BASE): $basepkg"
+    fi
+
+    workdir=$(mktemp -d "${TMPDIR:-/tmp}/pgflow-delta.XXXXXX")
+    trap 'rm -rf "$workdir"' EXIT
+    echo "Applying delta $(delta_info BASE) -> $(delta_info TARGET)"
+    gzip -dc "$basepkg" > "$workdir/base.tar"
+    (cd "$topdir/zstd" && LD_LIBRARY_PATH=null ./bin/zstd -q -d --long=31 \
+        --patch-from="$workdir/base.tar" "$topdir/delta.zst" -o "$workdir/target.tar")
+    sha256=$(sha256sum "$workdir/target.tar" | cut -d' ' -f1)
+    if [[ $sha256 != "$(delta_info TARGET_TAR_SHA256)" ]]; then
+        die "error: reconstructed package checksum mismatch: $(delta_info TARGET)"
+    fi
+
+    mkdir "$workdir/package"
+    tar -xf "$workdir/target.tar" -C "$workdir/package"
+    rm -f "$workdir/base.tar" "$workdir/target.tar"
+    "$workdir/package/install.sh" ${quiet:+--quiet} "$instdir"
+}
+
+usage() {
+    cat >&2 <<EOF
+Usage: $progname [--quiet] [--upgrade] INSTDIR
+       $progname [--quiet] --delta BASEPKG INSTDIR
+
+  --quiet    Print one summary line per step instead of every file.
+  --upgrade  Copy only files whose checksum differs from the installed
+             package manifest and re-patch only those files.
+EOF
+}
+
+# stream_install.sh sources this script for the helpers above.
+if [[ ${BASH_SOURCE[0]} != "$0" ]]; then
+    return 0
+fi
+
 progname=$(basename "$0")
+quiet=
+if [[ ${1:-} == --quiet ]]; then
+    quiet=1
+    shift
+fi
+if [[ ${1:-} == --delta ]]; then
+    if [[ $# != 3 ]]; then
+        usage
+        exit 1
+    fi
+    install_delta "$(realpath "$2")" "$3"
+    exit 0
+fi
+
+upgrade=0
+patch_list=
+staged_list=
+if [[ ${1:-} == --upgrade ]]; then
+    upgrade=1
+    shift
+fi
+
 if [[ $# != 1 ]]; then
-    echo "Usage: $progname INSTDIR" >&2
+    usage
     exit 1
 fi
 
@@ -198,7 +432,14 @@ instdir=$1
 mkdir -p $instdir
 instdir=$(realpath "$instdir")
 
-copy_content "$instdir"
+# An upgrade stages new files as *.pgflow-new, patches them, renames them into
+# place and only then records the new manifest.
+if ((upgrade)); then
+    upgrade_content "$instdir"
+else
+    copy_content "$instdir"
+    save_manifest "$instdir"
+fi
 
 excludedirs=()
 if [[ -f $instdir/bin/postgres ]]; then
@@ -210,14 +451,19 @@ fi
 
 if [[ -d $instdir/unixodbc ]]; then
     set_interpreter "$instdir/unixodbc"
-elif has_elf_executable "$instdir" "${excludedirs[@]}"; then
+elif [[ -n $patch_list ]] || has_elf_executable "$instdir" "${excludedirs[@]}"; then
     set_interpreter "$instdir" "${excludedirs[@]}"
 fi
 
-if [[ -d $instdir/jdk ]] && has_elf_executable "$instdir/jdk"; then
+if [[ -d $instdir/jdk ]] && { [[ -n $patch_list ]] || has_elf_executable "$instdir/jdk"; }; then
     set_interpreter "$instdir/jdk"
 fi
 
+if ((upgrade)); then
+    commit_staged
+    save_manifest "$instdir"
+fi
+
 if [[ -f $instdir/bin/python ]]; then
     fix_python_scripts "$instdir"
 fi
@@ -0,0 +1,195 @@
+/*
+ * Relocatable launcher used by wrap_envs.sh in place of /bin/sh wrappers.
+ *
+ * A wrapped program `DIR/NAME` is a copy of this launcher.  It resolves its
+ * own location through /proc/self/exe, reads the env spec `DIR/.NAME.env`,
+ * exports the variables and execs the real program `DIR/.NAME`.
+ *
+ * Env spec format, one entry per line:
+ *   # comment
+ *   @up=../..          TOPDIR relative to DIR (default ".")
+ *   NAME=VALUE         $VAR and ${VAR} are expanded; TOPDIR is the package top
+ */
+
+#define _GNU_SOURCE
+
+#include <ctype.h>
+#include <errno.h>
+#include <limits.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <unistd.h>
+
+#define PROGNAME "pgflow-launcher"
+
+static char topdir[PATH_MAX];
+
+static void
+die(const char *fmt, const char *arg)
+{
+	fprintf(stderr, PROGNAME ": ");
+	fprintf(stderr, fmt, arg);
+	fprintf(stderr, "\n");
+	exit(127);
+}
+
+static void
+append(char **buf, size_t *len, size_t *cap, const char *s, size_t n)
+{
+	if (*len + n + 1 > *cap)
+	{
+		while (*len + n + 1 > *cap)
+			*cap = *cap ? *cap * 2 : 256;
+		*buf = realloc(*buf, *cap);
+		if (*buf == NULL)
+			die("%s", "out of memory");
+	}
+	memcpy(*buf + *len, s, n);
+	*len += n;
+	(*buf)[*len] = '\0';
+}
+
+static const char *
+lookup(const char *name)
+{
+	const char *value;
+
+	if (strcmp(name, "TOPDIR") == 0)
+		return topdir;
+	value = getenv(name);
+	return value ? value : "";
+}
+
+/* Expand $VAR and ${VAR} references in `value`; returns a malloc'd string. */
+static char *
+expand(const char *value)
+{
+	char	   *buf = NULL;
+	size_t		len = 0;
+	size_t		cap = 0;
+	const char *p = value;
+
+	append(&buf, &len, &cap, "", 0);
+	while (*p)
+	{
+		const char *start;
+		char		name[256];
+		size_t		n;
+		int			braced = 0;
+
+		if (*p != '$')
+		{
+			append(&buf, &len, &cap, p, 1);
+			p++;
+			continue;
+		}
+		p++;
+		if (*p == '{')
+		{
+			braced = 1;
+			p++;
+		}
+		start = p;
+		while (*p == '_' || isalnum((unsigned char) *p))
+			p++;
+		n = p - start;
+		if (n == 0 || n >= sizeof(name) || (braced && *p != '}'))
+			die("invalid variable reference in: %s", value);
+		memcpy(name, start, n);
+		name[n] = '\0';
+		if (braced)
+			p++;
+		append(&buf, &len, &cap, lookup(name), strlen(lookup(name)));
+	}
+	return buf;
+}
+
+static void
+load_spec(const char *specpath, const char *selfdir)
+{
+	FILE	   *f;
+	char	   *line = NULL;
+	size_t		cap = 0;
+	ssize_t		n;
+	int			have_topdir = 0;
+
+	f = fopen(specpath, "r");
+	if (f == NULL)
+		die("cannot open env spec: %s", specpath);
+
+	while ((n = getline(&line, &cap, f)) != -1)
+	{
+		char	   *eq;
+		char	   *value;
+
+		while (n > 0 && (line[n - 1] == '\n' || line[n - 1] == '\r'))
+			line[--n] = '\0';
+		if (n == 0 || line[0] == '#')
+			continue;
+
+		eq = strchr(line, '=');
+		if (eq == NULL)
+			die("invalid env spec line: %s", line);
+		*eq = '\0';
+
+		if (strcmp(line, "@up") == 0)
+		{
+			char		joined[PATH_MAX];
+
+			if (snprintf(joined, sizeof(joined), "%s/%s", selfdir, eq + 1) >= (int) sizeof(joined) ||
+				realpath(joined, topdir) == NULL)
+				die("cannot resolve TOPDIR: %s", joined);
+			have_topdir = 1;
+			continue;
+		}
+		if (!have_topdir)
+		{
+			if (realpath(selfdir, topdir) == NULL)
+				die("cannot resolve TOPDIR: %s", selfdir);
+			have_topdir = 1;
+		}
+
+		value = expand(eq + 1);
+		if (setenv(line, value, 1) != 0)
+			die("cannot set variable: %s", line);
+		free(value);
+	}
+	free(line);
+	fclose(f);
+}
+
+int
+main(int argc, char **argv)
+{
+	char		self[PATH_MAX];
+	char		specpath[PATH_MAX];
+	char		target[PATH_MAX];
+	char	   *slash;
+	const char *base;
+	ssize_t		n;
+
+	(void) argc;
+
+	n = readlink("/proc/self/exe", self, sizeof(self) - 1);
+	if (n < 0)
+		die("cannot read %s", "/proc/self/exe");
+	self[n] = '\0';
+
+	slash = strrchr(self, '/');
+	if (slash == NULL)
+		die("unexpected executable path: %s", self);
+	*slash = '\0';
+	base = slash + 1;
+
+	if (snprintf(specpath, sizeof(specpath), "%s/.%s.env", self, base) >= (int) sizeof(specpath) ||
+		snprintf(target, sizeof(target), "%s/.%s", self, base) >= (int) sizeof(target))
+		die("path too long: %s", self);
+
+	load_spec(specpath, self);
+
+	argv[0] = target;
+	execv(target, argv);
+	fprintf(stderr, PROGNAME ": cannot execute %s: %s\n", target, strerror(errno));
+	return 127;
+}
@@ -0,0 +1,104 @@
+#!/usr/bin/env bash
+# Pick the make job count from the cgroup CPU quota and the memory available
+# to this cgroup, allowing MEM_PER_JOB MiB per job.  The cgroup is the one
+# named in /proc/self/cgroup; with cgroup v2 the limits of its ancestors
+# apply as well.  Prints the reasoning,
+# then "JOBS LOAD" on the last line: pass them as `make -jJOBS -lLOAD` so make
+# also stops starting jobs while the load average is above the usable cpus.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# != 1 ]]; then
+    echo "Usage: $PROGNAME MEM_PER_JOB" >&2
+    exit 1
+fi
+
+MEM_PER_JOB=$1
+CGROUP=${CGROUP_ROOT:-/sys/fs/cgroup}
+PROC_CGROUP=${PROC_CGROUP:-/proc/self/cgroup}
+MEMINFO=${MEMINFO:-/proc/meminfo}
+
+# 本进程所在 cgroup 的目录：v2 为 "0::PATH" 行，v1 为 "N:CONTROLLERS:PATH" 中含 CONTROLLER 的行。
+# 挂载点下没有该路径（如没有 cgroup 命名空间的容器只挂载了自己的 cgroup）时用挂载点本身。
+cgroup_dir() {
+    local mount=$1
+    local controller=$2
+    local path=
+
+    path=$(awk -F: -v c="$controller" '
+        c == "" && $1 == "0" && $2 == "" { print $3; exit }
+        c != "" && $2 ~ "(^|,)" c "(,|$)" { print $3; exit }' "$PROC_CGROUP" 2>/dev/null || true)
+    if [[ -n $path && -d $mount${path%/} ]]; then
+        echo "$mount${path%/}"
+    else
+        echo "$mount"
+    fi
+}
+
+# v2 的限制也可能设在上级 cgroup，依次列出 cgroup 目录及其直到挂载点的各级上级。
+cgdirs=()
+dir=$(cgroup_dir "$CGROUP" '')
+while :; do
+    cgdirs+=("$dir")
+    [[ $dir == "$CGROUP"/* ]] || break
+    dir=${dir%/*}
+done
+
+cpus=$(nproc)
+quota_cpus=
+for dir in "${cgdirs[@]}"; do
+    # cgroup v2: "QUOTA PERIOD" 或 "max PERIOD"，取各级中最小的配额。
+    [[ -f $dir/cpu.max ]] || continue
+    read -r quota period < "$dir/cpu.max"
+    [[ $quota != max ]] || continue
+    dir_cpus=$(( (quota + period - 1) / period ))
+    if [[ -z $quota_cpus || $dir_cpus -lt $quota_cpus ]]; then
+        quota_cpus=$dir_cpus
+    fi
+done
+cpudir=$(cgroup_dir "$CGROUP/cpu" cpu)
+if [[ -z $quota_cpus && -f $cpudir/cpu.cfs_quota_us ]]; then
+    quota=$(cat "$cpudir/cpu.cfs_quota_us")
+    period=$(cat "$cpudir/cpu.cfs_period_us")
+    if [[ $quota -gt 0 ]]; then
+        quota_cpus=$(( (quota + period - 1) / period ))
+    fi
+fi
+if [[ -n $quota_cpus && $quota_cpus -lt $cpus ]]; then
+    cpus=$quota_cpus
+fi
+
+avail_kb=$(awk '$1 == "MemAvailable:" { print $2 }' "$MEMINFO")
+limits=()
+for dir in "${cgdirs[@]}"; do
+    # cgroup v2：各级 memory.max 减去该级的 memory.current，取最小的余量。
+    [[ -f $dir/memory.max && -f $dir/memory.current ]] || continue
+    limits+=("$(cat "$dir/memory.max") $(cat "$dir/memory.current")")
+done
+memdir=$(cgroup_dir "$CGROUP/memory" memory)
+if [[ ${#limits[@]} == 0 && -f $memdir/memory.limit_in_bytes ]]; then
+    limits+=("$(cat "$memdir/memory.limit_in_bytes") $(cat "$memdir/memory.usage_in_bytes")")
+fi
+for item in "${limits[@]}"; do
+    read -r limit usage <<<"$item"
+    # cgroup v1 没有限制时是一个接近 2^63 的值。
+    if [[ $limit != max && ${#limit} -lt 19 ]]; then
+        cgroup_kb=$(( (limit - usage) / 1024 ))
+        if [[ $cgroup_kb -lt $avail_kb ]]; then
+            avail_kb=$cgroup_kb
+        fi
+    fi
+done
+avail_mb=$(( avail_kb > 0 ? avail_kb / 1024 : 0 ))
+
+jobs=$(( avail_mb / MEM_PER_JOB ))
+if [[ $jobs -gt $cpus ]]; then
+    jobs=$cpus
+fi
+if [[ $jobs -lt 1 ]]; then
+    jobs=1
+fi
+
+echo "make jobs: $jobs (cpus $(nproc), cgroup quota ${quota_cpus:-none}, available memory ${avail_mb} MiB at ${MEM_PER_JOB} MiB per job), load limit $cpus"
+echo "$jobs $cpus"
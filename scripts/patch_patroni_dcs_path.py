@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Let a Nuitka-built patroni load DCS backends from lib/dcs next to its binary."""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+
+MARKER = "pgflow: DCS extension modules"
+
+DCS_INIT_APPEND = f"""
+
+# {MARKER} live in dcs/ next to the standalone binary,
+# since the binary itself takes the name patroni in that directory.
+try:
+    import os as _pgflow_os
+    __path__.append(_pgflow_os.path.join(__compiled__.containing_dir, 'dcs'))  # noqa: F821
+except NameError:
+    pass
+"""
+
+
+def patch_dcs_init(init: Path) -> None:
+    text = init.read_text()
+    if MARKER in text:
+        return
+    init.write_text(text + DCS_INIT_APPEND)
+
+
+def patch_dynamic_loader(loader: Path) -> None:
+    text = loader.read_text()
+    old = "pkgutil.iter_modules([os.path.dirname(pkg_file)], module_prefix)"
+    new = ("pkgutil.iter_modules([os.path.dirname(pkg_file), "
+           "*getattr(sys.modules[package], '__path__', ())], module_prefix)")
+    if new in text:
+        return
+    if old not in text:
+        raise RuntimeError(f"patch target not found: {old!r}")
+    loader.write_text(text.replace(old, new, 1))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Patch patroni to look up DCS modules on the patroni.dcs package path, "
+                    "extended with the dcs/ directory next to a Nuitka standalone binary.",
+    )
+    parser.add_argument(
+        "srcdir",
+        type=Path,
+        metavar="PATRONI_SOURCE_DIR",
+        help="patroni source directory.",
+    )
+    args = parser.parse_args()
+
+    init = args.srcdir / "patroni/dcs/__init__.py"
+    loader = args.srcdir / "patroni/dynamic_loader.py"
+    for path in (init, loader):
+        if not path.is_file():
+            print(f"error: file not found: {path}", file=sys.stderr)
+            return 1
+
+    try:
+        patch_dcs_init(init)
+        patch_dynamic_loader(loader)
+    except RuntimeError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,54 @@
+#!/usr/bin/env bash
+# Create, start and stop a throwaway PostgreSQL cluster for benchmarks.
+# The unix socket lives in PGDATA and TCP is disabled.
+
+set -e
+
+PROGNAME=$(basename "$0")
+
+usage() {
+    cat >&2 <<EOF2
+Usage: $PROGNAME start PGHOME PGDATA PORT [SETTING ...]
+       $PROGNAME stop PGHOME PGDATA
+
+  start  Run initdb if PGDATA is empty, then start the server with the given
+         name=value settings.
+  stop   Stop the server (fast mode) if it is running.
+EOF2
+}
+
+if [[ $# -lt 3 ]]; then
+    usage
+    exit 1
+fi
+
+cmd=$1
+pghome=$2
+pgdata=$3
+shift 3
+
+case "$cmd" in
+    start)
+        if [[ $# -lt 1 ]]; then
+            usage
+            exit 1
+        fi
+        port=$1
+        shift
+        if [[ ! -e $pgdata/PG_VERSION ]]; then
+            "$pghome/bin/initdb" -D "$pgdata" -A trust --no-locale --encoding=UTF8 >/dev/null
+        fi
+        opts="-k '$pgdata' -p $port -c listen_addresses=''"
+        for setting in "$@"; do
+            opts+=" -c $setting"
+        done
+        "$pghome/bin/pg_ctl" -D "$pgdata" -o "$opts" -l "$pgdata/postgres.log" -w start >/dev/null
+        ;;
+    stop)
+        "$pghome/bin/pg_ctl" -D "$pgdata" -m fast -w stop >/dev/null 2>&1 || true
+        ;;
+    *)
+        usage
+        exit 1
+        ;;
+esac
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Report where the bytes of a package directory come from."""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import stat
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+
+def human(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def sha256sum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan(topdir: Path) -> list[tuple[Path, os.stat_result]]:
+    files = []
+    for dirpath, _, filenames in os.walk(topdir):
+        for name in filenames:
+            path = Path(dirpath, name)
+            st = path.lstat()
+            if stat.S_ISREG(st.st_mode):
+                files.append((path, st))
+    return files
+
+
+def find_duplicates(
+    files: list[tuple[Path, os.stat_result]],
+) -> list[list[Path]]:
+    """Group byte-identical files with the same mode, ignoring existing hard links."""
+    by_size = defaultdict(list)
+    seen_inodes = set()
+    for path, st in files:
+        if st.st_size == 0 or (st.st_dev, st.st_ino) in seen_inodes:
+            continue
+        seen_inodes.add((st.st_dev, st.st_ino))
+        by_size[(st.st_size, stat.S_IMODE(st.st_mode))].append(path)
+
+    groups = []
+    for paths in by_size.values():
+        if len(paths) < 2:
+            continue
+        by_hash = defaultdict(list)
+        for path in paths:
+            by_hash[sha256sum(path)].append(path)
+        groups.extend(sorted(group) for group in by_hash.values() if len(group) > 1)
+    groups.sort(key=lambda group: group[0].stat().st_size * (len(group) - 1), reverse=True)
+    return groups
+
+
+def hardlink(groups: list[list[Path]]) -> int:
+    saved = 0
+    for group in groups:
+        first = group[0]
+        for path in group[1:]:
+            tmp = path.with_name(f".{path.name}.pgflow-link")
+            os.link(first, tmp)
+            os.replace(tmp, path)
+            saved += first.stat().st_size
+    return saved
+
+
+def report(
+    topdir: Path,
+    files: list[tuple[Path, os.stat_result]],
+    groups: list[list[Path]],
+    depth: int,
+    top: int,
+    linked: bool,
+) -> tuple[str, int]:
+    total = 0
+    seen_inodes = set()
+    by_dir = defaultdict(int)
+    for path, st in files:
+        if (st.st_dev, st.st_ino) in seen_inodes:
+            continue
+        seen_inodes.add((st.st_dev, st.st_ino))
+        total += st.st_size
+        parts = path.relative_to(topdir).parent.parts[:depth]
+        by_dir["/".join(parts) or "."] += st.st_size
+
+    lines = [f"Total: {human(total)} in {len(files)} files", "", "Per-directory:"]
+    for name, size in sorted(by_dir.items(), key=lambda item: item[1], reverse=True):
+        lines.append(f"  {human(size):>12}  {name}")
+
+    lines += ["", f"Largest {top} files:"]
+    for path, st in sorted(files, key=lambda item: item[1].st_size, reverse=True)[:top]:
+        lines.append(f"  {human(st.st_size):>12}  {path.relative_to(topdir)}")
+
+    wasted = sum(group[0].stat().st_size * (len(group) - 1) for group in groups)
+    state = "hard linked" if linked else "reclaimable"
+    lines += ["", f"Duplicate groups: {len(groups)} ({human(wasted)} {state})"]
+    for group in groups[:top]:
+        lines.append(f"  {human(group[0].stat().st_size):>12} x{len(group)}")
+        lines.extend(f"      {path.relative_to(topdir)}" for path in group)
+    return "\n".join(lines) + "\n", total
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Report package size by directory, largest files and duplicates.",
+    )
+    parser.add_argument("topdir", type=Path, metavar="DIR", help="Package directory.")
+    parser.add_argument("--output", type=Path, help="Write the report to this file.")
+    parser.add_argument("--depth", type=int, default=3, help="Directory breakdown depth.")
+    parser.add_argument("--top", type=int, default=20, help="Number of largest files/groups.")
+    parser.add_argument("--hardlink", action="store_true",
+                        help="Replace duplicate files with hard links.")
+    parser.add_argument("--budget", type=int, metavar="MIB",
+                        help="Fail if the package exceeds this many MiB.")
+    args = parser.parse_args()
+
+    if not args.topdir.is_dir():
+        print(f"error: not a directory: {args.topdir}", file=sys.stderr)
+        return 1
+
+    files = scan(args.topdir)
+    groups = find_duplicates(files)
+    if args.hardlink and groups:
+        saved = hardlink(groups)
+        print(f"Hard linked {sum(len(g) - 1 for g in groups)} duplicate files, saved {human(saved)}")
+        files = scan(args.topdir)
+
+    text, total = report(args.topdir, files, groups, args.depth, args.top, args.hardlink)
+    print(text, end="")
+    if args.output:
+        args.output.write_text(text)
+
+    if args.budget is not None and total > args.budget * 1024 * 1024:
+        print(f"error: package size {human(total)} exceeds budget {args.budget} MiB",
+              file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env bash
+# Realise the closure of a nix dev shell in the background and pin it with a
+# GC root profile, so the first `nix develop` of a stage does not block on the
+# binary cache and later runs skip the fetch.
+
+set -e
+
+PROGNAME=$(basename "$0")
+
+usage() {
+    cat >&2 <<EOF2
+Usage: $PROGNAME start STATEDIR INSTALLABLE PROFILE
+       $PROGNAME wait STATEDIR [TIMEOUT]
+
+  start  Run \`nix develop INSTALLABLE --profile PROFILE\` in the background.
+         PROFILE is a GC root; older generations of it are deleted.
+  wait   Wait for the fetch, then print the closure size and fetch time.
+         Fails if the background fetch dies or takes longer than TIMEOUT
+         seconds (default 3600).
+EOF2
+}
+
+cmd=${1:-}
+statedir=${2:-}
+
+case "$cmd" in
+    start)
+        [[ $# -eq 4 ]] || { usage; exit 1; }
+        mkdir -p "$statedir" "$(dirname "$4")"
+        rm -f "$statedir/status" "$statedir/pid"
+        echo "$3" >"$statedir/installable"
+        echo "$4" >"$statedir/profile"
+        nohup "$0" run "$statedir" "$3" "$4" </dev/null >/dev/null 2>&1 &
+        echo $! >"$statedir/pid"
+        ;;
+    run)
+        start=$(date +%s%N)
+        status=0
+        # nix 默认并行下载缺失的路径（max-substitution-jobs）。
+        nix develop "$3" --profile "$4" --log-format raw -c true >"$statedir/log" 2>&1 || status=$?
+        if [[ $status == 0 ]]; then
+            nix-env -p "$4" --delete-generations old >/dev/null 2>&1 || true
+        fi
+        echo $((($(date +%s%N) - start) / 1000000)) >"$statedir/elapsed_ms"
+        echo "$status" >"$statedir/status.tmp"
+        mv "$statedir/status.tmp" "$statedir/status"
+        ;;
+    wait)
+        [[ $# -eq 2 || $# -eq 3 ]] || { usage; exit 1; }
+        timeout=${3:-3600}
+        pid=$(cat "$statedir/pid")
+        deadline=$(($(date +%s) + timeout))
+        while [[ ! -f $statedir/status ]]; do
+            # 后台进程被杀死（如节点重启）时不会写 status，先确认进程还在。
+            if ! kill -0 "$pid" 2>/dev/null && [[ ! -f $statedir/status ]]; then
+                echo "error: fetch of $(cat "$statedir/installable") exited without a status:" >&2
+                cat "$statedir/log" >&2 || true
+                exit 1
+            fi
+            if (($(date +%s) >= deadline)); then
+                echo "error: fetch of $(cat "$statedir/installable") did not finish in ${timeout}s" >&2
+                exit 1
+            fi
+            sleep 1
+        done
+        status=$(cat "$statedir/status")
+        if [[ $status != 0 ]]; then
+            echo "error: failed to realise $(cat "$statedir/installable"):" >&2
+            cat "$statedir/log" >&2
+            exit "$status"
+        fi
+        envpath=$(readlink -f "$(cat "$statedir/profile")")
+        paths=$(nix path-info -r "$envpath" | wc -l)
+        size=$(nix path-info -S "$envpath" | awk '{print $2}')
+        fetched=$(grep -c "^copying path '" "$statedir/log" || true)
+        elapsed=$(awk -v ms="$(cat "$statedir/elapsed_ms")" 'BEGIN {printf "%.1f", ms / 1000}')
+        echo "Dev shell $(cat "$statedir/installable"): closure $paths paths," \
+             "$(numfmt --to=iec-i --suffix=B "$size"), fetched $fetched paths in ${elapsed}s," \
+             "GC root $(cat "$statedir/profile")"
+        ;;
+    *)
+        usage
+        exit 1
+        ;;
+esac
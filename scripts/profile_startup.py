@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Measure the startup wall time and peak RSS of commands, and summarize
+`python -X importtime` output of their source equivalents."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+
+def measure(cmd: str, runs: int) -> dict:
+    """Run `cmd` `runs` times; return median/min wall time and max RSS."""
+    argv = shlex.split(cmd)
+    walls = []
+    rss = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _, status, usage = os.wait4(proc.pid, 0)
+        walls.append((time.perf_counter() - start) * 1000)
+        rss.append(usage.ru_maxrss)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    return {
+        'cmd': cmd,
+        'runs': runs,
+        'returncode': proc.returncode,
+        'wall_ms_median': round(statistics.median(walls), 2),
+        'wall_ms_min': round(min(walls), 2),
+        'maxrss_kib': max(rss),
+    }
+
+
+def importtime(cmd: str, top: int) -> dict:
+    """Run `cmd` (a python -X importtime command line) and parse its report."""
+    proc = subprocess.run(shlex.split(cmd), stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True)
+    modules = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        selftime, cumulative, name = line[len('import time:'):].split('|', 2)
+        modules.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_us': int(selftime),
+            'cumulative_us': int(cumulative),
+        })
+    return {
+        'cmd': cmd,
+        'returncode': proc.returncode,
+        'modules': len(modules),
+        'total_us': sum(m['self_us'] for m in modules),
+        'top_cumulative': sorted((m for m in modules if m['depth'] == 0),
+                                 key=lambda m: m['cumulative_us'], reverse=True)[:top],
+        'top_self': sorted(modules, key=lambda m: m['self_us'], reverse=True)[:top],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', required=True, help='JSON report path.')
+    parser.add_argument('--runs', type=int, default=10, help='Runs per --cmd.')
+    parser.add_argument('--top', type=int, default=15, help='Modules listed per importtime report.')
+    parser.add_argument('--cmd', action='append', default=[],
+                        help='Command to measure (wall time, RSS).')
+    parser.add_argument('--importtime', action='append', default=[],
+                        help='python -X importtime command to summarize.')
+    args = parser.parse_args()
+
+    report = {
+        'commands': [measure(cmd, args.runs) for cmd in args.cmd],
+        'importtime': [importtime(cmd, args.top) for cmd in args.importtime],
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+    for item in report['commands']:
+        print(f"{item['wall_ms_median']:>9.2f} ms {item['maxrss_kib']:>8} KiB  {item['cmd']}")
+    for item in report['importtime']:
+        print(f"{item['total_us'] / 1000:>9.2f} ms {item['modules']:>5} modules  {item['cmd']}")
+        for m in item['top_cumulative']:
+            print(f"{m['cumulative_us'] / 1000:>14.2f} ms  {m['module']}")
+    failed = [item['cmd'] for item in report['commands'] if item['returncode'] != 0]
+    if failed:
+        print(f'error: command failed: {failed}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
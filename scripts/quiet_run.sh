@@ -0,0 +1,52 @@
+#!/usr/bin/env bash
+# Run CMD with its output appended to the gzip-compressed LOG instead of
+# stdout, then print a one-line summary: status, duration, lines logged and,
+# for `cp -v` style "SRC -> DEST" lines, the files copied and their bytes.  On
+# failure the last lines of output are printed too and CMD's status returned.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# -lt 3 ]]; then
+    echo "Usage: $PROGNAME LOG LABEL CMD [ARG ...]" >&2
+    exit 1
+fi
+
+LOG=$1
+LABEL=$2
+shift 2
+TAIL_LINES=${QUIET_TAIL_LINES:-20}
+
+mkdir -p "$(dirname "$LOG")"
+out=$(mktemp)
+trap 'rm -f "$out" "$out.gz"' EXIT
+
+started=$(date +%s%N)
+status=0
+"$@" >"$out" 2>&1 || status=$?
+elapsed=$(awk -v ns="$(( $(date +%s%N) - started ))" 'BEGIN { printf "%.1f", ns / 1e9 }')
+
+# 每次运行是一个 gzip 成员，追加后整个文件仍可用 zcat 读取；并发步骤共用日志时加锁。
+{ echo "### $LABEL: $* (status $status, ${elapsed}s)"; cat "$out"; } | gzip -c >"$out.gz"
+if command -v flock >/dev/null; then
+    flock "$LOG.lock" cat "$out.gz" >>"$LOG"
+else
+    cat "$out.gz" >>"$LOG"
+fi
+
+lines=$(wc -l <"$out")
+# cp -v 每个文件输出一行 'SRC' -> 'DEST'，目录和链接不计字节。
+read -r files bytes < <(sed -n "s/^.* -> '\(.*\)'$/\1/p" "$out" \
+    | tr '\n' '\0' | xargs -0 -r stat -c '%F|%s' -- 2>/dev/null \
+    | awk -F'|' '$1 ~ /regular/ { n++; b += $2 } END { print n + 0, b + 0 }')
+summary="$lines lines logged"
+if [[ $files -gt 0 ]]; then
+    summary+=", $files files copied ($bytes bytes)"
+fi
+
+if [[ $status != 0 ]]; then
+    echo "$LABEL: failed with status $status in ${elapsed}s, $summary to $LOG; last lines:"
+    tail -n "$TAIL_LINES" "$out"
+    exit "$status"
+fi
+echo "$LABEL: done in ${elapsed}s, $summary"
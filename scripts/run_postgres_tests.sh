@@ -58,6 +58,15 @@ fix_test_interpreters() {
         done
 }
 
+# 测试树在打包时写入 .pgflow/manifest.sha256 作为结果缓存的内容哈希；旧包没有时在
+# 首次修改测试树之前生成一份。
+if [ "${PGFLOW_TEST_CACHE:-}" != none ] && [ ! -f "$root/.pgflow/manifest.sha256" ]; then
+    mkdir -p "$root/.pgflow"
+    (cd "$root" && find . -path ./.pgflow -prune -o -type f -print | LC_ALL=C sort | tr '\n' '\0' |
+        xargs -0 -r sha256sum) >"$root/.pgflow/manifest.sha256.tmp"
+    mv "$root/.pgflow/manifest.sha256.tmp" "$root/.pgflow/manifest.sha256"
+fi
+
 fix_test_interpreters
 
 # 修正测试包 ELF interpreter 会刷新 ecpg/preproc/ecpg 的 mtime；
@@ -91,6 +100,17 @@ usage() {
 Usage: $(basename "$0") PGHOME [make-target] [make-arg ...]
 
 Default target: installcheck-world
+
+Passed suites are cached per package content, target, arguments, test
+environment and host, and skipped when run again:
+
+  PGFLOW_TEST_SUITES         Space separated directories under src/ to run
+                             one by one with the target minus "-world" and
+                             cache separately (default: the whole target).
+  PGFLOW_TEST_FORCE=1        Run the suites even if they passed before.
+  PGFLOW_TEST_CACHE          Result store directory, "none" to disable
+                             (default: ~/.cache/pgflow/test-results).
+  PGFLOW_TEST_CACHE_MAX_AGE  Days a passed suite stays cached (default: 14).
 EOF
 }
 
@@ -106,6 +126,11 @@ if [[ $# -lt 1 ]]; then
     exit 1
 fi
 pghome=$(CDPATH= cd -- "$1" && pwd)
+
+# 服务端包中带有 Perl 库时，测试包不再单独携带一份，直接链接过去。
+if [[ -d $pghome/lib/copied/perl ]] && [[ -L $root/lib/copied/perl || ! -e $root/lib/copied/perl ]]; then
+    ln -sfn "$pghome/lib/copied/perl" "$root/lib/copied/perl"
+fi
 shift
 
 target=${1:-installcheck-world}
@@ -149,6 +174,82 @@ if [[ ! -d $srcdir ]]; then
     exit 1
 fi
 
+cache=${PGFLOW_TEST_CACHE:-$HOME/.cache/pgflow/test-results}
+max_age=${PGFLOW_TEST_CACHE_MAX_AGE:-14}
+if [[ -n ${PGFLOW_TEST_SUITES:-} ]]; then
+    read -r -a suites <<<"$PGFLOW_TEST_SUITES"
+    suite_target=${target%-world}
+else
+    suites=(all)
+    suite_target=$target
+fi
+
+# PGHOME 的 .pgflow/manifest.sha256 是安装前的包内容哈希，逐个核对文件后才能代表 PGHOME：
+# 只允许安装时设置过 interpreter 的 ELF 程序与清单不同。
+pghome_manifest_intact() {
+    local failed
+    local path
+
+    [[ -f $pghome/.pgflow/manifest.sha256 ]] || return 1
+    failed=$(cd "$pghome" && sha256sum -c --quiet .pgflow/manifest.sha256 2>/dev/null |
+        sed -n 's/: FAILED.*$//p' || true)
+    [[ -n $failed ]] || return 0
+    while IFS= read -r path; do
+        [[ -f $pghome/$path ]] || return 1
+        (cd "$root/patchelf" && LD_LIBRARY_PATH=null ./bin/file -m ./share/misc/magic.mgc "$pghome/$path") |
+            awk '/ELF/ && /executable/ && /dynamically/ { found = 1 } END { exit !found }' || return 1
+    done <<<"$failed"
+}
+
+# 缓存键：两个包的内容哈希、make 目标和参数、影响测试的环境变量和主机类型。
+cache_key() {
+    local pghome_hash
+
+    if pghome_manifest_intact; then
+        pghome_hash=$(sha256sum <"$pghome/.pgflow/manifest.sha256")
+    else
+        pghome_hash=$(cd "$pghome" && find . -type f -print | LC_ALL=C sort | tr '\n' '\0' |
+            xargs -0 -r sha256sum | sha256sum)
+    fi
+    {
+        echo "pghome ${pghome_hash%% *}"
+        echo "tests $(sha256sum <"$root/.pgflow/manifest.sha256" | cut -d' ' -f1)"
+        echo "target $target"
+        printf 'arg %s\n' "$@"
+        for name in PG_TEST_EXTRA PGOPTIONS PROVE_FLAGS PROVE_TESTS EXTRA_REGRESS_OPTS TEMP_CONFIG; do
+            echo "env $name=${!name:-}"
+        done
+        echo "host $(uname -srm) $(. /etc/os-release 2>/dev/null && echo "${ID:-} ${VERSION_ID:-}")"
+    } | sha256sum | cut -d' ' -f1
+}
+
+suite_entry() {
+    echo "$cache/$key/$(echo "$1" | tr / _)"
+}
+
+pending=("${suites[@]}")
+if [[ $cache != none ]]; then
+    mkdir -p "$cache"
+    find "$cache" -mindepth 2 -type f -mtime +"$max_age" -delete
+    find "$cache" -mindepth 1 -type d -empty -delete
+    key=$(cache_key "$@")
+    echo "Test result cache key: $key"
+    if [[ -z ${PGFLOW_TEST_FORCE:-} ]]; then
+        pending=()
+        for suite in "${suites[@]}"; do
+            if [[ -f $(suite_entry "$suite") ]]; then
+                echo "Skip $suite: passed on $(cat "$(suite_entry "$suite")") for this package"
+            else
+                pending+=("$suite")
+            fi
+        done
+    fi
+fi
+if [[ ${#pending[@]} -eq 0 ]]; then
+    echo "All suites passed before for this package, nothing to run"
+    exit 0
+fi
+
 if [[ -e $pgdata/PG_VERSION ]]; then
     "$pghome/bin/pg_ctl" -D "$pgdata" -m fast -w stop >/dev/null 2>&1 || true
     rm -rf "$pgdata"
@@ -166,20 +267,43 @@ trap cleanup EXIT
     -l "$logfile" -w start
 
 cd "$srcdir"
-make "$target" \
-    bindir="$pghome/bin" \
-    libdir="$pghome/lib" \
-    pkglibdir="$pghome/lib" \
-    datadir="$pghome/share" \
-    abs_top_builddir="$srcdir" \
-    abs_top_srcdir="$srcdir" \
-    PG_CONFIG="$pghome/bin/pg_config" \
-    GZIP_PROGRAM="$tools_bin/gzip" \
-    LZ4="$tools_bin/lz4" \
-    MKDIR_P="$tools_bin/mkdir -p" \
-    OPENSSL="$tools_bin/openssl" \
-    PERL="$tools_bin/perl" \
-    PROVE="$tools_bin/perl $tools_bin/prove" \
-    TAR="$tools_bin/tar" \
-    ZSTD="$tools_bin/zstd" \
+make_args=(
+    bindir="$pghome/bin"
+    libdir="$pghome/lib"
+    pkglibdir="$pghome/lib"
+    datadir="$pghome/share"
+    abs_top_builddir="$srcdir"
+    abs_top_srcdir="$srcdir"
+    PG_CONFIG="$pghome/bin/pg_config"
+    GZIP_PROGRAM="$tools_bin/gzip"
+    LZ4="$tools_bin/lz4"
+    MKDIR_P="$tools_bin/mkdir -p"
+    OPENSSL="$tools_bin/openssl"
+    PERL="$tools_bin/perl"
+    PROVE="$tools_bin/perl $tools_bin/prove"
+    TAR="$tools_bin/tar"
+    ZSTD="$tools_bin/zstd"
     "$@"
+)
+
+failed=()
+for suite in "${pending[@]}"; do
+    if [[ $suite == all ]]; then
+        cmd=(make "$target")
+    else
+        cmd=(make -C "$suite" "$suite_target")
+    fi
+    if "${cmd[@]}" "${make_args[@]}"; then
+        if [[ $cache != none ]]; then
+            mkdir -p "$cache/$key"
+            date '+%Y-%m-%d %H:%M:%S' >"$(suite_entry "$suite")"
+        fi
+    else
+        failed+=("$suite")
+    fi
+done
+
+if [[ ${#failed[@]} -gt 0 ]]; then
+    echo "error: failed suites: ${failed[*]}" >&2
+    exit 1
+fi
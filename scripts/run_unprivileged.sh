@@ -0,0 +1,39 @@
+#!/usr/bin/env bash
+# Run CMD as USER when invoked as root, so PostgreSQL, which refuses to run as
+# root, can be started on root-only builders.  WORKDIR is handed over to USER
+# and becomes HOME; everything CMD reads or writes must be inside it (or be
+# world-readable, like the nix store), since the node working directory may
+# not be accessible to other users.  As any other user CMD runs unchanged.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# -lt 3 ]]; then
+    echo "Usage: $PROGNAME USER WORKDIR CMD [ARG ...]" >&2
+    exit 1
+fi
+
+USER_NAME=$1
+WORKDIR=$2
+shift 2
+
+if [[ $(id -u) != 0 ]]; then
+    exec "$@"
+fi
+
+if ! id "$USER_NAME" >/dev/null 2>&1; then
+    echo "error: user not found: $USER_NAME" >&2
+    exit 1
+fi
+group=$(id -g "$USER_NAME")
+chown -R "$USER_NAME:$group" "$WORKDIR"
+export HOME=$WORKDIR
+cd "$WORKDIR"
+
+if command -v setpriv >/dev/null; then
+    exec setpriv --reuid="$USER_NAME" --regid="$group" --init-groups -- "$@"
+elif command -v runuser >/dev/null; then
+    exec runuser -u "$USER_NAME" -m -- "$@"
+fi
+echo "error: cannot drop root privileges to $USER_NAME: neither setpriv nor runuser found" >&2
+exit 1
@@ -0,0 +1,67 @@
+#!/usr/bin/env bash
+# Sample node-wide CPU, memory, disk I/O and load average into OUTPUT in the
+# background.  One line per sample:
+#   EPOCH CPU_BUSY CPU_TOTAL MEM_USED_KB READ_SECTORS WRITE_SECTORS LOAD1
+# CPU values are cumulative jiffies from /proc/stat, I/O values cumulative
+# 512-byte sectors of the whole disks in /proc/diskstats and memory is
+# MemTotal - MemAvailable.
+
+set -e
+
+PROGNAME=$(basename "$0")
+
+usage() {
+    cat >&2 <<EOF2
+Usage: $PROGNAME start OUTPUT [INTERVAL]
+       $PROGNAME stop OUTPUT
+
+  start  Truncate OUTPUT and sample every INTERVAL seconds (default 2).
+  stop   Stop the sampler and append a final sample.
+EOF2
+}
+
+sample() {
+    local cpu user nice system idle iowait irq softirq steal rest busy mem io load
+
+    read -r cpu user nice system idle iowait irq softirq steal rest </proc/stat
+    busy=$((user + nice + system + irq + softirq + steal))
+    mem=$(awk '/^MemTotal:/ {t = $2} /^MemAvailable:/ {a = $2} END {print t - a}' /proc/meminfo)
+    io=$(awk '$3 ~ /^([shv]d[a-z]+|xvd[a-z]+|nvme[0-9]+n[0-9]+|mmcblk[0-9]+)$/ {r += $6; w += $10}
+              END {print r + 0, w + 0}' /proc/diskstats)
+    read -r load rest </proc/loadavg
+    echo "$(date +%s) $busy $((busy + idle + iowait)) $mem $io $load"
+}
+
+if [[ $# -lt 2 ]]; then
+    usage
+    exit 1
+fi
+
+cmd=$1
+output=$2
+interval=${3:-2}
+
+case "$cmd" in
+    start)
+        "$0" stop "$output" >/dev/null
+        sample >"$output"
+        nohup "$0" run "$output" "$interval" </dev/null >/dev/null 2>&1 &
+        echo $! >"$output.pid"
+        ;;
+    run)
+        while sleep "$interval"; do
+            sample >>"$output"
+        done
+        ;;
+    stop)
+        if [[ -f $output.pid ]]; then
+            kill "$(cat "$output.pid")" 2>/dev/null || true
+            rm -f "$output.pid"
+            sample >>"$output"
+        fi
+        ;;
+    *)
+        usage
+        exit 1
+        ;;
+esac
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""Copy the part of a built PostgreSQL tree that `make installcheck-world`
+reads at test time: makefiles, test inputs and expected outputs, TAP tests and
+perl modules, prebuilt test programs and the ecpg test fixtures.
+
+Every other file is replaced by an empty placeholder with the original mode
+and mtime, so make still finds its prerequisites up to date and never tries to
+rebuild them, while objects, bitcode, archives and build outputs outside the
+test directories take no space.  `.c` files, `doc/`, `.git` and the result
+directories of earlier test runs are left out.
+"""
+
+from __future__ import annotations
+
+import argparse
+import fnmatch
+import os
+import shutil
+import sys
+
+# Directories never copied, by name anywhere or by path from the top.
+SKIP_NAMES = {'.git', 'tmp_check', 'tmp_install'}
+SKIP_PATHS = {
+    'doc',
+    'src/test/regress/results',
+    'src/test/regress/log',
+    'src/test/isolation/results',
+    'src/test/isolation/output_iso',
+}
+# Files with content, by a directory in their path, a path prefix or their name.
+KEEP_DIRS = {'expected', 'sql', 'specs', 'input', 'output', 'data', 't', 'ssl', '.deps'}
+KEEP_PREFIXES = ('src/test/perl/', 'src/interfaces/ecpg/test/')
+KEEP_PATTERNS = ('Makefile', 'GNUmakefile', 'Makefile.*', '*.mk', '*_schedule', 'resultmap',
+                 'config.status', '*.pm', '*.pl', '*.sql', '*.source', '*.conf', '*.spec')
+# Prebuilt test programs and modules loaded by the tests from the build tree.
+ELF_PREFIXES = ('src/test/', 'src/interfaces/')
+# Build outputs that are only make prerequisites.
+PLACEHOLDER_SUFFIXES = ('.o', '.bc', '.a')
+
+
+def is_elf(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(4) == b'\x7fELF'
+
+
+def keep(rel: str, path: str, mode: int) -> bool:
+    """Whether the tests read the content of `rel`."""
+    if rel.endswith(PLACEHOLDER_SUFFIXES):
+        return False
+    if rel.startswith(KEEP_PREFIXES):
+        return True
+    parts = rel.split('/')
+    if KEEP_DIRS.intersection(parts[:-1]):
+        return True
+    if any(fnmatch.fnmatchcase(parts[-1], p) for p in KEEP_PATTERNS):
+        return True
+    if mode & 0o111 or parts[-1].endswith('.so') or '.so.' in parts[-1]:
+        return not is_elf(path) or rel.startswith(ELF_PREFIXES)
+    return False
+
+
+def select(srcdir: str, destdir: str) -> dict:
+    stats = {'kept': 0, 'kept_bytes': 0, 'placeholders': 0, 'saved_bytes': 0}
+    for root, dirs, files in os.walk(srcdir):
+        relroot = os.path.relpath(root, srcdir)
+        relroot = '' if relroot == '.' else relroot + '/'
+        dirs[:] = [d for d in dirs if d not in SKIP_NAMES and relroot + d not in SKIP_PATHS]
+        os.makedirs(os.path.join(destdir, relroot), exist_ok=True)
+        for name in dirs:
+            src = os.path.join(root, name)
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), os.path.join(destdir, relroot + name))
+        dirs[:] = [d for d in dirs if not os.path.islink(os.path.join(root, d))]
+        for name in files:
+            rel = relroot + name
+            if name.endswith('.c'):
+                continue
+            src = os.path.join(root, name)
+            dest = os.path.join(destdir, rel)
+            if os.path.islink(src):
+                os.symlink(os.readlink(src), dest)
+                continue
+            st = os.stat(src)
+            if keep(rel, src, st.st_mode):
+                shutil.copy2(src, dest)
+                stats['kept'] += 1
+                stats['kept_bytes'] += st.st_size
+            else:
+                open(dest, 'wb').close()
+                os.chmod(dest, st.st_mode & 0o7777)
+                os.utime(dest, ns=(st.st_atime_ns, st.st_mtime_ns))
+                stats['placeholders'] += 1
+                stats['saved_bytes'] += st.st_size
+    return stats
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('srcdir', help='Built PostgreSQL source tree.')
+    parser.add_argument('destdir', help='Destination of the test tree.')
+    args = parser.parse_args()
+    if not os.path.isdir(args.srcdir):
+        print(f'error: source tree not found: {args.srcdir}', file=sys.stderr)
+        return 1
+    stats = select(args.srcdir, args.destdir)
+    print(f"Kept {stats['kept']} files ({stats['kept_bytes'] / 1048576:.1f} MiB), "
+          f"{stats['placeholders']} empty placeholders ({stats['saved_bytes'] / 1048576:.1f} MiB left out)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,16 +1,26 @@
 #!/usr/bin/env bash
 # Set the rpath of all elf files in `ELFDIR` to relative paths to `LIBDIRS`.
+# In `prune` mode each elf only searches the dirs holding its DT_NEEDED
+# libraries, the dir holding most of them first.  Executables keep the other
+# dirs at the end: their rpath is also searched for the libraries they load
+# and for dlopen.
 
 set -e
 
 PROGNAME=$(basename "$0")
-if [[ $# != 2 ]]; then
-    echo "Usage: $PROGNAME ELFDIR LIBDIRS" >&2
+if [[ $# != 2 && $# != 3 ]]; then
+    echo "Usage: $PROGNAME ELFDIR LIBDIRS [all|prune]" >&2
     exit 1
 fi
 
 ELFDIR=$1
 LIBDIRS=$2
+MODE=${3:-all}
+
+if [[ $MODE != all && $MODE != prune ]]; then
+    echo "Unknown mode: $MODE" >&2
+    exit 1
+fi
 
 IFS=':' read -r -a libdirs <<< "$LIBDIRS"
 
@@ -24,8 +34,37 @@ esac
 for elf in $(find "$ELFDIR" -type f -exec file {} + | grep ELF | grep -E "executable|shared object" | grep "$ARCH" | grep "dynamically" | grep -E "SYSV|GNU/Linux" | cut -d: -f1); do
     elf_parentdir=$(dirname "$elf")
 
+    ordered=("${libdirs[@]}")
+    if [[ $MODE == prune ]]; then
+        needed=$(patchelf --print-needed "$elf")
+        ordered=()
+        rest=()
+        # 按目录中 DT_NEEDED 的命中数降序，命中数相同时保持 LIBDIRS 的顺序。
+        for i in "${!libdirs[@]}"; do
+            hits=0
+            for lib in $needed; do
+                if [[ -e ${libdirs[$i]}/$lib ]]; then
+                    hits=$((hits + 1))
+                fi
+            done
+            if [[ $hits -gt 0 ]]; then
+                ordered+=("$hits $i")
+            else
+                rest+=("${libdirs[$i]}")
+            fi
+        done
+        if [[ ${#ordered[@]} -gt 0 ]]; then
+            mapfile -t ordered < <(printf '%s\n' "${ordered[@]}" | sort -s -k1,1nr | while read -r _ i; do
+                echo "${libdirs[$i]}"
+            done)
+        fi
+        if patchelf --print-interpreter "$elf" >/dev/null 2>&1; then
+            ordered+=("${rest[@]}")
+        fi
+    fi
+
     rpaths=()
-    for libdir in "${libdirs[@]}"; do
+    for libdir in "${ordered[@]}"; do
         relative_path=$(realpath --relative-to="$elf_parentdir" "$libdir")
         if [[ $relative_path == '.' ]]; then
             rpaths+=("\$ORIGIN")
@@ -36,7 +75,12 @@ for elf in $(find "$ELFDIR" -type f -exec file {} + | grep ELF | grep -E "execut
 
     relative_rpath=$(IFS=:; echo "${rpaths[*]}")
 
-    if [[ $(patchelf --print-rpath "$elf") != "$relative_rpath" ]]; then
+    if [[ -z $relative_rpath ]]; then
+        if [[ -n $(patchelf --print-rpath "$elf") ]]; then
+            echo "Remove the rpath of $elf"
+            patchelf --remove-rpath "$elf"
+        fi
+    elif [[ $(patchelf --print-rpath "$elf") != "$relative_rpath" ]]; then
         echo "Set the rpath of $elf to $relative_rpath"
         patchelf --set-rpath "$relative_rpath" "$elf" --force-rpath
     fi
@@ -0,0 +1,52 @@
+#!/usr/bin/env bash
+# Strip all elf files in `ELFDIR` and save their debug info into `DEBUGDIR`
+# using the `.build-id/xx/yyyy.debug` layout.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# != 2 ]]; then
+    echo "Usage: $PROGNAME ELFDIR DEBUGDIR" >&2
+    exit 1
+fi
+
+ELFDIR=$1
+DEBUGDIR=$2
+OBJCOPY=${OBJCOPY:-objcopy}
+STRIP=${STRIP:-strip}
+
+case "$(uname -m)" in
+    x86_64)         ARCH="x86-64" ;;
+    aarch64)        ARCH="aarch64" ;;
+    loongarch64)    ARCH="LoongArch" ;;
+    *)              echo "Unsupported architecture: $(uname -m)" >&2; exit 1 ;;
+esac
+
+mkdir -p "$DEBUGDIR/.build-id"
+
+find "$ELFDIR" -type f -exec file {} + \
+    | grep ELF \
+    | grep -E "executable|shared object" \
+    | grep "$ARCH" \
+    | grep -E "not stripped|with debug_info" \
+    | while IFS= read -r line; do
+    elf=${line%%: *}
+    buildid=$(echo "$line" | grep -oE 'BuildID\[[^]]*\]=[0-9a-f]+' | cut -d= -f2 || true)
+    if [[ -z $buildid ]]; then
+        echo "skip: no build-id: $elf" >&2
+        continue
+    fi
+
+    debugfile=$DEBUGDIR/.build-id/${buildid:0:2}/${buildid:2}.debug
+    if [[ ! -e $debugfile ]]; then
+        mkdir -p "$(dirname "$debugfile")"
+        "$OBJCOPY" --only-keep-debug --compress-debug-sections "$elf" "$debugfile"
+        chmod 644 "$debugfile"
+    fi
+    echo "Strip $elf ($buildid)"
+    chmod u+w "$elf"
+    # 写回原 inode，保留硬链接。
+    "$STRIP" --strip-debug --strip-unneeded -o "$elf.strip" "$elf"
+    cat "$elf.strip" > "$elf"
+    rm -f "$elf.strip"
+done
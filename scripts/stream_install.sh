@@ -0,0 +1,158 @@
+#!/usr/bin/env bash
+# Install a pgflow package straight from its archive into INSTDIR.
+#
+# The archive is read once: content/ is extracted directly into INSTDIR, the
+# other members (install.sh, manifest.sha256, elfexec.list, patchelf/) go to
+# INSTDIR/.pgflow/package, and ELF interpreters listed in elfexec.list are
+# patched as soon as each entry has been written.  If the source is an
+# unpacked package directory, install.sh is used instead and copies content/
+# with reflinks where the filesystem supports them.
+
+set -e
+set -o pipefail
+
+die() {
+    echo "$*" >&2
+    exit 1
+}
+
+progname=$(basename "$0")
+if [[ $# != 2 ]]; then
+    echo "Usage: $progname ARCHIVE|-|PKGDIR INSTDIR" >&2
+    exit 1
+fi
+
+src=$1
+instdir=$2
+
+if [[ -d $src ]]; then
+    exec "$src/install.sh" "$instdir"
+fi
+if [[ $src != - && ! -f $src ]]; then
+    die "error: archive not found: $src"
+fi
+
+mkdir -p "$instdir"
+instdir=$(realpath "$instdir")
+pkgdir=$instdir/.pgflow/package
+rm -rf "$pkgdir"
+mkdir -p "$pkgdir"
+
+declare -A elfs=()
+declare -A interps=()
+loaded=0
+has_postgres=0
+has_unixodbc=0
+
+load_package() {
+    local path
+
+    # shellcheck source=install.sh
+    source "$pkgdir/install.sh"
+    if [[ -f $pkgdir/elfexec.list ]]; then
+        while IFS= read -r path; do
+            elfs[$path]=1
+        done < "$pkgdir/elfexec.list"
+    fi
+    if grep -qE '  \./bin/postgres$' "$pkgdir/manifest.sha256"; then
+        has_postgres=1
+    fi
+    if grep -qE '  \./unixodbc/' "$pkgdir/manifest.sha256"; then
+        has_unixodbc=1
+    fi
+    loaded=1
+}
+
+# Print the directory whose lib/copied holds the interpreter for RELPATH,
+# following the same rules as install.sh, or nothing if it is not patched.
+interp_root() {
+    local relpath=$1
+
+    case "$relpath" in
+        ./jdk/*)        echo jdk; return 0 ;;
+        ./unixodbc/*)   echo unixodbc; return 0 ;;
+    esac
+    if ((has_unixodbc)); then
+        return 0
+    fi
+    if ((has_postgres)); then
+        case "$relpath" in
+            ./tools/*|./drivers/*)  return 0 ;;
+        esac
+    fi
+    echo .
+}
+
+patch_entry() {
+    local relpath=$1
+    local root
+    local copied_lib_dir
+
+    root=$(interp_root "$relpath")
+    if [[ -z $root ]]; then
+        return 0
+    fi
+    if [[ -z ${interps[$root]:-} ]]; then
+        if [[ $root == . ]] || grep -qF "  ./$root/lib/copied/" "$pkgdir/manifest.sha256"; then
+            copied_lib_dir=$instdir/$root/lib/copied
+        else
+            copied_lib_dir=$instdir/$root/../lib/copied
+        fi
+        interps[$root]=$(interpreter_path_from_probe "$(patchelf_dir)" "$instdir/$relpath" \
+                         "$(realpath -m "$copied_lib_dir")")
+    fi
+    # Read-only members must be writable for patchelf, as after copy_content.
+    chmod u+w "$instdir/${relpath#./}"
+    echo "$instdir/${relpath#./}" | set_interpreter_for_paths "$(patchelf_dir)" "${interps[$root]}"
+}
+
+# Called once an entry is completely written, i.e. when tar reports the next one.
+handle_entry() {
+    local name=$1
+    local relpath
+
+    case "$name" in
+        ./content/*)    relpath=./${name#./content/} ;;
+        *)              return 0 ;;
+    esac
+    if ((!loaded)); then
+        load_package
+    fi
+    if [[ -n ${elfs[$relpath]:-} ]]; then
+        patch_entry "$relpath"
+    fi
+}
+
+if [[ $src == - ]]; then
+    input=/dev/stdin
+else
+    input=$src
+fi
+
+# Member and hard link names are moved; symlink targets are kept (flags=rhS).
+gzip -dc < "$input" \
+    | tar -xvf - -C "$instdir" \
+        --transform 'flags=rhS;s,^\./,./.pgflow/package/,;s,^\./\.pgflow/package/content\(/\|$\),./,' \
+    | {
+        prev=
+        while IFS= read -r name; do
+            if [[ -n $prev ]]; then
+                handle_entry "$prev"
+            fi
+            prev=$name
+        done
+        if [[ -n $prev ]]; then
+            handle_entry "$prev"
+        fi
+    }
+
+# shellcheck source=install.sh
+source "$pkgdir/install.sh"
+# Same as copy_content: installed files can be patched and upgraded later.
+chmod -R +w "$instdir"
+save_manifest "$instdir"
+if [[ -f $instdir/bin/python ]]; then
+    fix_python_scripts "$instdir"
+fi
+rm -rf "$pkgdir"
+echo "Installed $src into $instdir"
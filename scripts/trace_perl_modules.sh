@@ -0,0 +1,151 @@
+#!/usr/bin/env bash
+# Write the %INC keys (e.g. `Data/Dumper.pm`) that perl loads for the given
+# sources into OUTPUT, one per line.  Every *.pl, *.pm and *.t file under each
+# PATH is compiled (`perl -c`) in a probe run that dumps %INC, and `prove` runs
+# a probe test, so the list holds what the shipped programs and TAP tests load
+# at compile time, including transitive dependencies.  Modules loaded only at
+# run time are covered by also loading every `use`/`require` target found in
+# the sources plus a static fallback list.  A probe run or fallback module
+# that cannot be loaded fails the script.  Directories among PATH are also put
+# on @INC.  The result is meant for copy_perl.sh MODULES.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# -lt 2 ]]; then
+    echo "Usage: $PROGNAME OUTPUT PATH..." >&2
+    exit 1
+fi
+
+OUTPUT=$1
+shift
+
+if ! command -v perl >/dev/null 2>&1; then
+    echo "error: perl not found in PATH" >&2
+    exit 1
+fi
+
+# 运行时才加载、编译探测不到的模块（静态兜底列表）。
+EXTRA=(
+    App::Prove
+    App::Prove::State
+    TAP::Harness
+    TAP::Harness::Env
+    TAP::Formatter::Console
+    TAP::Formatter::Console::Session
+    TAP::Formatter::Console::ParallelSession
+    TAP::Formatter::File
+    TAP::Parser::Multiplexer
+    TAP::Parser::Iterator::Process
+    TAP::Parser::SourceHandler::Executable
+    TAP::Parser::SourceHandler::File
+    TAP::Parser::SourceHandler::Handle
+    TAP::Parser::SourceHandler::Perl
+    TAP::Parser::SourceHandler::RawTAP
+    Carp::Heavy
+    Exporter::Heavy
+)
+
+incargs=()
+for path in "$@"; do
+    [[ -d $path ]] && incargs+=(-I "$path")
+done
+
+workdir=$(mktemp -d)
+trap 'rm -rf "$workdir"' EXIT
+
+# 探测进程退出（-c 时在 CHECK 阶段）时把 %INC 追加到 PGFLOW_TRACE_DIR/PID。
+mkdir -p "$workdir/lib" "$workdir/trace" "$workdir/probe"
+cat > "$workdir/lib/PgflowTrace.pm" <<'PLEOF'
+package PgflowTrace;
+sub dump_inc {
+    open my $fh, '>>', "$ENV{PGFLOW_TRACE_DIR}/$$" or return;
+    print $fh "$_\t$INC{$_}\n" for grep { defined $INC{$_} } keys %INC;
+    close $fh;
+}
+CHECK { dump_inc() if $^C }
+END { dump_inc() unless $^C }
+1;
+PLEOF
+
+export PGFLOW_TRACE_DIR=$workdir/trace
+export PGFLOW_TRACE_OPT="-I$workdir/lib -MPgflowTrace"
+probelib=
+for path in "$@"; do
+    [[ -d $path ]] && probelib+="$(realpath "$path"):"
+done
+export PERL5LIB="$probelib${PERL5LIB:-}"
+
+probe() {
+    local file=$1
+    local log=
+
+    log=$(PERL5OPT=$PGFLOW_TRACE_OPT perl -c "$file" 2>&1 >/dev/null) || true
+    grep -o "Can't locate [^ ]* in @INC" <<<"$log" \
+        | sed "s|^Can't locate \([^ ]*\) in @INC|$file: \1|" || true
+}
+export -f probe
+
+find "$@" -type f \( -name '*.pl' -o -name '*.pm' -o -name '*.t' \) -print0 \
+    | xargs -0r -n 1 -P "$(nproc)" bash -c 'probe "$1"' probe > "$workdir/missing"
+
+# TAP 测试由 prove 运行，harness 本身加载的模块需要真实运行一次才能记录。
+if command -v prove >/dev/null 2>&1; then
+    printf 'use Test::More;\nok(1);\ndone_testing();\n' > "$workdir/probe/probe.t"
+    if ! (cd "$workdir/probe" \
+          && PERL5OPT=$PGFLOW_TRACE_OPT prove probe.t >/dev/null 2>&1); then
+        echo "error: prove probe run failed" >&2
+        exit 1
+    fi
+fi
+
+if [[ -s $workdir/missing ]]; then
+    echo "error: modules not found in probe runs:" >&2
+    cat "$workdir/missing" >&2
+    exit 1
+fi
+
+find "$@" -type f \( -name '*.pl' -o -name '*.pm' \) -print0 \
+    | xargs -0r perl -ne 'print "$1\n" if /^\s*(?:use|require)\s+([A-Za-z_][\w:]*)\s*[;(\s]/' \
+    | sort -u > "$workdir/modules"
+printf '%s\n' "${EXTRA[@]}" > "$workdir/extra"
+cat "$workdir/trace"/* > "$workdir/traced" 2>/dev/null || true
+
+(
+    cd "$workdir/probe"
+    perl "${incargs[@]}" - "$workdir/modules" "$workdir/extra" "$workdir/traced" "$OUTPUT" "$workdir" "$@" <<'PLEOF'
+my ($modules, $extra, $traced, $output, @paths) = @ARGV;
+sub lines {
+    open my $in, '<', $_[0] or die "cannot open $_[0]: $!\n";
+    chomp(my @lines = <$in>);
+    return @lines;
+}
+
+my %failed;
+for my $name (lines($modules)) {
+    next if $name =~ /^(?:if|v\d.*)$/;
+    local $SIG{__WARN__} = sub {};
+    $failed{$name} = 1 unless eval "require $name; 1";
+}
+my @missing = grep { !eval "require $_; 1" } lines($extra);
+die "error: fallback modules not loadable: @missing\n" if @missing;
+
+my %files = map { $_ => $INC{$_} } grep { defined $INC{$_} } keys %INC;
+for (lines($traced)) {
+    my ($key, $file) = split /\t/, $_, 2;
+    $files{$key} //= $file;
+}
+
+my @paths_abs = map { my $p = $_; $p =~ s{/+$}{}; $p } @paths;
+open my $out, '>', $output or die "cannot write $output: $!\n";
+KEY: for my $key (sort keys %files) {
+    for my $p (@paths_abs) {
+        next KEY if index($files{$key}, "$p/") == 0;
+    }
+    print $out "$key\n";
+}
+close $out;
+printf STDERR "traced %d modules, %d referenced names not loadable\n",
+    scalar(keys %files), scalar(keys %failed);
+PLEOF
+)
@@ -1,17 +1,27 @@
 #!/usr/bin/env bash
 # Wrap selected executables with runtime environment variables.
+#
+# Without LAUNCHER each program is replaced by a /bin/sh script.  With
+# LAUNCHER (built from launcher.c) each program is replaced by a copy of the
+# launcher and its variables are written to the sidecar `.NAME.env`.
 
 set -e
 
 progname=${0##*/}
-if [[ $# != 3 ]]; then
-    echo "Usage: $progname TOPDIR BINS ENVS" >&2
+if [[ $# != 3 && $# != 4 ]]; then
+    echo "Usage: $progname TOPDIR BINS ENVS [LAUNCHER]" >&2
     exit 1
 fi
 
 topdir=$1
 bins_arg=$2
 envs_arg=$3
+launcher=${4:-}
+
+if [[ -n $launcher && ! -x $launcher ]]; then
+    echo "error: launcher not executable: $launcher" >&2
+    exit 1
+fi
 
 if [[ ! -d $topdir ]]; then
     echo "error: not a directory: $topdir" >&2
@@ -58,6 +68,7 @@ validate_env_name() {
 }
 
 write_env_exports() {
+    local format=$1
     local envspec=
     local name=
     local value=
@@ -74,7 +85,7 @@ write_env_exports() {
             echo "error: invalid env name: $name" >&2
             exit 1
         fi
-        printf 'export %s="%s"\n' "$name" "$value"
+        printf "$format" "$name" "$value"
     done
 }
 
@@ -117,6 +128,17 @@ for relbin in "${bins[@]}"; do
 
     mv "$exe" "$hidden"
 
+    if [[ -n $launcher ]]; then
+        {
+            echo "@up=$up"
+            write_env_exports '%s=%s\n'
+        } > "$dir/.$base.env"
+        cp "$launcher" "$exe"
+        chmod 755 "$exe"
+        echo "wrapped: $exe (launcher)"
+        continue
+    fi
+
     {
         cat <<EOF
 #!/bin/sh
@@ -126,7 +148,7 @@ case "\$0" in
 esac
 TOPDIR=\$(CDPATH= cd -- "\$SELFDIR/$up" && pwd)
 EOF
-        write_env_exports
+        write_env_exports 'export %s="%s"\n'
         cat <<EOF
 exec "\$SELFDIR/.$base" "\$@"
 EOF
@@ -0,0 +1,38 @@
+#!/usr/bin/env bash
+# Write the SHA-256 manifest of all regular files in `DIR` to `OUTPUT`, and
+# optionally the list of dynamically linked elf executables to `ELFLIST`.
+
+set -e
+
+PROGNAME=$(basename "$0")
+if [[ $# -lt 2 || $# -gt 3 ]]; then
+    echo "Usage: $PROGNAME DIR OUTPUT [ELFLIST]" >&2
+    exit 1
+fi
+
+DIR=$1
+OUTPUT=$(realpath -m "$2")
+ELFLIST=${3:+$(realpath -m "$3")}
+
+case "$(uname -m)" in
+    x86_64)         ARCH="x86-64" ;;
+    aarch64)        ARCH="aarch64" ;;
+    loongarch64)    ARCH="LoongArch" ;;
+    *)              echo "Unsupported architecture: $(uname -m)" >&2; exit 1 ;;
+esac
+
+cd "$DIR"
+find . -type f -print0 | LC_ALL=C sort -z | xargs -0 -r sha256sum > "$OUTPUT"
+echo "Wrote $(wc -l < "$OUTPUT") entries to $OUTPUT"
+
+if [[ -n $ELFLIST ]]; then
+    find . -type f -exec file {} + \
+        | grep ELF \
+        | grep -E "executable" \
+        | grep "$ARCH" \
+        | grep "dynamically" \
+        | grep -E "SYSV|GNU/Linux" \
+        | cut -d: -f1 \
+        | LC_ALL=C sort > "$ELFLIST"
+    echo "Wrote $(wc -l < "$ELFLIST") entries to $ELFLIST"
+fi
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""Benchmark the packaging helpers on a synthetic tree with a local Node stand-in.
+
+Each repeat generates a fresh package tree (ELF executables, shared objects,
+scripts and data files), then runs the steps of a C package build in pipeline
+order through the same `pipelines.common.scripts` wrappers the pipelines use.
+Commands run locally instead of over ssh and outside nix, so the numbers
+measure the helper scripts themselves.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import Callable, Iterator, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class CommandResult(str):
+    """Command output, like `xflow.framework.ssh.CommandResult`."""
+
+
+class LocalNode:
+    """Run `Node` calls on this machine.
+
+    Scripts are copied into `scriptdir` like an upload and `nixenv` is a
+    no-op: the tools come from PATH.
+    """
+
+    def __init__(self, cwd: Path):
+        self.cwd = PurePosixPath(cwd)
+        self.scriptdir = PurePosixPath(cwd, "scripts")
+
+    @contextmanager
+    def dir(self, path: str | PurePosixPath) -> Iterator[None]:
+        saved = self.cwd
+        self.cwd = self.cwd.joinpath(path)
+        try:
+            yield
+        finally:
+            self.cwd = saved
+
+    @contextmanager
+    def nixenv(self, *args, **kwargs) -> Iterator[None]:
+        yield
+
+    def exec(self, cmd: str, envs: Optional[dict[str, str]] = None) -> CommandResult:
+        env = dict(os.environ, **(envs or {}))
+        proc = subprocess.run(["bash", "-c", cmd], cwd=self.cwd, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f"command failed ({proc.returncode}): {cmd}\n{proc.stdout[-2000:]}")
+        return CommandResult(proc.stdout.strip())
+
+    def exec_script(self, script: str | Path, argstr: str = "",
+                    envs: Optional[dict[str, str]] = None) -> CommandResult:
+        rscript = Path(self.scriptdir, Path(script).name)
+        if not rscript.exists():
+            rscript.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(REPO_ROOT.joinpath(script), rscript)
+            rscript.chmod(0o755)
+        return self.exec(f"{rscript} {argstr}", envs=envs)
+
+    def putfile(self, lfile: str | Path, rdir: str | PurePosixPath) -> None:
+        shutil.copy(REPO_ROOT.joinpath(lfile), rdir)
+
+    def getfile(self, rfile: str | PurePosixPath, ldir: str | Path) -> None:
+        shutil.copy(rfile, ldir)
+
+    def exists(self, path: str | PurePosixPath) -> bool:
+        return os.path.exists(path)
+
+    def write(self, text: str, rfile: str | PurePosixPath) -> None:
+        Path(rfile).write_text(text)
+
+
+def import_scripts() -> types.ModuleType:
+    """Import the pipeline script wrappers, standing in for xflow if it is missing."""
+    try:
+        import xflow.framework.node  # noqa: F401
+    except ImportError:
+        # The wrappers only use `Node` and `CommandResult` as annotations.
+        for name in ("xflow", "xflow.framework", "xflow.framework.node"):
+            sys.modules.setdefault(name, types.ModuleType(name))
+        sys.modules["xflow.framework.node"].Node = LocalNode
+        sys.modules["xflow.framework.node"].CommandResult = CommandResult
+    sys.path.insert(0, str(REPO_ROOT))
+    from pipelines.common import scripts
+    return scripts
+
+
+MAIN_C = """\
+#include <math.h>
+#include <stdio.h>
+int synth(int);
+int main(int argc, char **argv) { printf("%d %f\\n", synth(argc), sqrt(argc)); return 0; }
+"""
+
+LIB_C = "int synth(int x) { return x * 2; }\n"
+
+
+def build_objects(outdir: Path) -> tuple[Path, Path]:
+    """Compile the executable and shared object copied into every tree."""
+    outdir.mkdir(parents=True)
+    outdir.joinpath("main.c").write_text(MAIN_C)
+    outdir.joinpath("lib.c").write_text(LIB_C)
+    lib = outdir.joinpath("libsynth.so")
+    prog = outdir.joinpath("prog")
+    subprocess.run(["cc", "-shared", "-fPIC", "-O2", "-Wl,-soname,libsynth.so",
+                    "-o", lib, outdir.joinpath("lib.c")], check=True)
+    subprocess.run(["cc", "-O2", "-o", prog, outdir.joinpath("main.c"), f"-L{outdir}",
+                    "-lsynth", "-lm", "-Wl,-rpath,$ORIGIN/../lib"], check=True)
+    return prog, lib
+
+
+def generate_tree(
+    content: Path,
+    objects: tuple[Path, Path],
+    args: argparse.Namespace,
+) -> int:
+    """Write a package content tree and return its file count."""
+    prog, lib = objects
+    rng = random.Random(args.seed)
+    bindir = content.joinpath("bin")
+    libdir = content.joinpath("lib")
+    for d in (bindir, libdir.joinpath("copied"), content.joinpath("share")):
+        d.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(lib, libdir.joinpath("libsynth.so"))
+    for i in range(args.libs):
+        shutil.copy2(lib, libdir.joinpath(f"libsynth-{i:05d}.so"))
+    for i in range(args.elfs):
+        shutil.copy2(prog, bindir.joinpath(f"prog-{i:05d}"))
+    for i in range(args.scripts):
+        path = bindir.joinpath(f"script-{i:05d}.sh")
+        path.write_text(f"#!/bin/sh\necho script {i} \"$@\"\n")
+        path.chmod(0o755)
+    for i in range(args.data):
+        path = content.joinpath("share", f"{i % 64:02d}", f"data-{i:05d}.dat")
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(rng.randbytes(rng.randint(64, args.data_size * 1024)))
+    return 1 + args.libs + args.elfs + args.scripts + args.data
+
+
+def find_magic() -> Optional[Path]:
+    for candidate in ("/usr/share/misc/magic.mgc", "/usr/share/file/magic.mgc",
+                      "/usr/lib/file/magic.mgc", "/etc/magic.mgc"):
+        if os.path.isfile(candidate):
+            return Path(candidate)
+    return None
+
+
+def copy_patchelf_bundle(parent: Path) -> None:
+    """Lay out patchelf and file like `pack_c.copy_patchelf` does."""
+    bindir = parent.joinpath("patchelf", "bin")
+    magicdir = parent.joinpath("patchelf", "share", "misc")
+    bindir.mkdir(parents=True)
+    magicdir.mkdir(parents=True)
+    shutil.copy2(shutil.which("patchelf"), bindir)
+    shutil.copy2(shutil.which("file"), bindir)
+    shutil.copy2(find_magic(), magicdir.joinpath("magic.mgc"))
+
+
+class Bench:
+    """Run the steps of one repeat and collect their wall times."""
+
+    def __init__(self, scripts: types.ModuleType, workdir: Path, nfiles: int, args: argparse.Namespace):
+        self.scripts = scripts
+        self.workdir = workdir
+        self.nfiles = nfiles
+        self.args = args
+        self.node = LocalNode(workdir)
+        self.packdir = workdir.joinpath("package")
+        self.content = self.packdir.joinpath("content")
+        self.has_patchelf = bool(shutil.which("patchelf")) and find_magic() is not None
+        self.times: dict[str, float] = {}
+        self.skipped: dict[str, str] = {}
+
+    def step(self, name: str, func: Callable[[], object], needs_patchelf: bool = False) -> None:
+        if self.args.steps and name not in self.args.steps:
+            return
+        if needs_patchelf and not self.has_patchelf:
+            self.skipped[name] = "patchelf or magic.mgc not found"
+            return
+        start = time.perf_counter()
+        func()
+        self.times[name] = time.perf_counter() - start
+
+    def copy_interp(self) -> None:
+        interp = self.node.exec(f"patchelf --print-interpreter {self.content}/bin/prog-00000")
+        shutil.copy2(interp, self.content.joinpath("lib", "copied"))
+        self.scripts.set_interp(self.node, self.content, f"./lib/copied/{interp.split('/')[-1]}")
+
+    def archive(self) -> None:
+        # Same command as `pack.archive`, with a fixed timestamp.
+        self.node.exec(f"tar --sort=name --format=gnu --mtime=@0 --clamp-mtime --owner=0 --group=0 "
+                       f"--numeric-owner -cf - -C {self.packdir} . | gzip -n -9 > package.tar.gz")
+
+    def install(self) -> None:
+        shutil.copy2(REPO_ROOT.joinpath("scripts", "install.sh"), self.packdir)
+        self.packdir.joinpath("install.sh").chmod(0o755)
+        self.node.exec(f"{self.packdir}/install.sh {self.workdir}/installed")
+
+    def fix_test_interpreters(self) -> None:
+        testsdir = self.workdir.joinpath("tests")
+        shutil.copytree(self.content, testsdir, symlinks=True)
+        shutil.copytree(self.packdir.joinpath("patchelf"), testsdir.joinpath("patchelf"))
+        shutil.copy2(REPO_ROOT.joinpath("scripts", "run_postgres_tests.sh"), testsdir.joinpath("run.sh"))
+        testsdir.joinpath("tools", "bin").mkdir(parents=True)
+        testsdir.joinpath("tools", "bin", "bash").symlink_to(shutil.which("bash"))
+        # run.sh fixes the interpreters before parsing its arguments.
+        self.node.exec(f"{testsdir}/run.sh --help")
+
+    def run(self) -> None:
+        s = self.scripts
+        libdir = self.content.joinpath("lib")
+        copied = libdir.joinpath("copied")
+        self.step("copy_deps", lambda: s.copy_deps(self.node, self.content, copied, excludedirs=str(libdir)))
+        self.step("set_rpath", lambda: s.set_rpath(self.node, self.content, f"{libdir}:{copied}"),
+                  needs_patchelf=True)
+        self.step("prune_rpath", lambda: s.set_rpath(self.node, self.content, f"{libdir}:{copied}", prune=True),
+                  needs_patchelf=True)
+        self.step("set_interp", self.copy_interp, needs_patchelf=True)
+        bins = [f"bin/prog-{i:05d}" for i in range(min(self.args.wrap, self.args.elfs))]
+        envs = ["PATH=$TOPDIR/bin:$PATH", "LD_LIBRARY_PATH=$TOPDIR/lib"]
+        self.step("wrap_envs", lambda: s.wrap_envs(self.node, self.content, bins, envs))
+        if self.has_patchelf:
+            copy_patchelf_bundle(self.packdir)
+        self.step("write_manifest",
+                  lambda: s.write_manifest(self.node, self.content, self.packdir.joinpath("manifest.sha256"),
+                                           elflist=self.packdir.joinpath("elfexec.list")))
+        self.step("archive", self.archive)
+        self.step("install.sh", self.install, needs_patchelf=True)
+        self.step("fix_test_interpreters", self.fix_test_interpreters, needs_patchelf=True)
+
+
+def report(results: dict[str, list[float]], nfiles: int, baseline: dict, tolerance: float) -> tuple[str, list[str]]:
+    lines = [f"{'step':<24}{'files':>8}{'median(s)':>12}{'min(s)':>10}{'files/s':>12}{'vs base':>10}"]
+    regressions = []
+    for name, times in results.items():
+        median = statistics.median(times)
+        ratio = ""
+        if name in baseline:
+            change = median / baseline[name]["median"] - 1
+            ratio = f"{change:+.0%}"
+            if change > tolerance:
+                regressions.append(name)
+        lines.append(f"{name:<24}{nfiles:>8}{median:>12.3f}{min(times):>10.3f}"
+                     f"{nfiles / median if median else 0:>12.1f}{ratio:>10}")
+    return "\n".join(lines) + "\n", regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the packaging helper scripts on a synthetic tree, locally.",
+    )
+    parser.add_argument("--elfs", type=int, default=2000, help="Number of ELF executables.")
+    parser.add_argument("--libs", type=int, default=500, help="Number of shared objects.")
+    parser.add_argument("--scripts", type=int, default=500, help="Number of shell scripts.")
+    parser.add_argument("--data", type=int, default=5000, help="Number of data files.")
+    parser.add_argument("--data-size", type=int, default=32, metavar="KIB",
+                        help="Maximum data file size.")
+    parser.add_argument("--wrap", type=int, default=20, help="Number of executables to wrap_envs.")
+    parser.add_argument("--repeat", type=int, default=3, help="Fresh trees to run the steps on.")
+    parser.add_argument("--steps", type=lambda s: s.split(","), help="Comma separated steps to run.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for data files.")
+    parser.add_argument("--json", type=Path, help="Write the raw timings to this file.")
+    parser.add_argument("--baseline", type=Path, help="Compare with a previous --json output.")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Fail when a step is this much slower than the baseline.")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory.")
+    args = parser.parse_args()
+
+    if not shutil.which("cc"):
+        print("skip: cc not found", file=sys.stderr)
+        return 0
+    if args.elfs < 1:
+        parser.error("--elfs must be at least 1")
+
+    scripts = import_scripts()
+    baseline = json.loads(args.baseline.read_text()) if args.baseline else {"steps": {}}
+    topdir = Path(tempfile.mkdtemp(prefix="pgflow-bench-"))
+    results: dict[str, list[float]] = {}
+    skipped: dict[str, str] = {}
+    try:
+        objects = build_objects(topdir.joinpath("objects"))
+        nfiles = 0
+        for i in range(args.repeat):
+            workdir = topdir.joinpath(f"run-{i}")
+            nfiles = generate_tree(workdir.joinpath("package", "content"), objects, args)
+            bench = Bench(scripts, workdir, nfiles, args)
+            bench.run()
+            for name, elapsed in bench.times.items():
+                results.setdefault(name, []).append(elapsed)
+            skipped.update(bench.skipped)
+            if not args.keep:
+                shutil.rmtree(workdir)
+    finally:
+        if args.keep:
+            print(f"work directory: {topdir}")
+        else:
+            shutil.rmtree(topdir, ignore_errors=True)
+
+    if args.baseline and baseline["files"] != nfiles:
+        print(f"warning: baseline tree has {baseline['files']} files, this one {nfiles}", file=sys.stderr)
+    text, regressions = report(results, nfiles, baseline["steps"], args.tolerance)
+    print(text, end="")
+    for name, reason in skipped.items():
+        print(f"skip: {name}: {reason}", file=sys.stderr)
+    if args.json:
+        args.json.write_text(json.dumps({
+            "files": nfiles,
+            "steps": {name: {"median": statistics.median(times), "times": times}
+                      for name, times in results.items()},
+        }, indent=2) + "\n")
+    if regressions:
+        print(f"error: slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}",
+              file=sys.stderr)
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
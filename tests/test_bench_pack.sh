@@ -0,0 +1,36 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+if ! command -v cc >/dev/null 2>&1; then
+    echo "skip: cc not found" >&2
+    exit 0
+fi
+
+python3 "$repo_root/tests/bench_pack.py" \
+    --elfs 5 --libs 2 --scripts 2 --data 10 --data-size 1 --repeat 1 \
+    --json "$tmpdir/base.json" >"$tmpdir/report.txt" 2>/dev/null
+
+for step in copy_deps wrap_envs write_manifest archive; do
+    if ! grep -q "^$step " "$tmpdir/report.txt"; then
+        echo "missing step in report: $step" >&2
+        cat "$tmpdir/report.txt" >&2
+        exit 1
+    fi
+done
+
+# 基线中的耗时放大后，再次运行应判定为没有退化。
+python3 - "$tmpdir/base.json" <<'EOS'
+import json, sys
+data = json.load(open(sys.argv[1]))
+for step in data["steps"].values():
+    step["median"] *= 100
+json.dump(data, open(sys.argv[1], "w"))
+EOS
+python3 "$repo_root/tests/bench_pack.py" \
+    --elfs 5 --libs 2 --scripts 2 --data 10 --data-size 1 --repeat 1 \
+    --steps wrap_envs --baseline "$tmpdir/base.json" >/dev/null 2>&1
@@ -0,0 +1,75 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+if ! command -v perl >/dev/null 2>&1; then
+    echo "skip: perl not found" >&2
+    exit 0
+fi
+
+# first 在 @INC 中排在 second 之前；second/arch 嵌套在 second 中，同时也在 @INC 中。
+mkdir -p "$tmpdir/first/Pgflow" "$tmpdir/second/Pgflow/Used" "$tmpdir/second/arch/auto/Pgflow/Used"
+echo 'package Pgflow::Dup; 1;  # first' >"$tmpdir/first/Pgflow/Dup.pm"
+echo 'package Pgflow::Dup; 1;  # second' >"$tmpdir/second/Pgflow/Dup.pm"
+echo 'package Pgflow::Used; 1;' >"$tmpdir/second/Pgflow/Used.pm"
+echo 'package Pgflow::Used::Sub; 1;' >"$tmpdir/second/Pgflow/Used/Sub.pm"
+echo 'package Pgflow::Unused; 1;' >"$tmpdir/second/Pgflow/Unused.pm"
+echo 'package Pgflow::Base; 1;' >"$tmpdir/second/Pgflow/Base.pm"
+: >"$tmpdir/second/arch/auto/Pgflow/Used/Used.so"
+export PERL5LIB="$tmpdir/first:$tmpdir/second/arch:$tmpdir/second"
+
+"$repo_root/scripts/copy_perl.sh" "$tmpdir/full" >/dev/null 2>&1
+
+if ! grep -q '# first' "$tmpdir/full/Pgflow/Dup.pm"; then
+    echo "Pgflow/Dup.pm was not taken from the first @INC entry" >&2
+    exit 1
+fi
+if [ -e "$tmpdir/full/arch" ]; then
+    echo "nested @INC directory was copied twice" >&2
+    exit 1
+fi
+for path in Config.pm FindBin.pm Pgflow/Unused.pm auto/Pgflow/Used/Used.so; do
+    if [ ! -e "$tmpdir/full/$path" ]; then
+        echo "missing $path" >&2
+        exit 1
+    fi
+done
+
+mkdir -p "$tmpdir/probe"
+printf 'use Pgflow::Used;\nrequire Pgflow::Dup;\n' >"$tmpdir/probe/probe.pl"
+# use parent 的父类只有探测运行能记录到。
+printf "use parent 'Pgflow::Base';\n" >"$tmpdir/probe/probe.t"
+"$repo_root/scripts/trace_perl_modules.sh" "$tmpdir/modules" "$tmpdir/probe" 2>/dev/null
+for key in Pgflow/Used.pm Pgflow/Dup.pm Pgflow/Base.pm Test/More.pm; do
+    if ! grep -Fx "$key" "$tmpdir/modules" >/dev/null; then
+        echo "module not traced: $key" >&2
+        exit 1
+    fi
+done
+
+mkdir -p "$tmpdir/broken"
+printf 'use Pgflow::Missing;\n' >"$tmpdir/broken/broken.pl"
+if "$repo_root/scripts/trace_perl_modules.sh" "$tmpdir/broken.list" "$tmpdir/broken" 2>"$tmpdir/broken.err"; then
+    echo "probe run with a missing module did not fail" >&2
+    exit 1
+fi
+if ! grep -q 'broken.pl: Pgflow/Missing.pm' "$tmpdir/broken.err"; then
+    echo "missing module not reported: $(cat "$tmpdir/broken.err")" >&2
+    exit 1
+fi
+
+"$repo_root/scripts/copy_perl.sh" "$tmpdir/pruned" "$tmpdir/modules" >/dev/null 2>&1
+for path in Config.pm FindBin.pm Pgflow/Used.pm Pgflow/Used/Sub.pm Pgflow/Dup.pm auto/Pgflow/Used/Used.so; do
+    if [ ! -e "$tmpdir/pruned/$path" ]; then
+        echo "missing $path in pruned library" >&2
+        exit 1
+    fi
+done
+if [ -e "$tmpdir/pruned/Pgflow/Unused.pm" ]; then
+    echo "unused module was not pruned" >&2
+    exit 1
+fi
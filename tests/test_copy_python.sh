@@ -0,0 +1,52 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'chmod -R u+w "$tmpdir"; rm -rf "$tmpdir"' EXIT
+
+if ! command -v python3 >/dev/null 2>&1; then
+    echo "skip: python3 not found" >&2
+    exit 0
+fi
+
+"$repo_root/scripts/copy_python.sh" "$tmpdir/py" 'test:idlelib:tkinter:ensurepip:lib2to3' >/dev/null
+
+for name in test idlelib tkinter ensurepip; do
+    if [ -e "$tmpdir/py/$name" ]; then
+        echo "excluded module was copied: $name" >&2
+        exit 1
+    fi
+done
+
+# PEP 552: flags == 3 表示 checked-hash。
+pyc=$(find "$tmpdir/py/json/__pycache__" -name '__init__.*.pyc' | head -n 1)
+flags=$(python3 -c 'import sys; print(int.from_bytes(open(sys.argv[1], "rb").read()[4:8], "little"))' "$pyc")
+if [ "$flags" != 3 ]; then
+    echo "expected checked-hash pyc, got flags=$flags: $pyc" >&2
+    exit 1
+fi
+
+# 只读安装目录中导入模块不应重新编译。
+chmod -R a-w "$tmpdir/py"
+out=$(PYTHONHOME="$tmpdir/py" PYTHONPATH="$tmpdir/py:$tmpdir/py/lib-dynload" \
+    python3 -X importtime -c 'import json, decimal' 2>&1)
+case "$out" in
+    *Error*)
+        printf 'import failed:\n%s\n' "$out" >&2
+        exit 1
+        ;;
+esac
+
+"$repo_root/scripts/copy_python.sh" "$tmpdir/pz" 'test:idlelib:tkinter:ensurepip:lib2to3' "$tmpdir/pz.zip" >/dev/null
+if [ -e "$tmpdir/pz/json/__init__.py" ]; then
+    echo "pure Python module left outside the zip" >&2
+    exit 1
+fi
+file=$(PYTHONHOME="$tmpdir/pz" PYTHONPATH="$tmpdir/pz.zip:$tmpdir/pz:$tmpdir/pz/lib-dynload" \
+    python3 -c 'import json, decimal; print(json.__file__)')
+if [ "$file" != "$tmpdir/pz.zip/json/__init__.pyc" ]; then
+    echo "json not imported from zip bytecode: $file" >&2
+    exit 1
+fi
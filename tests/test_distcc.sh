@@ -0,0 +1,110 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+pids=
+cleanup() {
+    for pid in $pids; do
+        kill "$pid" 2>/dev/null || true
+    done
+    "$repo_root/scripts/distcc.sh" helper stop "$tmpdir/helper1.pid" 2>/dev/null || true
+    "$repo_root/scripts/distcc.sh" helper stop "$tmpdir/helper2.pid" 2>/dev/null || true
+    rm -rf "$tmpdir"
+}
+trap cleanup EXIT
+
+for tool in cc python3 timeout; do
+    if ! command -v "$tool" >/dev/null 2>&1; then
+        echo "skip: $tool not found" >&2
+        exit 0
+    fi
+done
+
+free_port() {
+    python3 -c 'import socket; s = socket.socket(); s.bind(("127.0.0.1", 0)); print(s.getsockname()[1])'
+}
+
+make_units() {
+    mkdir -p "$1"
+    for i in 1 2 3 4 5 6; do
+        printf 'int f%s(void) { return %s; }\n' "$i" "$i" >"$1/u$i.c"
+    done
+    printf 'int main(void) { return 0; }\n' >"$1/main.c"
+}
+
+build() {
+    srcdir=$1
+    statedir=$2
+    for c in "$srcdir"/*.c; do
+        "$repo_root/scripts/distcc.sh" cc "$statedir" cc -c "$c" -o "${c%.c}.o"
+    done
+    "$repo_root/scripts/distcc.sh" cc "$statedir" cc -o "$srcdir/prog" "$srcdir"/*.o
+}
+
+port1=$(free_port)
+port2=$(free_port)
+dead=$(free_port)
+
+if command -v distcc >/dev/null 2>&1 && command -v distccd >/dev/null 2>&1; then
+    # 两个本地 distccd 进程充当远程编译节点。
+    "$repo_root/scripts/distcc.sh" helper start "$tmpdir/helper1.pid" "$port1" 127.0.0.0/8 2
+    "$repo_root/scripts/distcc.sh" helper start "$tmpdir/helper2.pid" "$port2" 127.0.0.0/8 2
+    sleep 1
+else
+    # 没有 distcc 时用记录日志的假 distcc 和监听端口验证主机探测、计数和报告。
+    mkdir -p "$tmpdir/bin"
+    cat >"$tmpdir/bin/distcc" <<'EOS'
+#!/bin/sh
+for arg do
+    case "$arg" in
+        *.c) printf 'distcc[1] compile %s on 127.0.0.1:%s/2 completed ok\n' "$arg" "$FAKE_PORT" >>"$DISTCC_LOG" ;;
+    esac
+done
+exec "$@"
+EOS
+    chmod +x "$tmpdir/bin/distcc"
+    PATH=$tmpdir/bin:$PATH
+    FAKE_PORT=$port1
+    export PATH FAKE_PORT
+    for port in "$port1" "$port2"; do
+        python3 -c 'import socket, sys, time
+s = socket.socket(); s.bind(("127.0.0.1", int(sys.argv[1]))); s.listen(16)
+while True: s.accept()' "$port" &
+        pids="$pids $!"
+    done
+    sleep 1
+fi
+
+statedir=$tmpdir/state
+jobs=$("$repo_root/scripts/distcc.sh" hosts "$statedir" \
+    "127.0.0.1:$port1/2" "127.0.0.1:$port2/2,lzo" "127.0.0.1:$dead/8" 2>"$tmpdir/hosts.err")
+if [ "$jobs" -ne $(($(nproc) + 4)) ]; then
+    echo "unexpected job count: $jobs" >&2
+    exit 1
+fi
+grep -F "skipped: 127.0.0.1:$dead/8" "$tmpdir/hosts.err" >/dev/null
+if grep -F ":$dead/" "$statedir/hosts" >/dev/null; then
+    echo "unreachable helper kept" >&2
+    exit 1
+fi
+
+# 本机任务数可由 DISTCC_LOCAL_JOBS 指定，同时限制本机编译和预处理的并发数。
+jobs=$(DISTCC_LOCAL_JOBS=3 "$repo_root/scripts/distcc.sh" hosts "$tmpdir/state3" "127.0.0.1:$port1/2" 2>/dev/null)
+if [ "$jobs" -ne 5 ]; then
+    echo "unexpected job count with DISTCC_LOCAL_JOBS=3: $jobs" >&2
+    exit 1
+fi
+grep -F -- '--localslots=3 --localslots_cpp=3 localhost/3 ' "$tmpdir/state3/hosts" >/dev/null
+
+make_units "$tmpdir/src"
+build "$tmpdir/src" "$statedir"
+"$tmpdir/src/prog"
+
+"$repo_root/scripts/distcc.sh" report "$statedir" >"$tmpdir/report.txt"
+grep -E '^Compile units: 7, remote: [0-9]+' "$tmpdir/report.txt" >/dev/null
+if [ -z "$pids" ]; then
+    exit 0
+fi
+grep -F 'Compile units: 7, remote: 7 (100.0%)' "$tmpdir/report.txt" >/dev/null
@@ -0,0 +1,90 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+fail() {
+    echo "$1" >&2
+    exit 1
+}
+
+zstd_bin=$(command -v zstd 2>/dev/null || true)
+if [ -z "$zstd_bin" ]; then
+    echo "skip: zstd not found" >&2
+    exit 0
+fi
+
+# 与 archive 相同的布局：不含 ELF 文件，安装时无需修正解释器。
+make_package() {
+    pkg=$1
+    version=$2
+    mkdir -p "$pkg/content/bin" "$pkg/content/share" "$pkg/patchelf/bin" "$pkg/patchelf/share/misc"
+    cp "$repo_root/scripts/install.sh" "$pkg/install.sh"
+    cat >"$pkg/patchelf/bin/file" <<'EOS'
+#!/bin/sh
+shift 2
+for arg do
+    printf '%s: ASCII text\n' "$arg"
+done
+EOS
+    chmod +x "$pkg/install.sh" "$pkg/patchelf/bin/file"
+    : >"$pkg/patchelf/share/misc/magic.mgc"
+    printf 'prog %s\n' "$version" >"$pkg/content/bin/prog"
+    chmod +x "$pkg/content/bin/prog"
+    seq 1 20000 >"$pkg/content/share/data.txt"
+    printf 'version %s\n' "$version" >>"$pkg/content/share/data.txt"
+    "$repo_root/scripts/write_manifest.sh" "$pkg/content" "$pkg/manifest.sha256" >/dev/null
+    tar --sort=name --format=gnu --mtime=@0 --owner=0 --group=0 --numeric-owner \
+        -cf - -C "$pkg" ./install.sh ./manifest.sha256 ./patchelf ./content | gzip -n -9 >"$pkg.tar.gz"
+}
+
+# 与 archive_delta 相同的布局，zstd 用调用本机 zstd 的脚本代替。
+make_delta() {
+    base=$1
+    target=$2
+    delta=$3
+    mkdir -p "$delta/zstd/bin" "$tmpdir/work"
+    gzip -dc "$base.tar.gz" >"$tmpdir/work/base.tar"
+    gzip -dc "$target.tar.gz" >"$tmpdir/work/target.tar"
+    "$zstd_bin" -q -19 --long=31 --patch-from="$tmpdir/work/base.tar" "$tmpdir/work/target.tar" \
+        -o "$delta/delta.zst"
+    cat >"$delta/delta.info" <<EOS
+BASE=$(basename "$base").tar.gz
+BASE_SHA256=$(sha256sum "$base.tar.gz" | cut -d' ' -f1)
+TARGET=$(basename "$target").tar.gz
+TARGET_TAR_SHA256=$(sha256sum "$tmpdir/work/target.tar" | cut -d' ' -f1)
+EOS
+    printf '#!/bin/sh\nexec "%s" "$@"\n' "$zstd_bin" >"$delta/zstd/bin/zstd"
+    cp "$repo_root/scripts/install.sh" "$delta/install.sh"
+    chmod +x "$delta/zstd/bin/zstd" "$delta/install.sh"
+    rm -rf "$tmpdir/work"
+}
+
+make_package "$tmpdir/base" 1
+make_package "$tmpdir/target" 2
+make_package "$tmpdir/other" 3
+make_delta "$tmpdir/base" "$tmpdir/target" "$tmpdir/delta"
+
+# 差分包还原后的安装结果与完整包相同。
+"$tmpdir/target/install.sh" "$tmpdir/full" >/dev/null
+"$tmpdir/delta/install.sh" --delta "$tmpdir/base.tar.gz" "$tmpdir/inst" >"$tmpdir/delta.out"
+grep -F 'Applying delta base.tar.gz -> target.tar.gz' "$tmpdir/delta.out" >/dev/null || fail "no delta summary"
+diff -r "$tmpdir/full" "$tmpdir/inst" >/dev/null || fail "delta install differs from full install"
+
+# 基准包不符时拒绝安装。
+status=0
+"$tmpdir/delta/install.sh" --delta "$tmpdir/other.tar.gz" "$tmpdir/wrong" >/dev/null 2>"$tmpdir/wrong.err" || status=$?
+[ "$status" -ne 0 ] || fail "wrong base package accepted"
+grep -F 'base package mismatch' "$tmpdir/wrong.err" >/dev/null || fail "unexpected error: $(cat "$tmpdir/wrong.err")"
+[ ! -e "$tmpdir/wrong" ] || fail "wrong base package installed files"
+
+# 差分数据损坏时拒绝安装。
+size=$(wc -c <"$tmpdir/delta/delta.zst")
+printf 'corrupt' | dd of="$tmpdir/delta/delta.zst" bs=1 seek=$((size / 2)) conv=notrunc status=none
+status=0
+"$tmpdir/delta/install.sh" --delta "$tmpdir/base.tar.gz" "$tmpdir/corrupt" >/dev/null 2>&1 || status=$?
+[ "$status" -ne 0 ] || fail "corrupted delta accepted"
+[ ! -e "$tmpdir/corrupt" ] || fail "corrupted delta installed files"
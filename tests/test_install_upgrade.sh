@@ -0,0 +1,147 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+make_package() {
+    pkg=$1
+    mkdir -p \
+        "$pkg/content/bin" \
+        "$pkg/content/lib/copied" \
+        "$pkg/patchelf/bin" \
+        "$pkg/patchelf/share/misc"
+    cp "$repo_root/scripts/install.sh" "$pkg/install.sh"
+    chmod +x "$pkg/install.sh"
+
+    cat >"$pkg/patchelf/bin/file" <<'EOS'
+#!/bin/sh
+shift 2
+for arg do
+    case "$arg" in
+        */bin/prog*)
+            printf '%s: ELF 64-bit LSB executable, x86-64, dynamically linked, for GNU/Linux\n' "$arg"
+            ;;
+        *)
+            printf '%s: ASCII text\n' "$arg"
+            ;;
+    esac
+done
+EOS
+
+    cat >"$pkg/patchelf/bin/patchelf" <<'EOS'
+#!/bin/sh
+case "$1" in
+    --print-interpreter)
+        if grep -q '^interp=' "$2"; then
+            sed -n 's/^interp=//p' "$2"
+        else
+            printf './lib/copied/ld-pgflow-test.so\n'
+        fi
+        ;;
+    --set-interpreter)
+        printf '%s\n' "$3" >>"$PATCHELF_LOG"
+        printf 'interp=%s\n' "$2" >>"$3"
+        ;;
+    *)
+        exit 2
+        ;;
+esac
+EOS
+    chmod +x "$pkg/patchelf/bin/file" "$pkg/patchelf/bin/patchelf"
+    : >"$pkg/patchelf/share/misc/magic.mgc"
+    : >"$pkg/content/lib/copied/ld-pgflow-test.so"
+}
+
+write_manifest() {
+    "$repo_root/scripts/write_manifest.sh" "$1/content" "$1/manifest.sha256" >/dev/null
+}
+
+case "$(uname -m)" in
+    x86_64) ;;
+    *)
+        echo "skip: test fixture only fakes x86-64 ELF files" >&2
+        exit 0
+        ;;
+esac
+
+PATCHELF_LOG=$tmpdir/patchelf.log
+export PATCHELF_LOG
+
+old=$tmpdir/old
+make_package "$old"
+printf 'prog-a v1\n' >"$old/content/bin/prog-a"
+printf 'prog-b v1\n' >"$old/content/bin/prog-b"
+printf 'removed\n' >"$old/content/share-removed.txt"
+chmod +x "$old/content/bin/prog-a" "$old/content/bin/prog-b"
+write_manifest "$old"
+
+inst=$tmpdir/inst
+"$old/install.sh" "$inst" >/dev/null
+if [ ! -f "$inst/.pgflow/manifest.sha256" ]; then
+    echo "installed manifest missing" >&2
+    exit 1
+fi
+if [ "$(wc -l <"$PATCHELF_LOG")" -ne 2 ]; then
+    echo "expected full install to patch 2 files, got: $(cat "$PATCHELF_LOG")" >&2
+    exit 1
+fi
+
+new=$tmpdir/new
+make_package "$new"
+printf 'prog-a v1\n' >"$new/content/bin/prog-a"
+printf 'prog-b v2\n' >"$new/content/bin/prog-b"
+printf 'added\n' >"$new/content/share-added.txt"
+chmod +x "$new/content/bin/prog-a" "$new/content/bin/prog-b"
+write_manifest "$new"
+
+inode_a=$(ls -i "$inst/bin/prog-a" | cut -d' ' -f1)
+: >"$PATCHELF_LOG"
+"$new/install.sh" --upgrade "$inst" >"$tmpdir/upgrade.out"
+
+grep -F 'Upgraded' "$tmpdir/upgrade.out" | grep -F '2 files copied, 2 unchanged, 1 removed' >/dev/null || {
+    cat "$tmpdir/upgrade.out" >&2
+    exit 1
+}
+if [ "$(ls -i "$inst/bin/prog-a" | cut -d' ' -f1)" != "$inode_a" ]; then
+    echo "unchanged file was replaced" >&2
+    exit 1
+fi
+if ! grep -q '^prog-b v2$' "$inst/bin/prog-b"; then
+    echo "changed file was not upgraded" >&2
+    exit 1
+fi
+if [ -e "$inst/share-removed.txt" ] || [ ! -f "$inst/share-added.txt" ]; then
+    echo "removed/added files not synced" >&2
+    exit 1
+fi
+# 解释器在暂存的副本上修正，改名替换后安装目录中不会出现未修正的文件。
+if [ "$(cat "$PATCHELF_LOG")" != "$inst/bin/prog-b.pgflow-new" ]; then
+    echo "expected only the staged prog-b to be patched, got: $(cat "$PATCHELF_LOG")" >&2
+    exit 1
+fi
+if ! grep -q '^interp=' "$inst/bin/prog-b" || [ -n "$(find "$inst" -name '*.pgflow-new')" ]; then
+    echo "patched prog-b not renamed into place" >&2
+    exit 1
+fi
+if ! cmp -s "$new/manifest.sha256" "$inst/.pgflow/manifest.sha256"; then
+    echo "installed manifest not updated" >&2
+    exit 1
+fi
+
+# --quiet 只输出每一步的汇总。
+: >"$PATCHELF_LOG"
+"$old/install.sh" --quiet "$tmpdir/quiet" >"$tmpdir/quiet.out"
+if grep -F -- '->' "$tmpdir/quiet.out" >/dev/null || \
+   ! grep -E "^Copied 4 files \([0-9]+ bytes\) to $tmpdir/quiet in [0-9]+s$" "$tmpdir/quiet.out" >/dev/null || \
+   ! grep -Fx "Set the interpreter of 2 files to $tmpdir/quiet/lib/copied/ld-pgflow-test.so" "$tmpdir/quiet.out" >/dev/null; then
+    echo "unexpected quiet install output:" >&2
+    cat "$tmpdir/quiet.out" >&2
+    exit 1
+fi
+if [ "$(wc -l <"$PATCHELF_LOG")" -ne 2 ]; then
+    echo "expected quiet install to patch 2 files, got: $(cat "$PATCHELF_LOG")" >&2
+    exit 1
+fi
@@ -0,0 +1,68 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+# nproc 遵循 OMP_NUM_THREADS，用它模拟 8 核节点。
+OMP_NUM_THREADS=8
+export OMP_NUM_THREADS
+
+meminfo() {
+    printf 'MemTotal:       %d kB\nMemAvailable:   %d kB\n' "$1" "$1" >"$tmpdir/meminfo"
+}
+
+expect() {
+    actual=$(CGROUP_ROOT=$tmpdir/cgroup PROC_CGROUP=$tmpdir/proc_cgroup MEMINFO=$tmpdir/meminfo \
+        "$repo_root/scripts/make_jobs.sh" "$1" | tail -n 1)
+    if [ "$actual" != "$2" ]; then
+        echo "$3: expected '$2', got '$actual'" >&2
+        exit 1
+    fi
+}
+
+# cgroup v2：CPU 配额 4 核，内存上限 3 GiB 已用 1 GiB。
+echo '0::/' >"$tmpdir/proc_cgroup"
+mkdir -p "$tmpdir/cgroup"
+meminfo 67108864
+echo '400000 100000' >"$tmpdir/cgroup/cpu.max"
+echo max >"$tmpdir/cgroup/memory.max"
+echo 0 >"$tmpdir/cgroup/memory.current"
+expect 1024 '4 4' 'cpu quota'
+echo 3221225472 >"$tmpdir/cgroup/memory.max"
+echo 1073741824 >"$tmpdir/cgroup/memory.current"
+expect 1024 '2 4' 'cgroup memory limit'
+expect 4096 '1 4' 'at least one job'
+
+# 本进程在 build.slice/job 中，配额和内存上限设在上级 build.slice。
+mkdir -p "$tmpdir/cgroup/build.slice/job"
+echo '0::/build.slice/job' >"$tmpdir/proc_cgroup"
+echo 'max 100000' >"$tmpdir/cgroup/build.slice/job/cpu.max"
+echo max >"$tmpdir/cgroup/build.slice/job/memory.max"
+echo 536870912 >"$tmpdir/cgroup/build.slice/job/memory.current"
+echo '300000 100000' >"$tmpdir/cgroup/build.slice/cpu.max"
+echo 6442450944 >"$tmpdir/cgroup/build.slice/memory.max"
+echo 2147483648 >"$tmpdir/cgroup/build.slice/memory.current"
+rm "$tmpdir/cgroup/cpu.max" "$tmpdir/cgroup/memory.max" "$tmpdir/cgroup/memory.current"
+expect 1024 '3 3' 'ancestor cpu quota'
+expect 2048 '2 3' 'ancestor memory limit'
+
+# cgroup v1 不限制时按 nproc 和 MemAvailable 计算。
+echo '4:memory:/job' >"$tmpdir/proc_cgroup"
+rm -rf "$tmpdir/cgroup"
+mkdir -p "$tmpdir/cgroup/cpu" "$tmpdir/cgroup/memory"
+echo -1 >"$tmpdir/cgroup/cpu/cpu.cfs_quota_us"
+echo 100000 >"$tmpdir/cgroup/cpu/cpu.cfs_period_us"
+echo 9223372036854771712 >"$tmpdir/cgroup/memory/memory.limit_in_bytes"
+echo 1073741824 >"$tmpdir/cgroup/memory/memory.usage_in_bytes"
+expect 1024 '8 8' 'no limits'
+meminfo 6291456
+expect 1024 '6 8' 'available memory'
+
+# cgroup v1 按 /proc/self/cgroup 中 memory 控制器的路径读取限制。
+mkdir -p "$tmpdir/cgroup/memory/job"
+echo 3221225472 >"$tmpdir/cgroup/memory/job/memory.limit_in_bytes"
+echo 1073741824 >"$tmpdir/cgroup/memory/job/memory.usage_in_bytes"
+expect 1024 '2 8' 'v1 cgroup path'
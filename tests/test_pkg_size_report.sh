@@ -0,0 +1,39 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+pkg=$tmpdir/package
+mkdir -p "$pkg/content/lib/copied" "$pkg/patchelf/lib/copied"
+head -c 4096 /dev/urandom >"$pkg/content/lib/copied/libdup.so"
+cp "$pkg/content/lib/copied/libdup.so" "$pkg/patchelf/lib/copied/libdup.so"
+printf 'unique\n' >"$pkg/content/README"
+
+python3 "$repo_root/scripts/pkg_size_report.py" "$pkg" --output "$tmpdir/report.txt" >/dev/null
+grep -F 'Duplicate groups: 1 (4.0 KiB reclaimable)' "$tmpdir/report.txt" >/dev/null
+grep -F 'patchelf/lib/copied/libdup.so' "$tmpdir/report.txt" >/dev/null
+
+set +e
+python3 "$repo_root/scripts/pkg_size_report.py" "$pkg" --budget 0 >/dev/null 2>&1
+status=$?
+set -e
+if [ "$status" -ne 2 ]; then
+    echo "expected budget failure, got status $status" >&2
+    exit 1
+fi
+
+python3 "$repo_root/scripts/pkg_size_report.py" "$pkg" --hardlink >/dev/null
+links=$(stat -c %h "$pkg/content/lib/copied/libdup.so")
+if [ "$links" -ne 2 ]; then
+    echo "expected duplicate to be hard linked, got $links links" >&2
+    exit 1
+fi
+
+members=$(tar -C "$pkg" -cf - . | tar -tvf - | grep -c '^h' || true)
+if [ "$members" -ne 1 ]; then
+    echo "expected one hard link member in the archive, got $members" >&2
+    exit 1
+fi
@@ -0,0 +1,82 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+# 假的 nix/nix-env：develop 模拟下载并创建 profile，path-info 报告闭包。
+mkdir -p "$tmpdir/bin" "$tmpdir/store/env"
+cat >"$tmpdir/bin/nix" <<'EOS'
+#!/bin/sh
+case "$1" in
+    develop)
+        [ "$2" = "flakes#devShells.x86_64-linux.postgres" ] || exit 2
+        [ "$3" = "--profile" ] || exit 2
+        [ -e "$FAKE_STORE/broken" ] && { echo "error: cannot fetch" >&2; exit 1; }
+        [ -e "$FAKE_STORE/hang" ] && exec sleep 30
+        sleep 1
+        printf "copying path '/nix/store/aaa' from 'https://cache'...\n" >&2
+        printf "copying path '/nix/store/bbb' from 'https://cache'...\n" >&2
+        ln -sfn "$FAKE_STORE/env" "$4"
+        ;;
+    path-info)
+        if [ "$2" = "-r" ]; then
+            printf '%s\n' /nix/store/aaa /nix/store/bbb /nix/store/ccc
+        else
+            printf '%s %s\n' "$3" 3145728
+        fi
+        ;;
+esac
+EOS
+printf '#!/bin/sh\necho "$@" >>"$FAKE_STORE/nix-env.log"\n' >"$tmpdir/bin/nix-env"
+chmod +x "$tmpdir/bin/nix" "$tmpdir/bin/nix-env"
+PATH=$tmpdir/bin:$PATH
+FAKE_STORE=$tmpdir/store
+export PATH FAKE_STORE
+
+script=$repo_root/scripts/prefetch_nixenv.sh
+profile=$tmpdir/gcroots/x86_64-linux-postgres
+
+"$script" start "$tmpdir/state" flakes#devShells.x86_64-linux.postgres "$profile"
+if [ -f "$tmpdir/state/status" ]; then
+    echo "start did not run in the background" >&2
+    exit 1
+fi
+out=$("$script" wait "$tmpdir/state")
+case "$out" in
+    *"closure 3 paths, 3.0MiB, fetched 2 paths in "*"GC root $profile") ;;
+    *)
+        echo "unexpected summary: $out" >&2
+        exit 1
+        ;;
+esac
+[ -L "$profile" ]
+grep -F -- "-p $profile --delete-generations old" "$FAKE_STORE/nix-env.log" >/dev/null
+
+: >"$FAKE_STORE/broken"
+"$script" start "$tmpdir/state" flakes#devShells.x86_64-linux.postgres "$profile"
+if "$script" wait "$tmpdir/state" 2>"$tmpdir/err"; then
+    echo "wait should fail when the fetch fails" >&2
+    exit 1
+fi
+grep -F 'cannot fetch' "$tmpdir/err" >/dev/null
+
+# 下载超时，或后台进程没有写入状态就退出时，wait 失败而不是一直等待。
+rm -f "$FAKE_STORE/broken"
+: >"$FAKE_STORE/hang"
+"$script" start "$tmpdir/state" flakes#devShells.x86_64-linux.postgres "$profile"
+if "$script" wait "$tmpdir/state" 1 2>"$tmpdir/err"; then
+    echo "wait should time out" >&2
+    exit 1
+fi
+grep -F 'did not finish in 1s' "$tmpdir/err" >/dev/null
+pid=$(cat "$tmpdir/state/pid")
+pkill -P "$pid" sleep || true
+kill "$pid"
+if "$script" wait "$tmpdir/state" 2>"$tmpdir/err"; then
+    echo "wait should fail when the fetch process is gone" >&2
+    exit 1
+fi
+grep -F 'exited without a status' "$tmpdir/err" >/dev/null
@@ -0,0 +1,38 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+fail() {
+    echo "$1" >&2
+    exit 1
+}
+
+mkdir -p "$tmpdir/src/sub"
+printf '%0100d' 0 >"$tmpdir/src/a"
+printf '%0200d' 0 >"$tmpdir/src/sub/b"
+log=$tmpdir/logs/run.log.gz
+
+# 成功时只输出一行汇总，cp -v 的输出进入日志。
+out=$("$repo_root/scripts/quiet_run.sh" "$log" copy cp -rv "$tmpdir/src" "$tmpdir/dest")
+[ "$(printf '%s\n' "$out" | wc -l)" -eq 1 ] || fail "expected one summary line, got: $out"
+case "$out" in
+    "copy: done in "*", 4 lines logged, 2 files copied (300 bytes)") ;;
+    *) fail "unexpected summary: $out" ;;
+esac
+zcat "$log" | grep -q "/dest/sub/b'$" || fail "cp output missing from the log"
+
+# 失败时返回命令的状态并输出最后几行，日志按运行追加。
+status=0
+out=$(QUIET_TAIL_LINES=1 "$repo_root/scripts/quiet_run.sh" "$log" broken \
+    sh -c 'echo first; echo last; exit 3') || status=$?
+[ "$status" -eq 3 ] || fail "expected status 3, got $status"
+case "$out" in
+    "broken: failed with status 3 in "*"
+last") ;;
+    *) fail "unexpected failure output: $out" ;;
+esac
+[ "$(zcat "$log" | grep -c '^### ')" -eq 2 ] || fail "expected two runs in the log"
@@ -14,7 +14,8 @@ mkdir -p \
     "$root/patchelf/share/misc" \
     "$root/src" \
     "$root/tools/bin" \
-    "$tmpdir/pghome/bin"
+    "$tmpdir/pghome/bin" \
+    "$tmpdir/pghome/lib/copied/perl"
 cp "$repo_root/scripts/run_postgres_tests.sh" "$root/run.sh"
 chmod +x "$root/run.sh"
 
@@ -80,6 +81,10 @@ EOF
 cat >"$root/tools/bin/make" <<'EOF'
 #!/bin/sh
 printf '%s\n' "$@" >"$MAKE_ARGS_FILE"
+printf '%s %s\n' "$1" "$2" >>"$MAKE_CALLS_FILE"
+if [ "$1" = -C ] && [ "$2" = "${FAIL_SUITE:-}" ]; then
+    exit 2
+fi
 EOF
 
 chmod +x \
@@ -97,8 +102,10 @@ chmod +x \
 : >"$root/tools/bin/zstd"
 
 MAKE_ARGS_FILE=$tmpdir/make.args
+MAKE_CALLS_FILE=$tmpdir/make.calls
 INITDB_ENV_FILE=$tmpdir/initdb.env
-export MAKE_ARGS_FILE INITDB_ENV_FILE
+PGFLOW_TEST_CACHE=$tmpdir/cache
+export MAKE_ARGS_FILE MAKE_CALLS_FILE INITDB_ENV_FILE PGFLOW_TEST_CACHE
 (
     cd "$root"
     PGFLOW_TEST_WORKDIR=$tmpdir/work ./run.sh ../pghome installcheck-world >/dev/null
@@ -128,3 +135,74 @@ if ! grep -Fx 'LC_ALL=C' "$INITDB_ENV_FILE" >/dev/null; then
     echo "expected LC_ALL=C, got: $(cat "$INITDB_ENV_FILE")" >&2
     exit 1
 fi
+
+if [ "$(readlink "$root/lib/copied/perl")" != "$tmpdir/pghome/lib/copied/perl" ]; then
+    echo "test package perl library is not linked to PGHOME" >&2
+    exit 1
+fi
+
+# 结果缓存：同一内容的包不再重复运行，强制、包内容变化或过期时重新运行。
+run_tests() {
+    (cd "$root" && PGFLOW_TEST_WORKDIR=$tmpdir/work ./run.sh ../pghome "$@")
+}
+
+assert_calls() {
+    if [ "$(wc -l <"$MAKE_CALLS_FILE")" -ne "$1" ]; then
+        echo "$2: expected $1 make calls, got:" >&2
+        cat "$MAKE_CALLS_FILE" >&2
+        exit 1
+    fi
+}
+
+assert_calls 1 'first run'
+if ! run_tests installcheck-world | grep -F 'nothing to run' >/dev/null; then
+    echo "cached run did not short-circuit" >&2
+    exit 1
+fi
+assert_calls 1 'cached run'
+PGFLOW_TEST_FORCE=1 run_tests installcheck-world >/dev/null
+assert_calls 2 'forced run'
+run_tests installcheck-world extra=1 >/dev/null
+assert_calls 3 'different make arguments'
+echo changed >"$tmpdir/pghome/bin/pg_config"
+run_tests installcheck-world >/dev/null
+assert_calls 4 'changed PGHOME'
+
+# PGHOME 的清单与文件一致（设置过 interpreter 的 ELF 程序除外）时才作为缓存键。
+mkdir -p "$tmpdir/pghome/.pgflow"
+printf 'elf\n' >"$tmpdir/pghome/bin/sample"
+(cd "$tmpdir/pghome" && sha256sum bin/pg_config bin/sample >.pgflow/manifest.sha256)
+printf 'patched\n' >"$tmpdir/pghome/bin/sample"
+run_tests installcheck-world >/dev/null
+assert_calls 5 'PGHOME manifest'
+printf 'patched again\n' >"$tmpdir/pghome/bin/sample"
+run_tests installcheck-world >/dev/null
+assert_calls 5 'PGHOME manifest with a patched ELF executable'
+echo tampered >"$tmpdir/pghome/bin/pg_config"
+run_tests installcheck-world >/dev/null
+assert_calls 6 'tampered PGHOME file'
+
+PGFLOW_TEST_SUITES='src/test/regress contrib/hstore'
+export PGFLOW_TEST_SUITES
+: >"$MAKE_CALLS_FILE"
+if FAIL_SUITE=contrib/hstore run_tests installcheck-world >/dev/null 2>&1; then
+    echo "failed suite not reported" >&2
+    exit 1
+fi
+if ! grep -Fx -- '-C contrib/hstore' "$MAKE_CALLS_FILE" >/dev/null || \
+   [ "$(sed -n 3p "$MAKE_ARGS_FILE")" != installcheck ]; then
+    echo "suites not run one by one with installcheck:" >&2
+    cat "$MAKE_CALLS_FILE" "$MAKE_ARGS_FILE" >&2
+    exit 1
+fi
+: >"$MAKE_CALLS_FILE"
+run_tests installcheck-world >/dev/null
+if [ "$(cat "$MAKE_CALLS_FILE")" != '-C contrib/hstore' ]; then
+    echo "expected only the failed suite to rerun, got:" >&2
+    cat "$MAKE_CALLS_FILE" >&2
+    exit 1
+fi
+find "$PGFLOW_TEST_CACHE" -type f -exec touch -d '30 days ago' {} +
+: >"$MAKE_CALLS_FILE"
+run_tests installcheck-world >/dev/null
+assert_calls 2 'expired entries'
@@ -0,0 +1,35 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+fail() {
+    echo "$1" >&2
+    exit 1
+}
+
+workdir=$tmpdir/work
+mkdir -p "$workdir"
+chmod 755 "$tmpdir"
+
+# root 时以指定用户运行并把工作目录交给该用户，其他用户原样运行。
+out=$("$repo_root/scripts/run_unprivileged.sh" nobody "$workdir" sh -c 'id -un; echo "$HOME"; pwd; touch out')
+if [ "$(id -u)" -eq 0 ]; then
+    [ "$(stat -c %U "$workdir/out")" = nobody ] || fail "output not owned by nobody"
+    expected="nobody
+$workdir
+$workdir"
+else
+    expected="$(id -un)
+$HOME
+$(pwd)"
+fi
+[ "$out" = "$expected" ] || fail "unexpected output: $out"
+
+# 参数不足时报错。
+status=0
+"$repo_root/scripts/run_unprivileged.sh" nobody "$workdir" 2>/dev/null || status=$?
+[ "$status" -eq 1 ] || fail "expected status 1 for missing CMD, got $status"
@@ -0,0 +1,48 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+if [ ! -r /proc/stat ] || [ ! -r /proc/diskstats ]; then
+    echo "skip: /proc not available" >&2
+    exit 0
+fi
+
+samples=$tmpdir/stage1.samples
+"$repo_root/scripts/sample_resources.sh" start "$samples" 1
+sleep 2
+"$repo_root/scripts/sample_resources.sh" stop "$samples"
+
+if [ -e "$samples.pid" ]; then
+    echo "sampler pid file left behind" >&2
+    exit 1
+fi
+if awk 'NF != 7 { bad = 1 } END { exit !(bad || NR < 3) }' "$samples"; then
+    echo "unexpected samples:" >&2
+    cat "$samples" >&2
+    exit 1
+fi
+
+# 两次运行写入历史库后，报告应对比最近一次与之前的中位数。
+cd "$repo_root"
+python3 - "$samples" "$tmpdir/history.sqlite" <<'EOS'
+import sys
+from pipelines.common.history import History, summarize_samples
+
+samples = summarize_samples(open(sys.argv[1]).read())
+assert 0 <= samples['cpu_avg'] <= 100, samples
+assert samples['mem_peak_kb'] > 0, samples
+history = History(sys.argv[2])
+for duration, size in ((10.0, 1000), (15.0, 1100)):
+    run_id = history.start_run('pack_test', 'prog', 'x86_64-linux', 1, 'hash')
+    history.add_stage(run_id, 'stage1', 'done', 'hash', duration, samples)
+    history.add_package(run_id, 'prog-*-x86_64-linux.tar.gz', 'prog-1-x86_64-linux.tar.gz', size)
+    history.finish_run(run_id, 'SUCCESSFUL')
+EOS
+python3 -m pipelines.common.history "$tmpdir/history.sqlite" \
+    --progname prog --system x86_64-linux >"$tmpdir/report.txt"
+grep -E '^stage1 +duration +15\.0 +10\.0 +\+50\.0%' "$tmpdir/report.txt" >/dev/null
+grep -E '^prog-\*-x86_64-linux\.tar\.gz +1100 +1000 +\+10\.0%' "$tmpdir/report.txt" >/dev/null
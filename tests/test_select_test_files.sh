@@ -0,0 +1,82 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+for tool in cc python3; do
+    if ! command -v "$tool" >/dev/null 2>&1; then
+        echo "skip: $tool not found" >&2
+        exit 0
+    fi
+done
+
+src=$tmpdir/src
+regress=$src/src/test/regress
+ecpg=$src/src/interfaces/ecpg/test/preproc
+mkdir -p "$regress/expected" "$regress/sql" "$regress/results" "$src/src/backend" \
+    "$src/doc/src/sgml" "$src/src/test/perl/PostgreSQL/Test" "$ecpg" "$src/config" "$src/.git"
+cat >"$tmpdir/main.c" <<'EOC'
+int main(void) { return 0; }
+EOC
+echo 'all:' >"$src/GNUmakefile"
+echo 'include ../Makefile.global' >"$regress/GNUmakefile"
+echo 'test: boolean' >"$regress/parallel_schedule"
+echo 'SELECT true;' >"$regress/sql/boolean.sql"
+echo ' t' >"$regress/expected/boolean.out"
+echo 'stale' >"$regress/results/boolean.out"
+echo 'object' >"$regress/pg_regress.o"
+echo 'int x;' >"$regress/pg_regress.c"
+cc -o "$regress/pg_regress" "$tmpdir/main.c"
+cc -shared -fPIC -o "$regress/regress.so" "$tmpdir/main.c"
+cc -o "$src/src/backend/postgres" "$tmpdir/main.c"
+echo 'bitcode' >"$src/src/backend/postgres.bc"
+touch -d '2001-02-03 04:05:06' "$src/src/backend/postgres" "$src/src/backend/postgres.bc"
+echo 'package PostgreSQL::Test::Utils; 1;' >"$src/src/test/perl/PostgreSQL/Test/Utils.pm"
+echo 'int main(void) { return 0; }' >"$ecpg/define.pgc"
+cc -o "$ecpg/define" "$tmpdir/main.c"
+printf '#!/bin/sh\n' >"$src/config/install-sh"
+chmod +x "$src/config/install-sh"
+echo '<sect1/>' >"$src/doc/src/sgml/intro.sgml"
+echo 'ref' >"$src/.git/HEAD"
+
+python3 "$repo_root/scripts/select_test_files.py" "$src" "$tmpdir/dest" >"$tmpdir/out"
+dest=$tmpdir/dest
+
+for f in GNUmakefile src/test/regress/GNUmakefile src/test/regress/parallel_schedule \
+         src/test/regress/sql/boolean.sql src/test/regress/expected/boolean.out \
+         src/test/regress/pg_regress src/test/regress/regress.so \
+         src/test/perl/PostgreSQL/Test/Utils.pm \
+         src/interfaces/ecpg/test/preproc/define.pgc src/interfaces/ecpg/test/preproc/define \
+         config/install-sh; do
+    if ! cmp -s "$src/$f" "$dest/$f"; then
+        echo "not copied: $f" >&2
+        exit 1
+    fi
+done
+
+for f in src/test/regress/pg_regress.o src/backend/postgres src/backend/postgres.bc; do
+    if [ ! -f "$dest/$f" ] || [ -s "$dest/$f" ]; then
+        echo "not an empty placeholder: $f" >&2
+        exit 1
+    fi
+done
+if [ "$(stat -c %Y "$dest/src/backend/postgres")" != "$(stat -c %Y "$src/src/backend/postgres")" ] || \
+   [ ! -x "$dest/src/backend/postgres" ]; then
+    echo "placeholder lost mtime or mode" >&2
+    exit 1
+fi
+
+for f in src/test/regress/pg_regress.c src/test/regress/results doc .git; do
+    if [ -e "$dest/$f" ]; then
+        echo "not left out: $f" >&2
+        exit 1
+    fi
+done
+
+if ! grep -q '^Kept 11 files' "$tmpdir/out"; then
+    echo "unexpected summary: $(cat "$tmpdir/out")" >&2
+    exit 1
+fi
@@ -0,0 +1,74 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+for tool in cc file patchelf; do
+    if ! command -v "$tool" >/dev/null 2>&1; then
+        echo "skip: $tool not found" >&2
+        exit 0
+    fi
+done
+
+inst=$tmpdir/inst
+mkdir -p "$inst/bin" "$inst/lib/copied"
+cat >"$tmpdir/b.c" <<'EOC'
+int b(void) { return 1; }
+EOC
+cat >"$tmpdir/c.c" <<'EOC'
+int c(void) { return 2; }
+EOC
+cat >"$tmpdir/a.c" <<'EOC'
+int b(void);
+int a(void) { return b(); }
+EOC
+cat >"$tmpdir/prog.c" <<'EOC'
+int a(void);
+int b(void);
+int c(void);
+int main(void) { return a() + b() + c() == 4 ? 0 : 1; }
+EOC
+cc -shared -fPIC -Wl,-soname,libb.so -o "$inst/lib/copied/libb.so" "$tmpdir/b.c"
+cc -shared -fPIC -Wl,-soname,libc2.so -o "$inst/lib/copied/libc2.so" "$tmpdir/c.c"
+cc -shared -fPIC -Wl,-soname,liba.so -o "$inst/lib/liba.so" "$tmpdir/a.c" -L"$inst/lib/copied" -lb
+cc -o "$inst/bin/prog" "$tmpdir/prog.c" -L"$inst/lib" -L"$inst/lib/copied" -la -lb -lc2
+
+libdirs=$inst/lib:$inst/lib/copied
+"$repo_root/scripts/set_rpath.sh" "$inst" "$libdirs" >/dev/null
+"$repo_root/scripts/count_lib_lookups.sh" "$inst" "$tmpdir/before" >/dev/null
+"$repo_root/scripts/set_rpath.sh" "$inst" "$libdirs" prune >/dev/null
+"$repo_root/scripts/count_lib_lookups.sh" "$inst" "$tmpdir/after" "$tmpdir/before" >"$tmpdir/report"
+
+expect_rpath() {
+    actual=$(patchelf --print-rpath "$inst/$1")
+    if [ "$actual" != "$2" ]; then
+        echo "unexpected rpath of $1: '$actual' (expected '$2')" >&2
+        exit 1
+    fi
+}
+
+# prog 的依赖大多在 lib/copied，排在前面；liba 只需要 lib/copied；libb 不需要包内目录。
+expect_rpath bin/prog '$ORIGIN/../lib/copied:$ORIGIN/../lib'
+expect_rpath lib/liba.so '$ORIGIN/copied'
+expect_rpath lib/copied/libb.so ''
+
+if ! "$inst/bin/prog"; then
+    echo "prog failed after pruning" >&2
+    exit 1
+fi
+
+before=$(awk '$3 == "bin/prog" { print $1 }' "$tmpdir/before")
+after=$(awk '$3 == "bin/prog" { print $1 }' "$tmpdir/after")
+if [ "$after" -ge "$before" ]; then
+    echo "lookups of bin/prog did not drop: $before -> $after" >&2
+    cat "$tmpdir/report" >&2
+    exit 1
+fi
+if ! grep -q "^Loader lookups: " "$tmpdir/report"; then
+    echo "missing summary in report" >&2
+    cat "$tmpdir/report" >&2
+    exit 1
+fi
@@ -0,0 +1,52 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+for tool in cc file objcopy strip; do
+    if ! command -v "$tool" >/dev/null 2>&1; then
+        echo "skip: $tool not found" >&2
+        exit 0
+    fi
+done
+
+mkdir -p "$tmpdir/inst/bin" "$tmpdir/debug"
+cat >"$tmpdir/hello.c" <<'EOC'
+int main(void) { return 0; }
+EOC
+cc -g -Wl,--build-id=sha1 -o "$tmpdir/inst/bin/hello" "$tmpdir/hello.c"
+cp "$tmpdir/inst/bin/hello" "$tmpdir/inst/bin/hello2"
+
+buildid=$(file "$tmpdir/inst/bin/hello" | grep -oE 'BuildID\[[^]]*\]=[0-9a-f]+' | cut -d= -f2)
+if [ -z "$buildid" ]; then
+    echo "missing build-id in test binary" >&2
+    exit 1
+fi
+
+"$repo_root/scripts/split_debuginfo.sh" "$tmpdir/inst" "$tmpdir/debug" >/dev/null
+
+prefix=$(printf '%s' "$buildid" | cut -c1-2)
+rest=$(printf '%s' "$buildid" | cut -c3-)
+debugfile=$tmpdir/debug/.build-id/$prefix/$rest.debug
+if [ ! -f "$debugfile" ]; then
+    echo "missing debug file: $debugfile" >&2
+    exit 1
+fi
+if ! file "$debugfile" | grep -q 'with debug_info'; then
+    echo "debug file has no debug info: $(file "$debugfile")" >&2
+    exit 1
+fi
+if file "$tmpdir/inst/bin/hello" | grep -q 'not stripped'; then
+    echo "binary was not stripped: $(file "$tmpdir/inst/bin/hello")" >&2
+    exit 1
+fi
+"$tmpdir/inst/bin/hello"
+
+count=$(find "$tmpdir/debug/.build-id" -type f | wc -l)
+if [ "$count" -ne 1 ]; then
+    echo "expected 1 debug file, got $count" >&2
+    exit 1
+fi
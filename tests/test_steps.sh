@@ -0,0 +1,152 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+
+# 用与 xflow Node 相同的私有属性（_Node__cwd、_Node__nixenv、_Node__conn）的本地替身测试
+# run_steps 的调度顺序、失败传播，以及步骤线程之间工作目录和 nix 环境的隔离。
+python3 - "$repo_root" >/dev/null <<'EOS'
+import sys
+import threading
+import time
+import types
+from contextlib import contextmanager
+from pathlib import PurePosixPath
+
+sys.path.insert(0, sys.argv[1])
+try:
+    import xflow.framework.node  # noqa: F401
+except ImportError:
+    for name in ("xflow", "xflow.framework", "xflow.framework.node"):
+        sys.modules.setdefault(name, types.ModuleType(name))
+    sys.modules["xflow.framework.node"].Node = object
+    sys.modules["xflow.framework.node"].CommandResult = str
+
+from pipelines.common.steps import Step, StepError, node_view, run_steps
+
+
+class Conn:
+    def __init__(self):
+        self.log = []
+
+    def open(self):
+        pass
+
+    def exec(self, cmd):
+        self.log.append(cmd)
+
+
+class Node:
+    """xflow Node 中 dir、nixenv 和 exec 的行为。"""
+    def __init__(self):
+        self.__cwd = PurePosixPath("")
+        self.__nixenv = {}
+        self.__conn = Conn()
+        self.execs = []
+        self.execs_lock = threading.Lock()
+
+    @contextmanager
+    def dir(self, path):
+        try:
+            self.__cwd = PurePosixPath(path)
+            yield
+        finally:
+            self.__cwd = PurePosixPath("")
+
+    @contextmanager
+    def nixenv(self, flake, system=None, name="default", options=None):
+        try:
+            self.__nixenv.update({"flake": flake, "system": system, "name": name, "options": options})
+            yield
+        finally:
+            self.__nixenv.clear()
+
+    def exec(self, cmd, envs=None):
+        with self.execs_lock:
+            self.execs.append((cmd, str(self.__cwd), self.__nixenv.get("name")))
+        return ""
+
+
+def check(cond, msg):
+    if not cond:
+        print(msg, file=sys.stderr)
+        sys.exit(1)
+
+
+def new_view():
+    return node_view(Node(), pipeline=None)
+
+
+# 依赖顺序：b、c 在 a 之后并发执行（Barrier 要求两者同时在运行），d 在 b、c 之后。
+events = []
+barrier = threading.Barrier(2, timeout=10)
+
+def step(name, wait=False):
+    def func():
+        events.append(f"start {name}")
+        if wait:
+            barrier.wait()
+        events.append(f"end {name}")
+    return func
+
+run_steps([Step("d", step("d"), after=("b", "c")),
+           Step("b", step("b", True), after=("a",)),
+           Step("c", step("c", True), after=("a",)),
+           Step("a", step("a"))],
+          new_view(), threading.local(), parallelism=2)
+order = {event: i for i, event in enumerate(events)}
+check(order["end a"] < min(order["start b"], order["start c"]), f"b/c started before a ended: {events}")
+check(order["start d"] > max(order["end b"], order["end c"]), f"d started before b/c ended: {events}")
+
+# 失败传播：失败步骤的后继不再启动，已在运行的步骤结束后抛出 StepError。
+ran = []
+started = threading.Event()
+
+def slow():
+    started.set()
+    time.sleep(0.2)
+    ran.append("slow")
+
+def broken():
+    started.wait(10)
+    raise RuntimeError("boom")
+
+try:
+    run_steps([Step("slow", slow),
+               Step("broken", broken),
+               Step("later", lambda: ran.append("later"), after=("broken",))],
+              new_view(), threading.local(), parallelism=2)
+except StepError as e:
+    check(e.step == "broken" and isinstance(e.error, RuntimeError), f"unexpected StepError: {e}")
+else:
+    check(False, "run_steps did not raise StepError")
+check(ran == ["slow"], f"unexpected steps ran after the failure: {ran}")
+
+# 线程隔离：两个并发步骤各自切换工作目录和 nix 环境，互不影响；嵌套退出后恢复外层状态。
+view = new_view()
+local = threading.local()
+barrier = threading.Barrier(2, timeout=10)
+
+def isolated(name):
+    def func():
+        node = local.node
+        with node.dir(f"/{name}"), node.nixenv("flake", name=name):
+            barrier.wait()
+            node.exec(f"outer {name}")
+            with node.dir(f"/{name}/sub"), node.nixenv("flake", name=f"{name}-inner"):
+                barrier.wait()
+                node.exec(f"inner {name}")
+            node.exec(f"restored {name}")
+        node.exec(f"plain {name}")
+    return func
+
+run_steps([Step("x", isolated("x")), Step("y", isolated("y"))], view, local, parallelism=2)
+seen = {cmd: (cwd, env) for cmd, cwd, env in view.execs}
+for name in ("x", "y"):
+    check(seen[f"outer {name}"] == (f"/{name}", name), f"outer state leaked: {seen}")
+    check(seen[f"inner {name}"] == (f"/{name}/sub", f"{name}-inner"), f"inner state leaked: {seen}")
+    check(seen[f"restored {name}"] == (f"/{name}", name), f"nested state not restored: {seen}")
+    check(seen[f"plain {name}"] == (".", None), f"state not reset: {seen}")
+check(view._Node__nixenv == {} and str(view._Node__cwd) == ".", "step changed the pipeline view")
+EOS
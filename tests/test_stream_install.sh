@@ -0,0 +1,92 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+pkg=$tmpdir/package
+mkdir -p \
+    "$pkg/content/bin" \
+    "$pkg/content/lib/copied" \
+    "$pkg/content/tools/bin" \
+    "$pkg/patchelf/bin" \
+    "$pkg/patchelf/share/misc"
+cp "$repo_root/scripts/install.sh" "$pkg/install.sh"
+
+cat >"$pkg/patchelf/bin/file" <<'EOS'
+#!/bin/sh
+echo "unexpected file scan: $*" >&2
+exit 1
+EOS
+
+cat >"$pkg/patchelf/bin/patchelf" <<'EOS'
+#!/bin/sh
+case "$1" in
+    --print-interpreter)
+        if grep -q '^interp=' "$2"; then
+            sed -n 's/^interp=//p' "$2"
+        else
+            printf './lib/copied/ld-pgflow-test.so\n'
+        fi
+        ;;
+    --set-interpreter)
+        printf '%s\n' "$3" >>"$PATCHELF_LOG"
+        printf 'interp=%s\n' "$2" >>"$3"
+        ;;
+    *)
+        exit 2
+        ;;
+esac
+EOS
+chmod +x "$pkg/patchelf/bin/file" "$pkg/patchelf/bin/patchelf"
+: >"$pkg/patchelf/share/misc/magic.mgc"
+: >"$pkg/content/lib/copied/ld-pgflow-test.so"
+printf 'postgres\n' >"$pkg/content/bin/postgres"
+printf 'psql\n' >"$pkg/content/bin/psql"
+printf 'tool\n' >"$pkg/content/tools/bin/tool"
+chmod +x "$pkg/content/bin/postgres" "$pkg/content/bin/psql" "$pkg/content/tools/bin/tool"
+# 以 ./ 开头的符号链接目标不随成员名改写；只读成员安装后可写。
+ln -s ./psql "$pkg/content/bin/psql-link"
+chmod a-w "$pkg/content/bin/postgres"
+
+"$repo_root/scripts/write_manifest.sh" "$pkg/content" "$pkg/manifest.sha256" >/dev/null
+printf '%s\n' ./bin/postgres ./bin/psql ./tools/bin/tool >"$pkg/elfexec.list"
+tar --sort=name -C "$pkg" -cf - \
+    ./elfexec.list ./install.sh ./manifest.sha256 ./patchelf ./content \
+    | gzip -n >"$tmpdir/package.tar.gz"
+
+PATCHELF_LOG=$tmpdir/patchelf.log
+export PATCHELF_LOG
+: >"$PATCHELF_LOG"
+
+inst=$tmpdir/inst
+"$repo_root/scripts/stream_install.sh" - "$inst" <"$tmpdir/package.tar.gz" >/dev/null
+
+expected="$inst/bin/postgres
+$inst/bin/psql"
+if [ "$(cat "$PATCHELF_LOG")" != "$expected" ]; then
+    echo "unexpected patched files: $(cat "$PATCHELF_LOG")" >&2
+    exit 1
+fi
+if ! grep -qx "interp=$inst/lib/copied/ld-pgflow-test.so" "$inst/bin/postgres"; then
+    echo "interpreter not set to the installed loader" >&2
+    exit 1
+fi
+if [ -e "$inst/.pgflow/package" ] || [ -e "$inst/content" ]; then
+    echo "package metadata left in INSTDIR" >&2
+    exit 1
+fi
+if ! cmp -s "$pkg/manifest.sha256" "$inst/.pgflow/manifest.sha256"; then
+    echo "installed manifest missing" >&2
+    exit 1
+fi
+if [ "$(readlink "$inst/bin/psql-link")" != ./psql ]; then
+    echo "symlink target rewritten: $(readlink "$inst/bin/psql-link")" >&2
+    exit 1
+fi
+if [ ! -w "$inst/bin/postgres" ] || [ -n "$(find "$inst" ! -type l ! -perm -u+w)" ]; then
+    echo "installed files left read-only" >&2
+    exit 1
+fi
@@ -0,0 +1,68 @@
+#!/bin/sh
+
+set -eu
+
+repo_root=$(CDPATH= cd -- "$(dirname "$0")/.." && pwd)
+tmpdir=$(mktemp -d)
+trap 'rm -rf "$tmpdir"' EXIT
+
+if ! command -v cc >/dev/null 2>&1; then
+    echo "skip: cc not found" >&2
+    exit 0
+fi
+
+cc -O2 -o "$tmpdir/pgflow-launcher" "$repo_root/scripts/launcher.c"
+
+envs='PATH=$TOPDIR/bin\:$PATH:PGFLOW_TEST_HOME=${TOPDIR}/lib:PGFLOW_TEST_ARGS=x=y'
+for kind in shell launcher; do
+    mkdir -p "$tmpdir/$kind/bin"
+    cat >"$tmpdir/$kind/bin/show" <<'EOS'
+#!/bin/sh
+printf '%s\n' "$0" "$PATH" "$PGFLOW_TEST_HOME" "$PGFLOW_TEST_ARGS" "$@"
+EOS
+    chmod 755 "$tmpdir/$kind/bin/show"
+done
+
+"$repo_root/scripts/wrap_envs.sh" "$tmpdir/shell" bin/show "$envs" >/dev/null
+"$repo_root/scripts/wrap_envs.sh" "$tmpdir/launcher" bin/show "$envs" "$tmpdir/pgflow-launcher" >/dev/null
+
+if ! cmp -s "$tmpdir/pgflow-launcher" "$tmpdir/launcher/bin/show"; then
+    echo "bin/show is not the launcher" >&2
+    exit 1
+fi
+if [ ! -f "$tmpdir/launcher/bin/.show.env" ]; then
+    echo "missing env spec" >&2
+    exit 1
+fi
+
+# 移动目录后 TOPDIR 仍应指向新位置。
+mv "$tmpdir/launcher" "$tmpdir/moved"
+mkdir -p "$tmpdir/link"
+ln -s ../moved/bin/show "$tmpdir/link/show"
+
+shell_out=$(PATH=/usr/bin:/bin "$tmpdir/shell/bin/show" 'a b' c)
+launcher_out=$(PATH=/usr/bin:/bin "$tmpdir/link/show" 'a b' c)
+
+expected_shell=$(printf '%s\n' \
+    "$tmpdir/shell/bin/.show" \
+    "$tmpdir/shell/bin:/usr/bin:/bin" \
+    "$tmpdir/shell/lib" \
+    "x=y" \
+    "a b" \
+    "c")
+expected_launcher=$(printf '%s\n' \
+    "$tmpdir/moved/bin/.show" \
+    "$tmpdir/moved/bin:/usr/bin:/bin" \
+    "$tmpdir/moved/lib" \
+    "x=y" \
+    "a b" \
+    "c")
+
+if [ "$shell_out" != "$expected_shell" ]; then
+    printf 'unexpected shell wrapper output:\n%s\n' "$shell_out" >&2
+    exit 1
+fi
+if [ "$launcher_out" != "$expected_launcher" ]; then
+    printf 'unexpected launcher output:\n%s\n' "$launcher_out" >&2
+    exit 1
+fi